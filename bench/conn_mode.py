@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Benchmark of connection loop startup latency and events/s in process mode
+(multiprocessing.Process, pickled multiprocessing.Queue) and thread mode
+(threading.Thread, in-memory ThreadQueue), see --conn-mode.
+Usage: python bench/conn_mode.py
+"""
+
+import os
+import sys
+from time import time
+from threading import Thread
+from multiprocessing import Process, Queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mbed_host_tests.host_tests_conn_proxy import EventQueue, ThreadQueue
+
+FRAMES = 5000
+EVENTS_PER_FRAME = 20
+STARTS = 20
+
+
+def conn_loop_stub(event_queue, dut_event_queue, frames):
+    """! Stands in for conn_process(): start event, frames of RXD lines, then waits for finish """
+    event_queue.put(('__conn_process_start', 1, time()))
+    for i in range(frames):
+        event_queue.put_frame([('__rxd_line', 'some debug trace line number %d' % j, time())
+            for j in range(EVENTS_PER_FRAME)])
+    event_queue.put(('__exit', 0, time()))
+    dut_event_queue.get()
+
+
+def run(mode, frames):
+    if mode == 'thread':
+        event_queue, dut_event_queue = EventQueue(queue_factory=ThreadQueue), ThreadQueue()
+        p = Thread(target=conn_loop_stub, args=(event_queue, dut_event_queue, frames))
+    else:
+        event_queue, dut_event_queue = EventQueue(), Queue()
+        p = Process(target=conn_loop_stub, args=(event_queue, dut_event_queue, frames))
+
+    start = time()
+    p.start()
+    event_queue.get()
+    startup = time() - start
+
+    count = 0
+    start = time()
+    while event_queue.get()[0] != '__exit':
+        count += 1
+    elapsed = time() - start
+
+    dut_event_queue.put(('__host_test_finished', True, time()))
+    p.join()
+    return startup, count / elapsed if elapsed else 0
+
+
+def main():
+    print "%-8s %16s %12s" % ('mode', 'startup [ms]', 'events/s')
+    for mode in ('process', 'thread'):
+        startup = min(run(mode, 0)[0] for _ in range(STARTS))
+        _, events_per_sec = run(mode, FRAMES)
+        print "%-8s %16.2f %12.0f" % (mode, startup * 1000, events_per_sec)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Benchmark of events/s sent from a producer process to the main event loop,
+one IPC message per event versus one frame per serial read, and latency of
+__exit event sent after RXD flood with and without priority lanes.
+Usage: python bench/event_queue.py
+"""
+
+import os
+import sys
+from time import time
+from multiprocessing import Process
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mbed_host_tests.host_tests_conn_proxy import EventQueue
+
+EVENTS = 100000
+EVENTS_PER_READ = 20    # e.g. 2304 bytes read with ~100 characters per line
+CALLBACK_COST = 0.00002 # Simulated main event loop work per RXD line (latency runs)
+
+
+def producer(event_queue, batched):
+    events = []
+    for i in range(EVENTS):
+        event = ('__rxd_line', 'some debug trace line number %d' % i, time())
+        if batched:
+            events.append(event)
+            if len(events) == EVENTS_PER_READ:
+                event_queue.put_frame(events)
+                events = []
+        else:
+            event_queue.put(event)
+    event_queue.put_frame(events)
+    event_queue.put(('__exit', 0, time()))
+
+
+def busy_wait(duration):
+    end = time() + duration
+    while time() < end:
+        pass
+
+
+def run(batched, priority_lanes=False, callback_cost=0):
+    event_queue = EventQueue(priority_lanes=priority_lanes)
+    p = Process(target=producer, args=(event_queue, batched))
+    start = time()
+    p.start()
+    count = 0
+    while True:
+        key, _, _ = event_queue.get()
+        if key == '__exit':
+            break
+        count += 1
+        if callback_cost:
+            busy_wait(callback_cost)
+    elapsed = time() - start
+    while not event_queue.empty():
+        event_queue.get()   # Producer can exit when all its messages are read
+    p.join()
+    return count, elapsed
+
+
+def main():
+    print "%-32s %12s" % ('transport', 'events/s')
+    for name, batched in (('one message per event', False),
+                          ('one frame per read (%d events)' % EVENTS_PER_READ, True)):
+        count, elapsed = run(batched)
+        print "%-32s %12.0f" % (name, count / elapsed)
+
+    print
+    print "%-32s %12s %14s" % ('__exit after %d lines' % EVENTS, 'latency', 'lines before')
+    for name, priority_lanes in (('single FIFO', False), ('priority lanes', True)):
+        count, elapsed = run(True, priority_lanes, CALLBACK_COST)
+        print "%-32s %10.3f s %14d" % (name, elapsed, count)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Benchmark of effective K,V pairs per second with text and binary framed
+Key-Value protocol at 115200 and 921600 baud. Effective rate is limited by
+bytes on the wire (8N1: 10 bits per byte) and by host parsing throughput.
+Usage: python bench/kv_framing.py
+"""
+
+import os
+import sys
+import binascii
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mbed_host_tests.host_tests_conn_proxy.conn_proxy import KiViBufferWalker, FramedKiViBufferWalker
+from mbed_host_tests.host_tests_conn_proxy.conn_framing import encode_kv_frame
+
+KV_COUNT = 20000
+READ_SIZE = 256
+BAUDRATES = [115200, 921600]
+
+
+def text_stream(values):
+    return ''.join("{{%s;%s}}\n" % (key, value) for key, value in values)
+
+
+def framed_stream(values):
+    return ''.join(encode_kv_frame(key, value) for key, value in values)
+
+
+def parse_rate(walker_cls, stream):
+    walker = walker_cls()
+    if hasattr(walker, 'enable_framing'):
+        walker.enable_framing()
+    start = time()
+    for i in range(0, len(stream), READ_SIZE):
+        walker.append(stream[i:i + READ_SIZE], timestamp=0.0)
+        while walker.search():
+            walker.pop_kv()
+    return KV_COUNT / (time() - start)
+
+
+def main():
+    # Binary values have to be hex encoded in text K,V protocol
+    binary = [os.urandom(32) for _ in range(KV_COUNT)]
+    workloads = [
+        ("short value", [('tick', str(i)) for i in range(KV_COUNT)], [('tick', str(i)) for i in range(KV_COUNT)]),
+        ("32 byte binary value", [('vector', binascii.hexlify(v)) for v in binary], [('vector', v) for v in binary]),
+    ]
+
+    print "%-22s %-7s %9s %12s" % ('workload', 'mode', 'bytes/KV', 'parse KV/s') + \
+        ''.join(" %14s" % ('KV/s @%d' % baud) for baud in BAUDRATES)
+    for name, text_values, framed_values in workloads:
+        for mode, stream, walker_cls in (('text', text_stream(text_values), KiViBufferWalker),
+                                         ('framed', framed_stream(framed_values), FramedKiViBufferWalker)):
+            bytes_per_kv = len(stream) / float(KV_COUNT)
+            parse = parse_rate(walker_cls, stream)
+            effective = [min(parse, baud / 10.0 / bytes_per_kv) for baud in BAUDRATES]
+            print "%-22s %-7s %9.1f %12.0f" % (name, mode, bytes_per_kv, parse) + \
+                ''.join(" %14.0f" % rate for rate in effective)
+
+if __name__ == '__main__':
+    main()
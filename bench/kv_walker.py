@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Microbenchmark of KiViBufferWalker stream parsing throughput (MB/s).
+Usage: python bench/kv_walker.py
+"""
+
+import os
+import re
+import sys
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mbed_host_tests.host_tests_conn_proxy.conn_proxy import KiViBufferWalker
+
+
+class LegacyKiViBufferWalker():
+    """! KiViBufferWalker before incremental parsing (str concatenation and re-split) """
+    def __init__(self):
+        self.buff = str()
+        self.kvl = []
+        self.re_kv = re.compile(r"\{\{([\w\d_-]+);([^\}]+)\}\}")
+
+    def append(self, payload):
+        self.buff += payload
+        lines = self.buff.split('\n')
+        self.buff = lines[-1]
+        lines.pop(-1)
+        discarded = []
+        for line in lines:
+            m = self.re_kv.search(line)
+            if m:
+                (key, value) = m.groups()
+                self.kvl.append((key, value, time()))
+                line = line.strip()
+                match = m.group(0)
+                pos = line.find(match)
+                before = line[:pos]
+                after = line[pos + len(match):]
+                if len(before) > 0:
+                    discarded.append(before)
+                if len(after) > 0:
+                    discarded.append(after)
+            else:
+                discarded.append(line)
+        return discarded
+
+    def search(self):
+        return len(self.kvl) > 0
+
+    def pop_kv(self):
+        return self.kvl.pop(0)
+
+
+def chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def run(walker_cls, payload_chunks, repeat=3):
+    """! Returns best time of repeated runs, single run is too noisy """
+    best = None
+    for _ in range(repeat):
+        walker = walker_cls()
+        start = time()
+        for chunk in payload_chunks:
+            walker.append(chunk)
+            while walker.search():
+                walker.pop_kv()
+        elapsed = time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    workloads = [
+        ("mixed text/KV lines", "{{tick;%d}}\nsome debug trace line\n" * 20000, 256),
+        ("long line, no '\\n'", "#" * (1 << 20) + "\n", 64),
+    ]
+
+    print "%-22s %-8s %10s %10s" % ('workload', 'chunk', 'legacy', 'current')
+    for name, data, chunk_size in workloads:
+        payload_chunks = chunks(data, chunk_size)
+        mb = len(data) / float(1 << 20)
+        results = []
+        for walker_cls in (LegacyKiViBufferWalker, KiViBufferWalker):
+            elapsed = run(walker_cls, payload_chunks)
+            results.append("%7.2f MB/s" % (mb / elapsed if elapsed else float('inf')))
+        print "%-22s %-8d %10s %10s" % (name, chunk_size, results[0], results[1])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Benchmark of K,V pairs per second sent from host test to DUT through
+conn_process (send_kv burst) with one K,V pair per loop iteration versus
+all pending K,V pairs coalesced in one write. DUT is a pseudo terminal
+(POSIX only) which counts received K,V pairs.
+Usage: python bench/send_kv.py
+"""
+
+import os
+import pty
+import errno
+import sys
+import tty
+import threading
+from time import time, sleep
+from multiprocessing import Process, Queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mbed_host_tests.host_tests_conn_proxy import conn_proxy, EventQueue
+
+MESSAGES = 2000
+
+
+def pty_dut(master, received):
+    """! Answers __sync and counts K,V pairs received from host, ends when slave side is closed """
+    buff = ''
+    synced = False
+    while True:
+        try:
+            data = os.read(master, 4096)
+        except OSError as e:
+            if e.errno == errno.EIO:
+                break   # Last slave descriptor closed
+            raise
+        if not data:
+            break
+        buff += data
+        if not synced and '}}' in buff:
+            uuid = buff[buff.index('{{__sync;') + 9:buff.index('}}')]
+            os.write(master, '{{__sync;%s}}\n' % uuid)
+            synced = True
+            buff = ''
+        received[0] += buff.count('{{echo;')
+        buff = buff[buff.rfind('\n') + 1:]
+
+
+def run(tx_batch_limit, io_mode, txd_log):
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    received = [0]
+    t = threading.Thread(target=pty_dut, args=(master, received))
+    t.daemon = True
+    t.start()
+
+    conn_proxy.TX_BATCH_LIMIT = tx_batch_limit  # Inherited by forked connection process
+    config = {'port': os.ttyname(slave), 'baudrate': 115200, 'skip_reset': True,
+        'io_mode': io_mode, 'txd_log': txd_log}
+    event_queue, dut_event_queue = EventQueue(), Queue()
+    p = Process(target=conn_proxy.conn_process, args=(event_queue, dut_event_queue, config))
+    p.start()
+    while event_queue.get(timeout=10)[0] != '__sync':
+        pass
+
+    start = time()
+    for i in range(MESSAGES):
+        dut_event_queue.put(('echo', 'message number %d' % i, time()))
+    while received[0] < MESSAGES and time() - start < 60:
+        sleep(0.001)
+    elapsed = time() - start
+
+    dut_event_queue.put(('__host_test_finished', True, time()))
+    p.join()
+    # Closing slave side ends pty_dut() thread, master is closed after it stops reading
+    os.close(slave)
+    t.join()
+    os.close(master)
+    return received[0] / elapsed
+
+
+def main():
+    results = []
+    for name, tx_batch_limit in (('one K,V per iteration', 1), ('coalesced', 1000)):
+        for io_mode in ('poll', 'select'):
+            for txd_log in ('all', 'none'):
+                results.append((name, io_mode, txd_log, run(tx_batch_limit, io_mode, txd_log)))
+
+    # Connection process logs to stdout, print results at the end
+    print
+    print "%-24s %-8s %-8s %12s" % ('writes', 'io mode', 'txd log', 'K,V/s')
+    for name, io_mode, txd_log, rate in results:
+        print "%-24s %-8s %-8s %12.0f" % (name, io_mode, txd_log, rate)
+
+if __name__ == '__main__':
+    main()
@@ -198,6 +198,12 @@ def init_host_test_cli_params():
                       help="Define how many times __sync packet will be sent to device: 0: none; -1: forever; 1,2,3... - number of times (Default 2 time)",
                       metavar="SYNC_BEHAVIOR")
 
+    parser.add_option("", "--fast-sync",
+                      dest="fast_sync",
+                      default=False,
+                      action="store_true",
+                      help="Do not wait after reset (-R), send __sync as soon as DUT sends anything and retry with exponential backoff. Only retries after sync timeout are counted by --sync")
+
     parser.add_option("-f", "--image-path",
                       dest="image_path",
                       help="Path with target's binary image",
@@ -229,6 +235,19 @@ def init_host_test_cli_params():
                       type="float",
                       help="When forcing a reset using option -r you can set up after reset idle delay in seconds (Default is 1 second)")
 
+    parser.add_option("", "--reset-wait",
+                      dest="reset_wait",
+                      default='fixed',
+                      type="choice",
+                      choices=['fixed', 'adaptive'],
+                      help="Post-reset wait: fixed (always wait -R seconds) or adaptive (wait up to -R seconds until DUT sends first byte, --boot-banner or its serial port reappears). Default fixed")
+
+    parser.add_option("", "--boot-banner",
+                      dest="boot_banner",
+                      default=None,
+                      metavar="REGEX",
+                      help="With --reset-wait=adaptive DUT is alive when its output matches this regular expression")
+
     parser.add_option("--process-start-timeout",
                       dest="process_start_timeout",
                       default=60,
@@ -260,6 +279,71 @@ def init_host_test_cli_params():
                       dest='global_resource_mgr',
                       help='[Experimental] Global resource manager service module name, IP and port, example remote_client:10.2.123.43:3334')
 
+    parser.add_option('', '--tcp',
+                      dest='tcp',
+                      metavar='HOST:PORT',
+                      help='Connect to DUT serial port exposed over network (e.g. by ser2net) instead of local serial port, example 10.2.123.43:3001')
+
+    parser.add_option('', '--tcp-protocol',
+                      dest='tcp_protocol',
+                      default='raw',
+                      type="choice",
+                      choices=['raw', 'rfc2217'],
+                      help='Protocol of --tcp connection: raw (plain TCP stream) or rfc2217 (Telnet COM port control, sets baud rate and resets DUT with break). Default raw')
+
+    parser.add_option('', '--tcp-buffer-size',
+                      dest='tcp_buffer_size',
+                      default=0,
+                      type="int",
+                      help='Size of --tcp socket send and receive buffers in bytes (default system settings)')
+
+    parser.add_option('', '--sim',
+                      dest='sim',
+                      metavar='PROGRAM[:COUNT]',
+                      help='Run test against simulated DUT instead of a device (implies --skip-flashing and --skip-reset). PROGRAM is echo, wait_us, default or path to DUT script file')
+
+    parser.add_option('', '--sim-rate',
+                      dest='sim_rate',
+                      default=0,
+                      type="float",
+                      help='Throughput of simulated DUT output in bytes per second (default unlimited)')
+
+    parser.add_option('', '--sim-burst',
+                      dest='sim_burst',
+                      default=0,
+                      type="int",
+                      help='Simulated DUT output is delivered in chunks of this many bytes (default whole messages)')
+
+    parser.add_option('', '--sim-latency',
+                      dest='sim_latency',
+                      default=0,
+                      type="float",
+                      help='Delay in seconds before simulated DUT receives data sent by host')
+
+    parser.add_option('', '--sim-noise',
+                      dest='sim_noise',
+                      default=0,
+                      type="float",
+                      help='Lines of noise (non K,V text) per second sent by simulated DUT')
+
+    parser.add_option('', '--replay',
+                      dest='replay',
+                      metavar='CAPTURE_FILE',
+                      help='Run test against DUT output recorded with --capture-file instead of a device (implies --skip-flashing and --skip-reset)')
+
+    parser.add_option('', '--replay-speed',
+                      dest='replay_speed',
+                      default=1.0,
+                      type="float",
+                      help='Pacing of --replay: 1.0 original timing, 2.0 twice as fast etc., 0 as fast as possible (default 1.0)')
+
+    parser.add_option('', '--replay-tx',
+                      dest='replay_tx',
+                      default='check',
+                      type="choice",
+                      choices=['check', 'ignore'],
+                      help='check: recorded DUT output waits for data host sent before it and host data is compared with capture, ignore: only pacing matters. Default check')
+
     parser.add_option('', '--run',
                       dest='run_binary',
                       default=False,
@@ -307,6 +391,137 @@ def init_host_test_cli_params():
                       default=None,
                       help='Save target serial output to this file.')
 
+    parser.add_option('', '--capture-file',
+                      dest='capture_file',
+                      default=None,
+                      metavar='PATH',
+                      help='Append raw timestamped capture of all data read from and written to DUT to this binary file (see mbed_host_tests.host_tests_conn_proxy.CaptureReader)')
+
+    parser.add_option('', '--fault-inject',
+                      dest='fault_inject',
+                      default=None,
+                      metavar='KIND=RATE[:ARG],...',
+                      help='Corrupt data received from DUT to test recovery: drop (ARG max. bytes lost, default 16), flip (bit flip), dup (line received twice), delay (ARG sec stall, default 1.0) or disconnect. RATE is probability per received byte, e.g. drop=0.001,flip=0.0005')
+
+    parser.add_option('', '--fault-seed',
+                      dest='fault_seed',
+                      default=0,
+                      type="int",
+                      help='Seed of --fault-inject schedule (default 0)')
+
+    parser.add_option('', '--conn-mode',
+                      dest='conn_mode',
+                      default='process',
+                      type="choice",
+                      choices=['process', 'thread'],
+                      help='Run DUT connection loop in a separate process (process) or in a thread of host test process (thread). Default process')
+
+    parser.add_option('', '--io-mode',
+                      dest='io_mode',
+                      default='poll',
+                      type="choice",
+                      choices=['poll', 'select'],
+                      help='Connection process I/O mode: poll (read every 10 ms) or select (wait until DUT sends data or host test sends message, POSIX only). Default poll')
+
+    parser.add_option('', '--io-threads',
+                      dest='io_threads',
+                      default=False,
+                      action="store_true",
+                      help='Use dedicated reader and writer threads for DUT connection (full-duplex, reads are not blocked by large writes)')
+
+    parser.add_option('', '--read-size',
+                      dest='read_size',
+                      default=0,
+                      type="int",
+                      help='Number of bytes requested by each read from DUT. By default read size is derived from baud rate and connection loop period')
+
+    parser.add_option('', '--read-in-waiting',
+                      dest='read_in_waiting',
+                      default=False,
+                      action="store_true",
+                      help='Read exactly the number of bytes waiting in serial port input buffer')
+
+    parser.add_option('', '--timestamp-interpolation',
+                      dest='timestamp_interpolation',
+                      default=False,
+                      action="store_true",
+                      help='Correct K,V event timestamps by transmission time (derived from baud rate) of bytes received after K,V in the same read')
+
+    parser.add_option('', '--kv-framing',
+                      dest='kv_framing',
+                      default=False,
+                      action="store_true",
+                      help='Offer binary framed (COBS, CRC-16) Key-Value protocol to DUT during __sync. Text Key-Value protocol is used if DUT does not accept it')
+
+    parser.add_option('', '--txd-log',
+                      dest='txd_log',
+                      default='all',
+                      type="choice",
+                      choices=['all', 'summary', 'none'],
+                      help='Logging of Key-Value pairs sent to DUT: all (one line per K,V pair), summary (one line per write) or none. Default all')
+
+    parser.add_option('', '--max-line-length',
+                      dest='max_line_length',
+                      default=0,
+                      metavar="NUMBER",
+                      type="int",
+                      help='Maximum length in bytes of a line received from DUT. Longer lines are handled according to --line-overflow policy. Default 0 (unlimited)')
+
+    parser.add_option('', '--line-overflow',
+                      dest='line_overflow',
+                      default='flush',
+                      type="choice",
+                      choices=['flush', 'drop'],
+                      help='What to do with line exceeding --max-line-length: flush (print it truncated) or drop. Default flush')
+
+    parser.add_option('', '--rxd-filter',
+                      dest='rxd_include',
+                      default=None,
+                      metavar="REGEX",
+                      action="append",
+                      help='Log and pass to host test only DUT output lines matching this regular expression (can be repeated). K,V pairs are never filtered')
+
+    parser.add_option('', '--rxd-filter-exclude',
+                      dest='rxd_exclude',
+                      default=None,
+                      metavar="REGEX",
+                      action="append",
+                      help='Do not log and pass to host test DUT output lines matching this regular expression (can be repeated). Lines are still saved to --serial-output-file')
+
+    parser.add_option('', '--rxd-rate-limit',
+                      dest='rxd_rate_limit',
+                      default=0,
+                      metavar="LINES_PER_SEC",
+                      type="float",
+                      help='Log and pass to host test on average at most this many DUT output lines per second, excess lines are dropped. K,V pairs are never rate limited. Default 0 (unlimited)')
+
+    parser.add_option('', '--rxd-sample-first',
+                      dest='rxd_sample_first',
+                      default=0,
+                      metavar="NUMBER",
+                      type="int",
+                      help='With --rxd-sample-every: number of DUT output lines passed before sampling starts. Default 0')
+
+    parser.add_option('', '--rxd-sample-every',
+                      dest='rxd_sample_every',
+                      default=0,
+                      metavar="NUMBER",
+                      type="int",
+                      help='Log and pass to host test only every n-th DUT output line (after --rxd-sample-first lines). Default 0 (no sampling)')
+
+    parser.add_option('', '--event-queue-size',
+                      dest='event_queue_size',
+                      default=0,
+                      metavar="NUMBER",
+                      type="int",
+                      help='Maximum number of messages queued from DUT connection to host test. When queue is full DUT output is spilled to a temporary file. Default 0 (unbounded)')
+
+    parser.add_option('', '--priority-lanes',
+                      dest='priority_lanes',
+                      default=False,
+                      action="store_true",
+                      help='Deliver K,V protocol events to host test ahead of DUT output lines (__rxd_line) queued before them. DUT output lines received before __exit may be not delivered. Ignored with --compare-log')
+
     parser.add_option('', '--compare-log',
                       dest='compare_log',
                       default=None,
@@ -322,4 +537,11 @@ def init_host_test_cli_params():
     parser.epilog = """Example: mbedhtrun -d E: -p COM5 -f "test.bin" -C 4 -c shell -m K64F"""
 
     (options, _) = parser.parse_args()
+
+    if options.fault_inject:
+        from mbed_host_tests.host_tests_conn_proxy import parse_fault_spec
+        try:
+            parse_fault_spec(options.fault_inject)
+        except ValueError as e:
+            parser.error("option --fault-inject: %s"% str(e))
     return options
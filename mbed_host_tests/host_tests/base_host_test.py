@@ -73,6 +73,32 @@ class BaseHostTestAbstract(object):
         """! Send Key-Value data to DUT """
         self.__notify_dut(key, value)
 
+    def send_kv_paced(self, key, value, chunk_size=64, rate=None, ack_window=None, ack_timeout=5.0, encoding='raw'):
+        """! Send large value to DUT in chunks, paced so small DUT RX buffers are not overrun
+        @param key Key of each chunk, DUT receives value as {{key;chunk}} K,V pairs
+        @param value Value to send
+        @param chunk_size Size of one chunk in bytes
+        @param rate Max. number of bytes per second sent to DUT (None - no rate limit)
+        @param ack_window Max. number of chunks not acknowledged by DUT (None - DUT does not acknowledge)
+        @param ack_timeout Time in seconds after which transfer fails if DUT does not acknowledge chunks
+        @param encoding Encoding of each chunk: 'raw', 'base64' or 'hex'. Binary values (containing
+               '{', '}' or new lines) can't be sent 'raw' unless DUT accepted binary framed
+               K,V pairs (--kv-framing), such transfer fails with error in __paced_kv_done
+        @details DUT acknowledges chunks with {{__ack;N}}, where N is number of chunks received so far.
+                 K,V pairs sent with send_kv() after this call are sent when transfer is finished.
+                 Connection process reports achieved throughput with __paced_kv_done event
+                 (register callback with force=True to handle it)
+        """
+        self.__notify_dut('__paced_kv', {
+            'key' : key,
+            'value' : value,
+            'chunk_size' : chunk_size,
+            'rate' : rate,
+            'ack_window' : ack_window,
+            'ack_timeout' : ack_timeout,
+            'encoding' : encoding,
+        })
+
     def setup_communication(self, event_queue, dut_event_queue, config={}):
         """! Setup queues used for IPC """
         self.__event_queue = event_queue         # To main even loop
@@ -136,6 +162,7 @@ class HostTestCallbackBase(BaseHostTestAbstract):
             '__testcase_name',
             '__testcase_summary',
             '__rxd_line',
+            '__paced_kv_done',
         ]
 
         self.__assign_default_callbacks()
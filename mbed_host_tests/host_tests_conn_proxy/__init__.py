@@ -17,4 +17,10 @@ limitations under the License.
 Author: Przemyslaw Wirkus <Przemyslaw.Wirkus@arm.com>
 """
 
-from conn_proxy import conn_process
+from conn_proxy import conn_process, ConnThread
+from conn_event_queue import EventQueue, ThreadQueue
+from conn_rxd_filter import RxdLineFilter, RxdRateLimiter
+from conn_bulk import BulkValueAssembler
+from conn_paced import PacedSender
+from conn_capture import CaptureReader, CaptureWriter, read_capture
+from conn_fault import FaultInjector, parse_fault_spec
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import zlib
+import base64
+import binascii
+
+# Bulk value channel
+#
+# Large values (memory dumps, coverage data, test vectors) are sent by DUT in chunks
+# and reassembled by connection process, host test gets one K,V pair with whole value:
+#
+# {{__bulk_begin;KEY;LENGTH;CRC32;ENCODING}}   LENGTH and CRC32 (hex) of decoded value,
+#                                              ENCODING is 'base64', 'hex' or 'raw'
+# {{__bulk_data;KEY;SEQ;CHUNK}}                SEQ counts chunks from 0
+# {{__bulk_end;KEY}}
+#
+# 'raw' chunks are useful with binary framed K,V pairs (see conn_framing).
+
+BULK_BEGIN = '__bulk_begin'
+BULK_DATA = '__bulk_data'
+BULK_END = '__bulk_end'
+BULK_ERROR = '__bulk_error'
+
+
+class BulkValueAssembler(object):
+    """! Reassembles chunked bulk values in connection process
+    @details Chunk K,V pairs are consumed, when transfer ends and its length and CRC32
+             match, one (KEY, value) event is returned. Broken transfer is reported with
+             one (__bulk_error, 'KEY: reason') event, its remaining chunks are dropped
+             silently until __bulk_end or next __bulk_begin with the same KEY
+    """
+    DECODERS = {
+        'base64' : base64.b64decode,
+        'hex' : binascii.unhexlify,
+        'raw' : str,
+    }
+
+    def __init__(self, max_size=64 << 20):
+        """! ctor
+        @param max_size Maximum length of one value in bytes
+        """
+        self.max_size = max_size
+        self.transfers = {}     # KEY -> [length, crc32, decoder, expected seq, list of chunks, size]
+        self.failed_keys = set()    # KEYs of failed transfers, already reported
+        self.completed = 0      # Statistics
+        self.failed = 0
+        self.chunks = 0
+
+    def feed(self, key, value, timestamp):
+        """! Processes K,V pair received from DUT
+        @return None if K,V pair is not part of bulk channel, otherwise list of events
+                (key, value, timestamp) to send to host test (may be empty)
+        """
+        if key == BULK_DATA:
+            return self.__data(value, timestamp)
+        elif key == BULK_BEGIN:
+            return self.__begin(value, timestamp)
+        elif key == BULK_END:
+            return self.__end(value, timestamp)
+        return None
+
+    def __error(self, bulk_key, reason, timestamp):
+        self.failed += 1
+        self.transfers.pop(bulk_key, None)
+        self.failed_keys.add(bulk_key)
+        return [(BULK_ERROR, "%s: %s"% (bulk_key, reason), timestamp)]
+
+    def __begin(self, value, timestamp):
+        fields = value.split(';')
+        if len(fields) != 4:
+            return self.__error(value, "malformed %s"% BULK_BEGIN, timestamp)
+        bulk_key, length, crc, encoding = fields
+        self.failed_keys.discard(bulk_key)
+        try:
+            length, crc = int(length), int(crc, 16)
+        except ValueError:
+            return self.__error(bulk_key, "invalid length or CRC32", timestamp)
+        if encoding not in self.DECODERS:
+            return self.__error(bulk_key, "unsupported encoding '%s'"% encoding, timestamp)
+        if length > self.max_size:
+            return self.__error(bulk_key, "value too large (%d bytes)"% length, timestamp)
+        if bulk_key in self.transfers:
+            self.failed += 1    # Previous transfer with the same key is abandoned
+        self.transfers[bulk_key] = [length, crc, self.DECODERS[encoding], 0, [], 0]
+        return []
+
+    def __data(self, value, timestamp):
+        fields = value.split(';', 2)
+        if fields[0] in self.failed_keys:
+            return []
+        if len(fields) != 3 or fields[0] not in self.transfers:
+            return self.__error(fields[0], "chunk of unknown transfer", timestamp)
+        bulk_key, seq, chunk = fields
+        transfer = self.transfers[bulk_key]
+        if seq != str(transfer[3]):
+            return self.__error(bulk_key, "chunk %s received, expected %d"% (seq, transfer[3]), timestamp)
+        try:
+            data = transfer[2](chunk)
+        except (TypeError, ValueError):
+            return self.__error(bulk_key, "chunk %s can't be decoded"% seq, timestamp)
+        transfer[5] += len(data)
+        if transfer[5] > transfer[0]:
+            return self.__error(bulk_key, "more than %d bytes received"% transfer[0], timestamp)
+        transfer[3] += 1
+        transfer[4].append(data)
+        self.chunks += 1
+        return []
+
+    def __end(self, value, timestamp):
+        bulk_key = value
+        if bulk_key in self.failed_keys:
+            self.failed_keys.discard(bulk_key)
+            return []
+        transfer = self.transfers.pop(bulk_key, None)
+        if transfer is None:
+            return self.__error(bulk_key, "end of unknown transfer", timestamp)
+        length, crc, _, _, chunks, size = transfer
+        if size != length:
+            return self.__error(bulk_key, "%d bytes received, expected %d"% (size, length), timestamp)
+        data = ''.join(chunks)
+        if zlib.crc32(data) & 0xffffffff != crc:
+            return self.__error(bulk_key, "CRC32 mismatch", timestamp)
+        self.completed += 1
+        return [(bulk_key, data, timestamp)]
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import struct
+from collections import namedtuple
+
+
+CAPTURE_MAGIC = 'HTRUNCAP'
+CAPTURE_VERSION = 1
+CAPTURE_RX = 'R'    # Bytes read from DUT
+CAPTURE_TX = 'T'    # Bytes written to DUT
+
+# Record header: direction, host timestamp (seconds), length of data
+RECORD_HEADER = struct.Struct('<cdI')
+
+CaptureRecord = namedtuple('CaptureRecord', ['direction', 'timestamp', 'data'])
+
+
+class CaptureWriter(object):
+    """! Appends raw DUT traffic to binary capture file
+    @details File starts with CAPTURE_MAGIC and version byte, then records follow:
+             direction ('R' or 'T'), timestamp (little endian double), length (little
+             endian uint32) and data. Records are buffered in memory and written when buffered
+             data is FLUSH_INTERVAL seconds old or exceeds BUFFER_SIZE, so capture does not slow
+             down connection loop. Caller should flush() when DUT is idle, then only data of
+             last FLUSH_INTERVAL is lost if process is killed. Captures of many connection
+             processes can be appended to one file
+    """
+    BUFFER_SIZE = 1 << 16
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, path):
+        """! ctor
+        @param path Capture file path, file is created or appended to
+        """
+        self.file = open(path, 'ab')
+        self.file.seek(0, 2)
+        if self.file.tell() == 0:
+            self.file.write(CAPTURE_MAGIC + chr(CAPTURE_VERSION))
+            self.file.flush()
+        self.buff = []
+        self.buff_size = 0
+        self.buff_start = None  # Timestamp of oldest buffered record
+        self.records = 0    # Statistics
+        self.bytes = 0
+
+    def write(self, direction, timestamp, data):
+        """! Records chunk of data
+        @param direction CAPTURE_RX or CAPTURE_TX
+        @param timestamp Host timestamp of read or write
+        @param data Bytes read or written
+        """
+        if not data:
+            return
+        self.buff.append(RECORD_HEADER.pack(direction, timestamp, len(data)))
+        self.buff.append(data)
+        self.buff_size += RECORD_HEADER.size + len(data)
+        self.records += 1
+        self.bytes += len(data)
+        if self.buff_start is None:
+            self.buff_start = timestamp
+        if self.buff_size >= self.BUFFER_SIZE or timestamp - self.buff_start >= self.FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """! Writes buffered records to file """
+        if self.buff:
+            self.file.write(''.join(self.buff))
+            self.file.flush()
+            self.buff = []
+            self.buff_size = 0
+            self.buff_start = None
+
+    def close(self):
+        if self.file:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+
+class CaptureReader(object):
+    """! Reads records from capture file written by CaptureWriter
+    @details Iterating over reader yields CaptureRecord(direction, timestamp, data) tuples.
+             Incomplete last record (e.g. capturing process was killed) is skipped and
+             self.truncated is set
+    """
+
+    def __init__(self, path):
+        """! ctor
+        @param path Capture file path
+        @details Raises ValueError if file is not a capture file
+        """
+        self.file = open(path, 'rb')
+        header = self.file.read(len(CAPTURE_MAGIC) + 1)
+        if header[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC or len(header) != len(CAPTURE_MAGIC) + 1:
+            self.file.close()
+            raise ValueError("'%s' is not a capture file"% path)
+        self.version = ord(header[-1])
+        self.truncated = False
+
+    def __iter__(self):
+        while True:
+            header = self.file.read(RECORD_HEADER.size)
+            if not header:
+                break
+            if len(header) < RECORD_HEADER.size:
+                self.truncated = True
+                break
+            direction, timestamp, length = RECORD_HEADER.unpack(header)
+            data = self.file.read(length)
+            if len(data) < length:
+                self.truncated = True
+                break
+            yield CaptureRecord(direction, timestamp, data)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_capture(path, direction=None):
+    """! Reads all records from capture file
+    @param path Capture file path
+    @param direction CAPTURE_RX or CAPTURE_TX to get records of one direction only
+    @return List of CaptureRecord(direction, timestamp, data) tuples
+    """
+    with CaptureReader(path) as reader:
+        return [r for r in reader if direction is None or r.direction == direction]
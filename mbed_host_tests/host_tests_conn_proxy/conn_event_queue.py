@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import shutil
+import thread
+import cPickle
+import tempfile
+import Queue as queue_module   # Queue here refers to the module, not a class
+from collections import deque
+from multiprocessing import Queue
+
+
+class EventQueue(object):
+    """! Queue of Key-Value protocol events sent from connection process to main event loop
+    @details Events are (key, value, timestamp) tuples. Producer can group many events in
+             one frame with put_frame(), frame is sent as a single IPC message. Frames are
+             unpacked transparently by get() and order of events is preserved.
+
+             With priority lanes enabled bulk events (DUT output lines) are overtaken by
+             control events (protocol and host test K,V pairs): get() reads all messages
+             already sent and returns control events first. Order of events within each
+             lane is preserved. Bounded queue reads ahead only until max_size bulk events
+             are pending, so control events overtake bulk events within that window.
+
+             Messages in underlying queue are (type, payload) tuples, so any K,V pair sent
+             by DUT (e.g. {{__frame;x}} or {{__spill;x}}) is passed to consumer as ordinary
+             event.
+
+             Bounded queue (max_size > 0) holds up to max_size messages. When it is full
+             frames with bulk events only are appended to producer's temporary spill file
+             and producer sends a message pointing to spilled frames as soon as there is
+             room in the queue again (see flush()). Consumer reads spilled frames in order.
+    """
+    MSG_EVENT, MSG_FRAME, MSG_SPILL = range(3)  # Message types
+    BULK_KEYS = ('__rxd_line', )
+    DRAIN_LIMIT = 256           # Max. number of messages read ahead by one get()
+    CONTROL_PUT_TIMEOUT = 1.0   # How long control events wait for room in bounded queue
+
+    def __init__(self, queue_factory=Queue, priority_lanes=False, max_size=0, spill_dir=None):
+        """! ctor
+        @param queue_factory Callable returning underlying queue object (e.g. multiprocessing.Queue)
+        @param priority_lanes Set to True if control events should overtake bulk events
+        @param max_size Max. number of messages in underlying queue, 0 for unbounded queue
+        @param spill_dir Parent directory for spill files of bounded queue (default system temp. directory)
+        """
+        self.queue = queue_factory(max_size) if max_size else queue_factory()
+        self.priority_lanes = priority_lanes
+        self.max_size = max_size
+        self.spill_dir = tempfile.mkdtemp(prefix='htrun_spill_', dir=spill_dir) if max_size else None
+        self.pending = deque()      # Consumer side: events unpacked from last frame (control lane)
+        self.bulk_pending = deque() # Consumer side: bulk lane
+
+        # Bounded queue, producer side
+        self.spill_path = None      # Spill file of this producer
+        self.spill_file = None
+        self.spill_start = None     # Offset of spilled frames not announced to consumer yet
+
+        # Bounded queue, consumer side
+        self.consumer = None        # (pid, thread id) of get() caller
+        self.consumer_backlog = deque() # Events put by consumer when queue was full
+        self.spill_chunks = deque() # [path, offset, end offset] of spilled frames to read
+        self.spill_readers = {}     # path -> opened spill file
+        self.spill_bytes = 0        # Statistics
+        self.high_water_mark = 0
+
+    def put(self, event):
+        """! Puts single (key, value, timestamp) event in the queue """
+        message = (self.MSG_EVENT, event)
+        if self.max_size:
+            self.__put_bounded([event], message)
+        else:
+            self.queue.put(message)
+
+    def put_frame(self, events):
+        """! Puts list of (key, value, timestamp) events in the queue as one frame """
+        if not events:
+            return
+        message = (self.MSG_EVENT, events[0]) if len(events) == 1 else (self.MSG_FRAME, events)
+        if self.max_size:
+            self.__put_bounded(events, message)
+        else:
+            self.queue.put(message)
+
+    def flush(self):
+        """! Producer side of bounded queue: announces spilled frames to consumer if there is room
+        @details Should be called periodically by producer, e.g. when it is idle
+        @return True if there are no spilled frames waiting to be announced
+        """
+        if self.spill_start is None:
+            return True
+        return self.__put_spill_message(block=False)
+
+    def get(self, block=True, timeout=None):
+        """! Gets next event, same semantics as Queue.get()
+        @return Tuple (key, value, timestamp)
+        @details Raises Queue.Empty if there are no events
+        """
+        if self.max_size:
+            if self.consumer is None:
+                self.consumer = self.__caller_id()
+            self.__flush_consumer_backlog()
+        if self.priority_lanes:
+            return self.__get_prioritized(block, timeout)
+        if not self.pending:
+            (msg_type, payload) = self.__receive(block, timeout)
+            if msg_type == self.MSG_EVENT:
+                return payload
+            self.pending.extend(payload)
+        return self.pending.popleft()
+
+    def empty(self):
+        """! Returns True if there are no events in the queue """
+        return (not self.pending and not self.bulk_pending and not self.spill_chunks and
+            not self.consumer_backlog and self.queue.empty())
+
+    def close(self):
+        """! Closes and removes spill files, should be called by consumer when producers finished """
+        for f in self.spill_readers.values() + [self.spill_file]:
+            if f:
+                f.close()
+        if self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        self.spill_readers = {}
+        self.spill_file, self.spill_path, self.spill_dir = None, None, None
+
+    def __caller_id(self):
+        return (os.getpid(), thread.get_ident())
+
+    def __put_bounded(self, events, message):
+        if self.consumer == self.__caller_id():
+            # Consumer can't wait for room in its own queue, message is sent by next get()
+            self.consumer_backlog.append(message)
+            self.__flush_consumer_backlog()
+            return
+        bulk_only = all(e[0] in self.BULK_KEYS for e in events)
+        if self.spill_start is None or self.__put_spill_message(block=not bulk_only):
+            try:
+                if bulk_only:
+                    self.queue.put(message, False)
+                else:
+                    self.queue.put(message, True, self.CONTROL_PUT_TIMEOUT)
+                return
+            except queue_module.Full:
+                pass
+        self.__spill(events)
+
+    def __flush_consumer_backlog(self):
+        while self.consumer_backlog:
+            try:
+                self.queue.put(self.consumer_backlog[0], False)
+            except queue_module.Full:
+                break
+            self.consumer_backlog.popleft()
+
+    def __spill(self, events):
+        if self.spill_file is None:
+            fd, self.spill_path = tempfile.mkstemp(suffix='.bin', dir=self.spill_dir)
+            self.spill_file = os.fdopen(fd, 'wb')
+        if self.spill_start is None:
+            self.spill_start = self.spill_file.tell()
+        cPickle.dump(events, self.spill_file, cPickle.HIGHEST_PROTOCOL)
+
+    def __put_spill_message(self, block):
+        self.spill_file.flush()
+        message = (self.MSG_SPILL, (self.spill_path, self.spill_start, self.spill_file.tell()))
+        try:
+            if block:
+                self.queue.put(message, True, self.CONTROL_PUT_TIMEOUT)
+            else:
+                self.queue.put(message, False)
+        except queue_module.Full:
+            return False
+        self.spill_start = None
+        return True
+
+    def __receive(self, block=True, timeout=None):
+        # Next message, spilled frames are read before messages sent after them
+        while not self.spill_chunks:
+            message = self.queue.get(block, timeout)
+            if self.max_size:
+                try:
+                    self.high_water_mark = max(self.high_water_mark, self.queue.qsize())
+                except NotImplementedError:
+                    pass    # qsize() is not implemented on Mac OS X
+            if message[0] != self.MSG_SPILL:
+                return message
+            path, start, end = message[1]
+            if os.path.dirname(path) != self.spill_dir:
+                raise ValueError("spill file '%s' outside of spill directory"% path)
+            self.spill_chunks.append([path, start, end])
+            self.spill_bytes += end - start
+
+        chunk = self.spill_chunks[0]
+        path, offset, end = chunk
+        if path not in self.spill_readers:
+            self.spill_readers[path] = open(path, 'rb')
+        f = self.spill_readers[path]
+        f.seek(offset)
+        events = cPickle.load(f)
+        chunk[1] = f.tell()
+        if chunk[1] >= end:
+            self.spill_chunks.popleft()
+        return (self.MSG_FRAME, events)
+
+    def __get_prioritized(self, block, timeout):
+        if not self.pending:
+            # Read ahead messages already sent so control events can overtake bulk events
+            self.__read_ahead()
+            if not self.pending and not self.bulk_pending:
+                self.__sort(self.__receive(block, timeout))
+        if self.pending:
+            return self.pending.popleft()
+        return self.bulk_pending.popleft()
+
+    def __read_ahead(self):
+        count = 0
+        while count < self.DRAIN_LIMIT and (self.spill_chunks or not self.queue.empty()):
+            if self.max_size and len(self.bulk_pending) >= self.max_size:
+                # Bounded queue: bulk events stay in the queue (or spill file), not in memory
+                break
+            try:
+                self.__sort(self.__receive(False))
+            except queue_module.Empty:
+                break
+            count += 1
+
+    def __sort(self, message):
+        # Puts event (or events from frame) in control or bulk lane
+        (msg_type, payload) = message
+        events = payload if msg_type == self.MSG_FRAME else (payload, )
+        if not self.priority_lanes:
+            self.pending.extend(events)
+            return
+        for e in events:
+            if e[0] in self.BULK_KEYS:
+                self.bulk_pending.append(e)
+            else:
+                self.pending.append(e)
+
+
+class ThreadQueue(queue_module.Queue):
+    """! In-memory queue used when connection loop runs in a thread (--conn-mode thread)
+    @details On POSIX systems fileno() is readable while queue is not empty, so it can be
+             used in select() like the reader pipe of multiprocessing.Queue
+    """
+    def _init(self, maxsize):
+        queue_module.Queue._init(self, maxsize)
+        self.read_fd, self.write_fd = None, None
+        if os.name == 'posix':
+            self.read_fd, self.write_fd = os.pipe()
+
+    def _put(self, item):
+        if not self.queue and self.write_fd is not None:
+            os.write(self.write_fd, b'.')
+        queue_module.Queue._put(self, item)
+
+    def _get(self):
+        item = queue_module.Queue._get(self)
+        if not self.queue and self.read_fd is not None:
+            os.read(self.read_fd, 1)
+        return item
+
+    def fileno(self):
+        """! File descriptor readable when queue is not empty (None if not supported) """
+        return self.read_fd
+
+    def close(self):
+        for fd in (self.read_fd, self.write_fd):
+            if fd is not None:
+                os.close(fd)
+        self.read_fd, self.write_fd = None, None
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import random
+from conn_primitive import ConnectorPrimitive, host_timestamp
+
+
+FAULT_KINDS = {
+    # kind : default argument
+    'drop' : 16,            # Max. number of bytes dropped at once
+    'flip' : None,
+    'dup' : None,
+    'delay' : 1.0,          # Stall in seconds
+    'disconnect' : None,
+}
+
+
+def parse_fault_spec(spec):
+    """! Parses fault injection specification, e.g. 'drop=0.001:8,flip=0.0005,delay=0.0001:2'
+    @param spec Comma separated KIND=RATE[:ARG] items, RATE is probability per received byte
+    @return Dictionary kind -> (rate, argument)
+    @details Raises ValueError if specification is malformed
+    """
+    faults = {}
+    for item in spec.split(','):
+        kind, _, value = item.strip().partition('=')
+        if kind not in FAULT_KINDS:
+            raise ValueError("unknown fault '%s', expected one of: %s"% (kind, ', '.join(sorted(FAULT_KINDS))))
+        rate, _, arg = value.partition(':')
+        rate = float(rate)
+        if not 0 < rate <= 1:
+            raise ValueError("rate of fault '%s' must be in (0, 1]"% kind)
+        default = FAULT_KINDS[kind]
+        faults[kind] = (rate, type(default)(arg) if arg and default is not None else default)
+    return faults
+
+
+class FaultInjector(ConnectorPrimitive):
+    """! Wraps any connector and corrupts data received from DUT
+    @details Faults are scheduled at random offsets of received byte stream (gaps follow
+             exponential distribution with given rate per byte), so the same seed and the
+             same DUT output give the same faults regardless of how output is split into
+             reads. Supported faults:
+             * drop - 1 to ARG bytes are lost
+             * flip - one bit of a byte is flipped
+             * dup - rest of the line is received twice (e.g. duplicated __sync reply)
+             * delay - stream stalls for ARG seconds (in select I/O mode connection
+               process notices end of stall with up to 1 sec latency)
+             * disconnect - connection is reported lost
+             Data sent to DUT is not changed
+    """
+    LOG_LIMIT = 20      # Injected faults logged one by one
+
+    def __init__(self, connector, faults, seed=0):
+        """! ctor
+        @param connector Wrapped connector
+        @param faults Dictionary kind -> (rate, argument), see parse_fault_spec()
+        @param seed Seed of fault schedule
+        """
+        self.connector = connector
+        ConnectorPrimitive.__init__(self, 'FALT')
+        self.faults = faults
+        self.random = random.Random(seed)
+        self.rx_offset = 0      # Bytes received from wrapped connector
+        self.next_fault = dict((kind, self.__gap(kind)) for kind in faults)
+        self.counts = dict((kind, 0) for kind in faults)
+        self.bytes_dropped = 0
+        self.held = None        # (data, offset, release time) of stalled data
+        self.disconnected = False
+        self.logger.prn_inf("fault injection: %s (seed %s)"% (', '.join("%s=%g"% (k, faults[k][0]) for k in sorted(faults)), seed))
+
+    # State set by connection process is kept in wrapped connector
+    event_driven = property(lambda self: self.connector.event_driven,
+        lambda self, value: setattr(self.connector, 'event_driven', value))
+    read_in_waiting = property(lambda self: self.connector.read_in_waiting,
+        lambda self, value: setattr(self.connector, 'read_in_waiting', value))
+    kv_framing = property(lambda self: self.connector.kv_framing,
+        lambda self, value: setattr(self.connector, 'kv_framing', value))
+    txd_log = property(lambda self: self.connector.txd_log,
+        lambda self, value: setattr(self.connector, 'txd_log', value))
+    baudrate = property(lambda self: getattr(self.connector, 'baudrate', None))
+
+    def __gap(self, kind, offset=0):
+        # Offset of next fault of given kind
+        return offset + int(self.random.expovariate(self.faults[kind][0]))
+
+    def __inject(self, data, offset):
+        # Applies faults scheduled within data received at stream offset
+        result = []
+        i = 0
+        end = offset + len(data)
+        while not self.disconnected:
+            kind = min(self.next_fault, key=self.next_fault.get)
+            fault_offset = self.next_fault[kind]
+            if fault_offset >= end:
+                break
+            pos = max(fault_offset - offset, i)
+            self.next_fault[kind] = self.__gap(kind, fault_offset + 1)
+            if pos >= len(data):
+                continue
+            arg = self.faults[kind][1]
+            result.append(data[i:pos])
+            if kind == 'drop':
+                i = min(pos + self.random.randint(1, arg), len(data))
+                self.bytes_dropped += i - pos
+            elif kind == 'flip':
+                result.append(chr(ord(data[pos]) ^ (1 << self.random.randint(0, 7))))
+                i = pos + 1
+            elif kind == 'dup':
+                eol = data.find('\n', pos)
+                i = eol + 1 if eol >= 0 else len(data)
+                result.append(data[pos:i] * 2)
+            elif kind == 'delay':
+                self.held = (data[pos:], offset + pos, host_timestamp() + arg)
+                i = len(data)
+            elif kind == 'disconnect':
+                self.disconnected = True
+                self.LAST_ERROR = "fault injection: disconnect"
+                i = len(data)
+            self.counts[kind] += 1
+            if sum(self.counts.values()) <= self.LOG_LIMIT:
+                self.logger.prn_wrn("injected %s at RX byte %d"% (kind, offset + pos))
+            if self.held:
+                break
+        result.append(data[i:])
+        return ''.join(result)
+
+    def read(self, count):
+        return self.read_timestamped(count)[0]
+
+    def read_timestamped(self, count):
+        if self.disconnected:
+            return '', host_timestamp()
+        if self.held:
+            data, offset, release = self.held
+            if host_timestamp() < release:
+                # Stalled, DUT output is still read (so select() does not spin) but held back
+                more, _ = self.connector.read_timestamped(count)
+                self.rx_offset += len(more)
+                self.held = (data + more, offset, release)
+                return '', host_timestamp()
+            self.held = None
+            return self.__inject(data, offset), host_timestamp()
+        data, timestamp = self.connector.read_timestamped(count)
+        offset = self.rx_offset
+        self.rx_offset += len(data)
+        return self.__inject(data, offset), timestamp
+
+    def write(self, payload, log=False):
+        return self.connector.write(payload, log)
+
+    def write_kvs(self, kvs):
+        return self.connector.write_kvs(kvs)
+
+    def start_io_threads(self):
+        return self.connector.start_io_threads()
+
+    def flush(self):
+        self.connector.flush()
+
+    def fileno(self):
+        return self.connector.fileno()
+
+    def has_pending_data(self):
+        if self.held:
+            return host_timestamp() >= self.held[2]
+        return self.connector.has_pending_data()
+
+    def reset(self, reset_type):
+        self.held = None
+        return self.connector.reset(reset_type)
+
+    def reset_info(self):
+        return self.connector.reset_info()
+
+    def connected(self):
+        return not self.disconnected and self.connector.connected()
+
+    def error(self):
+        return self.LAST_ERROR or self.connector.error()
+
+    def stats(self):
+        """! Returns statistics of injected faults as dictionary """
+        return {
+            'rx_bytes' : self.rx_offset,
+            'counts' : dict(self.counts),
+            'bytes_dropped' : self.bytes_dropped,
+        }
+
+    def finish(self):
+        self.logger.prn_inf("fault injection: %d RX bytes, injected %s, %d bytes dropped"% (self.rx_offset,
+            ', '.join("%s %d"% (k, self.counts[k]) for k in sorted(self.counts)),
+            self.bytes_dropped))
+        self.connector.finish()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import struct
+import binascii
+
+# Binary framed Key-Value protocol
+#
+# Frame on the wire: 0x00 COBS(len(key) key value CRC) 0x00
+#
+# * len(key) is one byte, key and value are raw bytes (value can contain '}' and '\n'),
+# * CRC is CRC-16-CCITT (initial value 0xFFFF) of len(key), key and value, big endian,
+# * COBS (Consistent Overhead Byte Stuffing) removes zero bytes from frame content so
+#   0x00 delimits frames. DUT output text never contains 0x00 so frames and text lines
+#   can be mixed in one stream.
+#
+# Framing is negotiated during __sync: host appends FRAMING_OFFER to __sync value. DUT
+# which does not support framing mirrors the whole value, DUT which supports framing
+# replies with bare UUID and accepts framed K,V pairs from host from now on.
+
+FRAMING_OFFER = '+cobs'
+FRAME_DELIMITER = '\x00'
+FRAME_CRC_INIT = 0xFFFF
+
+
+class FrameError(ValueError):
+    """! Frame can't be decoded (broken COBS encoding, too short or CRC mismatch) """
+    pass
+
+
+def cobs_encode(data):
+    """! COBS encoding, result does not contain zero bytes
+    @param data String (bytes) to encode
+    @return Encoded string
+    """
+    result = []
+    for block in data.split('\x00'):
+        # Blocks of 254 non-zero bytes are not followed by (implicit) zero
+        while len(block) >= 254:
+            result.append('\xff' + block[:254])
+            block = block[254:]
+        result.append(chr(len(block) + 1) + block)
+    return ''.join(result)
+
+
+def cobs_decode(data):
+    """! COBS decoding
+    @param data String (bytes) encoded with cobs_encode()
+    @return Decoded string
+    @details Raises FrameError if data is not valid COBS encoding
+    """
+    result = []
+    pos = 0
+    length = len(data)
+    while pos < length:
+        code = ord(data[pos])
+        end = pos + code
+        if code == 0 or end > length:
+            raise FrameError("invalid COBS encoding")
+        result.append(data[pos + 1:end])
+        pos = end
+        if code < 0xff and pos < length:
+            result.append('\x00')
+    return ''.join(result)
+
+
+def encode_kv_frame(key, value):
+    """! Forms binary frame with Key-Value pair
+    @param key Key, at most 255 bytes
+    @param value Value (string or bytes)
+    @return Frame including delimiters
+    """
+    key = str(key)
+    payload = chr(len(key)) + key + str(value)
+    crc = binascii.crc_hqx(payload, FRAME_CRC_INIT)
+    return FRAME_DELIMITER + cobs_encode(payload + struct.pack('>H', crc)) + FRAME_DELIMITER
+
+
+def decode_kv_frame(frame):
+    """! Decodes frame content (without delimiters)
+    @param frame COBS encoded frame content
+    @return Tuple (key, value)
+    @details Raises FrameError if frame is broken
+    """
+    payload = cobs_decode(frame)
+    if len(payload) < 3:
+        raise FrameError("frame too short")
+    key_end = 1 + ord(payload[0])
+    if key_end > len(payload) - 2:
+        raise FrameError("invalid key length")
+    (crc, ) = struct.unpack('>H', payload[-2:])
+    if binascii.crc_hqx(payload[:-2], FRAME_CRC_INIT) != crc:
+        raise FrameError("CRC mismatch")
+    return payload[1:key_end], payload[key_end:-2]
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import base64
+import binascii
+
+
+class PacedSender(object):
+    """! Sends large value to DUT in chunks, paced so small DUT RX buffers are not overrun
+    @details Value is split in chunks, each chunk is sent as {{KEY;chunk}} K,V pair.
+             Text K,V protocol can't carry '{', '}' and new line characters, so such
+             values have to be sent with 'base64' or 'hex' encoding (each chunk is encoded
+             separately, like in bulk value channel) or as binary framed K,V pairs.
+             Otherwise transfer fails before first chunk is sent. Chunks are sent not
+             faster than rate bytes per second (bytes on the wire, including K,V pair
+             overhead) and/or with at most ack_window chunks not acknowledged by DUT. DUT
+             acknowledges with {{__ack;N}} where N is number of chunks received so far.
+             Used by conn_process for BaseHostTestAbstract.send_kv_paced() requests
+    """
+    ACK_KEY = '__ack'
+    ENCODERS = {
+        'raw' : str,
+        'base64' : base64.b64encode,
+        'hex' : binascii.hexlify,
+    }
+    UNSAFE_CHARS = '{}\n'  # Break K,V pair parser of text K,V protocol
+
+    def __init__(self, key, value, timestamp, chunk_size=64, rate=0, ack_window=0, ack_timeout=5.0, overhead=0,
+                 encoding='raw', framed=False):
+        """! ctor
+        @param key Key of chunk K,V pairs
+        @param value Value to send
+        @param timestamp Current time (seconds, monotonic)
+        @param chunk_size Size of one chunk in bytes
+        @param rate Max. number of bytes per second, 0 for no rate limit
+        @param ack_window Max. number of not acknowledged chunks, 0 if DUT does not send acks
+        @param ack_timeout Time in seconds after which transfer fails if DUT does not acknowledge chunks
+        @param overhead Number of bytes added to each chunk by K,V protocol
+        @param encoding Encoding of chunks: 'raw', 'base64' or 'hex'
+        @param framed True if chunks are sent as binary framed K,V pairs (any 'raw' value allowed)
+        """
+        value = str(value)
+        chunk_size = max(int(chunk_size), 1)
+        self.key = key
+        self.chunks = [value[i:i + chunk_size] for i in range(0, len(value), chunk_size)]
+        self.encoding = encoding
+        self.rate = float(rate or 0)
+        self.ack_window = int(ack_window or 0)
+        self.ack_timeout = ack_timeout
+        self.overhead = overhead
+        self.sent = 0           # Chunks sent
+        self.acked = 0          # Chunks acknowledged by DUT
+        self.sent_bytes = 0     # Bytes on the wire
+        self.value_bytes = 0    # Bytes of value sent
+        self.start = timestamp
+        self.last_progress = timestamp
+        self.error = None
+        if encoding not in self.ENCODERS:
+            self.error = "unsupported encoding '%s'"% encoding
+        elif encoding == 'raw' and not framed and any(c in value for c in self.UNSAFE_CHARS):
+            self.error = "value contains '{', '}' or new line, send it with 'base64' or 'hex' encoding (or use --kv-framing)"
+
+    def done(self):
+        """! Returns True if all chunks were sent (and acknowledged) or transfer failed """
+        if self.error:
+            return True
+        if self.sent < len(self.chunks):
+            return False
+        return not self.ack_window or self.acked >= self.sent
+
+    def ack(self, value, timestamp):
+        """! Handles {{__ack;N}} sent by DUT """
+        try:
+            acked = min(int(value), self.sent)
+        except ValueError:
+            return
+        if acked > self.acked:
+            self.acked = acked
+            self.last_progress = timestamp
+
+    def next_chunks(self, timestamp):
+        """! Returns chunks which can be sent now
+        @param timestamp Current time (seconds, monotonic)
+        @return List of (key, chunk) tuples
+        """
+        result = []
+        while self.sent < len(self.chunks) and not self.error:
+            if self.ack_window and self.sent - self.acked >= self.ack_window:
+                break
+            if self.rate and self.sent_bytes > (timestamp - self.start) * self.rate:
+                break   # Ahead of schedule
+            chunk = self.chunks[self.sent]
+            encoded = self.ENCODERS[self.encoding](chunk)
+            result.append((self.key, encoded))
+            self.sent += 1
+            self.sent_bytes += len(encoded) + self.overhead
+            self.value_bytes += len(chunk)
+
+        if result:
+            self.last_progress = timestamp
+        elif self.ack_window and self.acked < self.sent and timestamp - self.last_progress > self.ack_timeout:
+            self.error = "DUT did not acknowledge chunk #%d within %.1f sec"% (self.acked, self.ack_timeout)
+        return result
+
+    def wait_time(self, timestamp):
+        """! Returns time in seconds until next chunk can be sent, None if sender waits for DUT """
+        if self.done():
+            return 0.0
+        if self.sent >= len(self.chunks) or (self.ack_window and self.sent - self.acked >= self.ack_window):
+            return None
+        if not self.rate:
+            return 0.0
+        return max(self.start + self.sent_bytes / self.rate - timestamp, 0.0)
+
+    def report(self, timestamp):
+        """! Returns statistics of the transfer
+        @return Dictionary with 'key', 'bytes' (of value), 'chunks', 'seconds', 'bytes_per_sec' and 'error'
+        """
+        elapsed = timestamp - self.start
+        return {
+            'key' : self.key,
+            'bytes' : self.value_bytes,
+            'chunks' : self.sent,
+            'seconds' : elapsed,
+            'bytes_per_sec' : self.value_bytes / elapsed if elapsed > 0 else 0.0,
+            'error' : self.error,
+        }
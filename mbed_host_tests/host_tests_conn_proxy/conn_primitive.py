@@ -16,7 +16,110 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import os
+import threading
+from time import time
+from collections import deque
 from mbed_host_tests.host_tests_logger import HtrunLogger
+from conn_framing import encode_kv_frame
+
+try:
+    from monotonic import monotonic as monotonic_time
+    MONOTONIC_CLOCK = True
+except (ImportError, RuntimeError):
+    # Package missing or no monotonic clock on this platform, wall clock is used
+    from timeit import default_timer as monotonic_time
+    MONOTONIC_CLOCK = False
+
+
+# Wall clock and monotonic clock readings taken at the same moment
+WALL_CLOCK_ANCHOR = time()
+MONOTONIC_ANCHOR = monotonic_time()
+
+
+def host_timestamp():
+    """! High resolution, monotonic host timestamp
+    @details Monotonic clock is anchored to wall clock at module import so returned values
+             can be compared with time.time() (e.g. in logs) but are not affected by wall
+             clock adjustments (unless MONOTONIC_CLOCK is False, then it is wall clock).
+             Use it to measure intervals between events
+    @return Timestamp in seconds (float)
+    """
+    return WALL_CLOCK_ANCHOR + (monotonic_time() - MONOTONIC_ANCHOR)
+
+
+class ChunkRingBuffer(object):
+    """! Thread safe, bounded FIFO of (data, timestamp) chunks received from DUT
+    @details Used between connector's reader thread (producer) and connection process loop
+             (consumer). When capacity is exceeded oldest data is dropped and counted.
+             On POSIX systems fileno() becomes readable when buffer is not empty
+    """
+    def __init__(self, capacity):
+        """! ctor
+        @param capacity Maximum number of buffered bytes
+        """
+        self.capacity = capacity
+        self.size = 0
+        self.dropped_bytes = 0
+        self.received_bytes = 0     # All bytes ever put in the buffer
+        self.chunks = deque()
+        self.cond = threading.Condition()
+        self.read_fd, self.write_fd = None, None
+        if os.name == 'posix':
+            self.read_fd, self.write_fd = os.pipe()
+
+    def put(self, data, timestamp):
+        """! Stores chunk of data read at timestamp """
+        with self.cond:
+            if not self.chunks and self.write_fd is not None:
+                os.write(self.write_fd, b'.')
+            self.chunks.append((data, timestamp))
+            self.size += len(data)
+            self.received_bytes += len(data)
+            while self.size > self.capacity and len(self.chunks) > 1:
+                dropped, _ = self.chunks.popleft()
+                self.size -= len(dropped)
+                self.dropped_bytes += len(dropped)
+            self.cond.notify()
+
+    def get(self, count, timeout=0):
+        """! Takes up to count bytes from the buffer
+        @param count Maximum number of bytes to return
+        @param timeout Time in seconds to wait for data if buffer is empty
+        @return Tuple (data, timestamp of last chunk data was taken from), ('', None) if empty
+        """
+        with self.cond:
+            if not self.chunks and timeout:
+                self.cond.wait(timeout)
+            result = []
+            timestamp = None
+            while self.chunks and count > 0:
+                data, timestamp = self.chunks.popleft()
+                if len(data) > count:
+                    # Remaining part of the chunk stays in the buffer
+                    self.chunks.appendleft((data[count:], timestamp))
+                    data = data[:count]
+                result.append(data)
+                count -= len(data)
+                self.size -= len(data)
+            if not self.chunks and self.read_fd is not None and result:
+                os.read(self.read_fd, 1)
+            return ''.join(result), timestamp
+
+    def peek(self):
+        """! Returns all buffered data without taking it from the buffer """
+        with self.cond:
+            return ''.join(data for (data, _) in self.chunks)
+
+    def fileno(self):
+        """! File descriptor readable when buffer is not empty (None if not supported) """
+        return self.read_fd
+
+    def close(self):
+        for fd in (self.read_fd, self.write_fd):
+            if fd is not None:
+                os.close(fd)
+        self.read_fd, self.write_fd = None, None
 
 
 class ConnectorPrimitiveException(Exception):
@@ -27,31 +130,84 @@ class ConnectorPrimitiveException(Exception):
 
 
 class ConnectorPrimitive(object):
+    RING_READ_TIMEOUT = 0.01    # How long read() waits for data in self.ring when not event driven
 
     def __init__(self, name):
         self.LAST_ERROR = None
         self.logger = HtrunLogger(name)
         self.polling_timeout = 60
+        self.event_driven = False   # True when caller waits for fileno() readiness before read()
+        self.kv_framing = False     # True when DUT accepted binary framed K,V pairs (see conn_framing)
+        self.txd_log = 'all'        # Logging of sent K,V pairs, see write_kvs()
+        self.read_in_waiting = False    # True if read() should return all bytes already received (if supported)
+        self.ring = None            # ChunkRingBuffer filled by connector's own thread, see read_timestamped()
 
-    def write_kv(self, key, value):
-        """! Forms and sends Key-Value protocol message.
+    def format_kv(self, key, value):
+        """! Forms Key-Value protocol message (text or binary frame if DUT accepted framing)
         @details On how to parse K-V sent from DUT see KiViBufferWalker::KIVI_REGEX
                  On how DUT sends K-V please see greentea_write_postamble() function in greentea-client
-        @return Returns buffer with K-V message sent to DUT
+        @return Buffer with K-V message
         """
+        if self.kv_framing:
+            return encode_kv_frame(key, value)
         # All Key-Value messages ends with newline character
-        kv_buff = "{{%s;%s}}"% (key, value) + '\n'
+        return "{{%s;%s}}"% (key, value) + '\n'
+
+    def write_kv(self, key, value):
+        """! Forms and sends Key-Value protocol message.
+        @return Returns buffer with K-V message sent to DUT
+        """
+        return self.write_kvs([(key, value)])
+
+    def write_kvs(self, kvs):
+        """! Forms and sends many Key-Value protocol messages with one write
+        @param kvs List of (key, value) tuples
+        @details Messages are logged according to self.txd_log: 'all' (one line per
+                 message), 'summary' (one line per write) or 'none'
+        @return Returns buffer with K-V messages sent to DUT
+        """
+        kv_buff = ''.join([self.format_kv(key, value) for (key, value) in kvs])
         self.write(kv_buff)
-        self.logger.prn_txd(kv_buff.rstrip())
+        if self.txd_log == 'all':
+            suffix = ' (framed)' if self.kv_framing else ''
+            for (key, value) in kvs:
+                self.logger.prn_txd("{{%s;%s}}%s"% (key, value, suffix))
+        elif self.txd_log == 'summary':
+            self.logger.prn_txd("%d K,V pairs, %d bytes"% (len(kvs), len(kv_buff)))
         return kv_buff
 
     def read(self, count):
         """! Read data from DUT
-        @param count Number of bytes to read
+        @param count Number of bytes to read (may be exceeded when self.read_in_waiting is set)
         @return Bytes read
         """
+        if self.ring:
+            return self.read_timestamped(count)[0]
         raise NotImplementedError
 
+    def read_timestamped(self, count):
+        """! Read data from DUT and capture host timestamp of the read
+        @details If connector's thread stores received data in self.ring, data is read from
+                 ring buffer and timestamped when it was stored
+        @param count Number of bytes to read
+        @return Tuple (bytes read, host_timestamp() taken right after read)
+        """
+        if self.ring:
+            # In event driven mode caller already waited for data with select() on self.fileno()
+            data, timestamp = self.ring.get(count, timeout=0 if self.event_driven else self.RING_READ_TIMEOUT)
+            return data, timestamp if timestamp is not None else host_timestamp()
+        data = self.read(count)
+        return data, host_timestamp()
+
+    def start_io_threads(self):
+        """! Starts optional dedicated reader and writer threads
+        @details In threaded mode reader thread blocks on DUT connection and stores received
+                 chunks (timestamped when read) in a ring buffer, writer thread sends payloads
+                 queued by write(). Then read() and write() do not block on DUT I/O
+        @return True if connector supports threaded mode and threads were started
+        """
+        return False
+
     def write(self, payload, log=False):
         """! Read data from DUT
         @param payload Buffer with data to send
@@ -64,6 +220,39 @@ class ConnectorPrimitive(object):
         """! Flush read/write channels of DUT """
         raise NotImplementedError
 
+    def fileno(self):
+        """! File descriptor which becomes readable when data from DUT is available
+        @details Used for event driven I/O (select), when supported read() does not need
+                 to wait for data when self.event_driven is set
+        @return File descriptor or None if not supported by connector
+        """
+        if self.ring:
+            return self.ring.fileno()
+        return None
+
+    def has_pending_data(self):
+        """! Check if connector holds data already received from DUT
+        @details Such data is returned by next read() but does not make fileno() readable
+        @return True if next read() returns data without waiting
+        """
+        return False
+
+    def reset(self, reset_type):
+        """! Reset DUT in place, reusing already opened connection
+        @param reset_type Reset type requested by host test ('software_reset' or 'hardware_reset')
+        @return True if DUT was reset and connection is still usable, False if connector
+                can't reset in place or connection was lost (e.g. port disappeared). Then
+                connection process should be restarted
+        """
+        return False
+
+    def reset_info(self):
+        """! Information about DUT connection after failed in-place reset
+        @return Dictionary with new 'serial_port' and 'mount_point' if they changed, or
+                'reset_error' if DUT can't be reset at all (new connection won't help), or None
+        """
+        return None
+
     def connected(self):
         """! Check if there is a connection to DUT
         @return True if there is conenction to DUT (read/write/flush API works)
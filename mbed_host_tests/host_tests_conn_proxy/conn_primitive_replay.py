@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import re
+import threading
+from conn_primitive import ConnectorPrimitive, ChunkRingBuffer, host_timestamp
+from conn_capture import read_capture, CAPTURE_RX, CAPTURE_TX
+
+
+class ReplayConnectorPrimitive(ConnectorPrimitive):
+    """! Feeds DUT output recorded with --capture-file back to connection process
+    @details Recorded RX chunks are delivered at original pacing (scaled by speed) or as
+             fast as possible (speed 0). With TX check enabled each RX chunk is also held
+             until host has written as many bytes as were written before it in the
+             capture, and data written by host is compared with recorded TX data.
+             __sync UUIDs recorded in the capture are replaced in RX data by UUIDs host
+             sends now (in order), so handshake succeeds
+    """
+    UUID_REGEX = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+    SYNC_REGEX = re.compile(r"\{\{__sync;(%s)"% UUID_REGEX.pattern)
+    TX_TIMEOUT = 10.0       # Max. time RX chunk waits for host writes before TX gating is disabled
+    MAX_MISMATCH_LOG = 5    # TX mismatches logged in detail
+
+    def __init__(self, name, config):
+        ConnectorPrimitive.__init__(self, name)
+        self.path = config.get('replay_file')
+        self.speed = float(config.get('replay_speed', 1.0) or 0)
+        self.tx_check = config.get('replay_tx', 'check') == 'check'
+        self.baudrate = config.get('baudrate', None)
+
+        records = read_capture(self.path)
+        self.t0 = records[0].timestamp if records else 0.0
+        self.rx_records = []    # [timestamp, TX bytes written before, data]
+        tx_chunks = []
+        tx_bytes = 0
+        for r in records:
+            if r.direction == CAPTURE_TX:
+                tx_chunks.append(r.data)
+                tx_bytes += len(r.data)
+            elif r.direction == CAPTURE_RX:
+                self.rx_records.append([r.timestamp, tx_bytes, r.data])
+        self.tx_recorded = self.__mask_uuids(''.join(tx_chunks))
+        self.recorded_uuids = self.SYNC_REGEX.findall(''.join(tx_chunks))
+        self.__join_split_uuids()
+
+        self.live_uuids = []    # __sync UUIDs sent by host
+        self.tx_written = 0
+        self.tx_mismatches = 0
+        self.gating = True      # Disabled when host does not write what replay waits for
+        self.cond = threading.Condition()
+        self.ring = ChunkRingBuffer(int(config.get('io_ring_size', 1 << 20)))
+        self.rx_bytes = 0       # Statistics
+        self.rx_done = 0
+        self.running = True
+        self.start = host_timestamp()
+        self.end = None
+        self.thread = threading.Thread(target=self.__replay_thread)
+        self.thread.daemon = True
+        self.thread.start()
+        self.logger.prn_inf("replaying '%s': %d RX chunks (%d bytes), %d TX bytes, speed %s, TX %s"% (self.path,
+            len(self.rx_records),
+            sum(len(r[2]) for r in self.rx_records),
+            len(self.tx_recorded),
+            "x%.2f"% self.speed if self.speed else 'max',
+            'checked' if self.tx_check else 'ignored'))
+
+    def __mask_uuids(self, data):
+        # UUIDs differ between runs, masked data has the same length
+        return self.UUID_REGEX.sub('?' * 36, data)
+
+    def __join_split_uuids(self):
+        # UUID split between two RX chunks could not be replaced, chunks are joined
+        i = 0
+        while i < len(self.rx_records) - 1:
+            data = self.rx_records[i][2]
+            tail = data[-35:] + self.rx_records[i + 1][2][:35]
+            split = False
+            for m in self.UUID_REGEX.finditer(tail):
+                if m.start() < min(len(data), 35) < m.end():
+                    split = True
+            if split:
+                self.rx_records[i][2] += self.rx_records.pop(i + 1)[2]
+            else:
+                i += 1
+
+    def __map_uuids(self, data):
+        for i, uuid in enumerate(self.recorded_uuids):
+            if uuid in data and self.live_uuids:
+                data = data.replace(uuid, self.live_uuids[min(i, len(self.live_uuids) - 1)])
+        return data
+
+    def __gated(self, tx_before, data):
+        # Recorded __sync reply waits for host __sync even if TX is ignored (it can't be mapped)
+        if not self.gating:
+            return False
+        syncs = [i + 1 for (i, uuid) in enumerate(self.recorded_uuids) if uuid in data]
+        if syncs and len(self.live_uuids) < max(syncs):
+            return True
+        return self.tx_check and self.tx_written < tx_before
+
+    def __replay_thread(self):
+        for timestamp, tx_before, data in self.rx_records:
+            if self.speed:
+                due = self.start + (timestamp - self.t0) / self.speed
+                with self.cond:
+                    while self.running and host_timestamp() < due:
+                        self.cond.wait(due - host_timestamp())
+            with self.cond:
+                wait_start = host_timestamp()
+                while self.running and self.__gated(tx_before, data):
+                    if host_timestamp() - wait_start > self.TX_TIMEOUT:
+                        self.logger.prn_wrn("host did not write data expected by replay within %.1f sec, TX gating disabled"% self.TX_TIMEOUT)
+                        self.gating = False
+                        break
+                    self.cond.wait(0.1)
+                if not self.running:
+                    return
+                data = self.__map_uuids(data)
+            self.ring.put(data, host_timestamp())
+            self.rx_bytes += len(data)
+            self.rx_done += 1
+        self.end = host_timestamp()
+        self.logger.prn_inf("replay finished, %d bytes in %.3f sec"% (self.rx_bytes, self.end - self.start))
+
+    def write(self, payload, log=False):
+        with self.cond:
+            self.live_uuids.extend(self.SYNC_REGEX.findall(payload))
+            if self.tx_check:
+                expected = self.tx_recorded[self.tx_written:self.tx_written + len(payload)]
+                sent = self.__mask_uuids(payload)
+                if sent != expected:
+                    self.tx_mismatches += 1
+                    if self.tx_mismatches <= self.MAX_MISMATCH_LOG:
+                        self.logger.prn_wrn("TX differs from capture at byte %d: expected %r, sent %r"% (self.tx_written,
+                            expected,
+                            sent))
+            self.tx_written += len(payload)
+            self.cond.notify_all()
+        if log:
+            self.logger.prn_txd(payload)
+        return payload
+
+    def flush(self):
+        pass
+
+    def reset(self, reset_type):
+        # Recorded DUT output already contains effects of reset
+        return True
+
+    def connected(self):
+        return self.running
+
+    def finish(self):
+        if self.running:
+            with self.cond:
+                self.running = False
+                self.cond.notify_all()
+            self.thread.join(1.0)
+            elapsed = (self.end or host_timestamp()) - self.start
+            self.logger.prn_inf("replay: %d of %d RX chunks, %d bytes in %.3f sec (%.1f bytes/sec), %d TX mismatches"% (self.rx_done,
+                len(self.rx_records),
+                self.rx_bytes,
+                elapsed,
+                self.rx_bytes / elapsed if elapsed > 0 else 0.0,
+                self.tx_mismatches))
+            self.ring.close()
+
+    def __del__(self):
+        self.finish()
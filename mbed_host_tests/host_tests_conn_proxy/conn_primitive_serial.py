@@ -17,14 +17,22 @@ limitations under the License.
 """
 
 
+import os
+import re
 import time
+import threading
+from Queue import Queue, Empty as QueueEmpty
 from serial import Serial, SerialException
 from mbed_host_tests import host_tests_plugins
 from mbed_host_tests.host_tests_plugins.host_test_plugins import HostTestPluginBase
 from conn_primitive import ConnectorPrimitive, ConnectorPrimitiveException
+from conn_primitive import ChunkRingBuffer, host_timestamp
 
 
 class SerialConnectorPrimitive(ConnectorPrimitive):
+    IO_THREAD_TIMEOUT = 0.1     # How often I/O threads check if they should stop
+    RESET_POLL_INTERVAL = 0.005 # How often adaptive post-reset wait checks if DUT is alive
+
     def __init__(self, name, port, baudrate, config):
         ConnectorPrimitive.__init__(self, name)
         self.port = port
@@ -34,9 +42,29 @@ class SerialConnectorPrimitive(ConnectorPrimitive):
         self.target_id = self.config.get('target_id', None)
         self.polling_timeout = config.get('polling_timeout', 60)
         self.forced_reset_timeout = config.get('forced_reset_timeout', 1)
+        if config.get('fast_sync', False):
+            # No post-reset sleep, connection process synchronizes as soon as DUT is alive
+            self.forced_reset_timeout = 0
         self.skip_reset = config.get('skip_reset', False)
         self.serial = None
 
+        # Adaptive post-reset wait, see wait_for_dut_alive()
+        self.reset_wait = config.get('reset_wait', 'fixed')
+        boot_banner = config.get('boot_banner', None)
+        self.boot_banner = re.compile(boot_banner) if boot_banner else None
+        self.rx_pending = str()     # Bytes received while waiting for DUT, returned by next read()
+
+        # Threaded mode, see start_io_threads()
+        self.ring_size = int(config.get('io_ring_size', 1 << 20))
+        self.ring = None        # Chunks read by reader thread
+        self.tx_queue = None    # Payloads sent by writer thread
+        self.io_threads = []
+        self.io_running = False
+        self.io_failed = False
+
+        # Set by reset() if port changed after power cycle
+        self.new_device_info = None
+
         # Values used to call serial port listener...
 
         # Check if serial port for given target_id changed
@@ -83,6 +111,7 @@ class SerialConnectorPrimitive(ConnectorPrimitive):
             reset_type = 'default'
         disk = self.config.get('disk', None)
 
+        rx_mark = self.__rx_mark() if self.reset_wait == 'adaptive' else None
         self.logger.prn_inf("reset device using '%s' plugin..."% reset_type)
         result = host_tests_plugins.call_plugin('ResetMethod',
             reset_type,
@@ -90,22 +119,203 @@ class SerialConnectorPrimitive(ConnectorPrimitive):
             disk=disk,
             target_id=self.target_id)
         # Post-reset sleep
-        if delay:
+        if delay and self.reset_wait == 'adaptive':
+            latency, reason = self.wait_for_dut_alive(delay, rx_mark)
+            if latency is None:
+                self.logger.prn_wrn("no signs of life from DUT within %.2f sec after reset"% delay)
+            else:
+                self.logger.prn_inf("DUT alive %.3f sec after reset (%s)"% (latency, reason))
+        elif delay:
             self.logger.prn_inf("waiting %.2f sec after reset"% delay)
             time.sleep(delay)
         self.logger.prn_inf("wait for it...")
         return result
 
+    def __rx_mark(self):
+        # Bytes received before reset do not count as signs of life, see wait_for_dut_alive()
+        if self.ring:
+            return self.ring.received_bytes
+        self.__read_pending()
+        return len(self.rx_pending)
+
+    def __read_pending(self):
+        # Moves bytes already received to self.rx_pending
+        try:
+            if self.serial:
+                self.rx_pending += self.serial.read(4096)
+        except (SerialException, IOError, OSError):
+            pass    # Port may be gone while DUT re-enumerates
+
+    def wait_for_dut_alive(self, timeout, rx_mark=0):
+        """! Waits until DUT shows signs of life after reset
+        @details DUT is alive when it sends first byte (or output matching --boot-banner if
+                 given) or when its serial port reappears after USB re-enumeration. Bytes
+                 received meanwhile are returned by next read()
+        @param timeout Max. time to wait in seconds
+        @param rx_mark Number of bytes received before reset (see __rx_mark())
+        @return Tuple (seconds from reset to signs of life, reason) or (None, None) after timeout
+        """
+        start = time.time()
+        port_existed = os.path.exists(self.port)
+        port_gone = False
+        while True:
+            elapsed = time.time() - start
+            if self.ring:
+                # Reader thread keeps reading, bytes may be already taken by connection process
+                received = self.ring.received_bytes - rx_mark
+                data = self.ring.peek()[-received:] if received else ''
+            else:
+                self.__read_pending()
+                data = self.rx_pending[rx_mark:]
+            if self.boot_banner:
+                if data and self.boot_banner.search(data):
+                    return elapsed, 'boot banner'
+            elif data:
+                return elapsed, 'first byte'
+            if port_existed:
+                if not os.path.exists(self.port):
+                    port_gone = True
+                elif port_gone:
+                    return elapsed, 'serial port reappeared'
+            if elapsed >= timeout:
+                return None, None
+            time.sleep(self.RESET_POLL_INTERVAL)
+
+    def reset(self, reset_type):
+        """! Reset device on already opened serial port
+        @details Software reset uses reset plugin (--reset-type) on opened port. Hardware reset
+                 power cycles the device, it succeeds in place only if serial port survived it
+        """
+        self.new_device_info = None
+        if not self.connected():
+            return False
+
+        device_info = None
+        if reset_type == 'hardware_reset':
+            device_info = {}
+            self.logger.prn_inf("power cycle device using 'power_cycle' plugin...")
+            if not host_tests_plugins.call_plugin('ResetMethod',
+                'power_cycle',
+                target_id=self.target_id,
+                device_info=device_info):
+                return False
+            if device_info.get('serial_port', self.port) != self.port:
+                self.logger.prn_inf("serial port changed from '%s' to '%s' after power cycle"% (self.port,
+                    device_info['serial_port']))
+                self.new_device_info = device_info
+                return False
+        elif not self.skip_reset:
+            self.reset_dev_via_serial(delay=self.forced_reset_timeout)
+
+        if not self.port_alive():
+            self.logger.prn_wrn("serial port '%s' lost after reset"% self.port)
+            self.new_device_info = device_info
+            return False
+        return True
+
+    def reset_info(self):
+        return self.new_device_info
+
+    def port_alive(self):
+        """! Check if opened serial port still refers to existing device
+        @return True if port can be queried, False if it disappeared (e.g. USB device re-enumerated)
+        """
+        if not self.connected():
+            return False
+        try:
+            self.serial.in_waiting
+        except (SerialException, IOError, OSError, ValueError):
+            return False
+        return True
+
+    def start_io_threads(self):
+        if not self.serial:
+            return False
+        self.ring = ChunkRingBuffer(self.ring_size)
+        self.tx_queue = Queue()
+        # Reader thread blocks on serial port, but not longer than IO_THREAD_TIMEOUT
+        self.serial.timeout = self.IO_THREAD_TIMEOUT
+        self.io_running = True
+        for target in (self.__reader_thread, self.__writer_thread):
+            t = threading.Thread(target=target)
+            t.daemon = True
+            t.start()
+            self.io_threads.append(t)
+        self.logger.prn_inf("serial port reader and writer threads started (ring buffer %d bytes)"% self.ring_size)
+        return True
+
+    def __stop_io_threads(self):
+        self.io_running = False
+        for t in self.io_threads:
+            t.join(self.IO_THREAD_TIMEOUT * 10)
+        self.io_threads = []
+        if self.ring:
+            if self.ring.dropped_bytes:
+                self.logger.prn_wrn("ring buffer overrun, %d bytes dropped"% self.ring.dropped_bytes)
+            self.ring.close()
+
+    def __io_thread_error(self, operation, e):
+        self.io_failed = True
+        self.LAST_ERROR = "connection lost, %s: %s"% (operation, str(e))
+        self.logger.prn_err(str(e))
+
+    def __reader_thread(self):
+        """! Blocks on serial port and stores received data in ring buffer """
+        while self.io_running:
+            try:
+                data = self.serial.read(1)
+                if data:
+                    waiting = self.serial.in_waiting
+                    if waiting:
+                        data += self.serial.read(waiting)
+            except (SerialException, OSError, IOError, TypeError, AttributeError) as e:
+                if self.io_running:
+                    self.__io_thread_error("serial.read()", e)
+                break
+            if data:
+                self.ring.put(data, host_timestamp())
+
+    def __writer_thread(self):
+        """! Sends payloads queued by write() """
+        while self.io_running:
+            try:
+                payload = self.tx_queue.get(timeout=self.IO_THREAD_TIMEOUT)
+            except QueueEmpty:
+                continue
+            try:
+                self.serial.write(payload)
+            except (SerialException, OSError, IOError, TypeError, AttributeError) as e:
+                if self.io_running:
+                    self.__io_thread_error("serial.write(%d bytes)"% len(payload), e)
+                break
+            finally:
+                self.tx_queue.task_done()
+
     def read(self, count):
         """! Read data from serial port RX buffer """
+        if self.ring:
+            # Threaded mode: timestamp was taken by reader thread
+            return ConnectorPrimitive.read(self, count)
         # TIMEOUT: Since read is called in a loop, wait for self.timeout period before calling serial.read(). See
         # comment on serial.Serial() call above about timeout.
-        time.sleep(self.timeout)
+        # In event driven mode caller already waited for data with select() on self.fileno()
+        if not self.event_driven:
+            time.sleep(self.timeout)
         c = str()
+        if self.rx_pending:
+            # Received while waiting for DUT after reset
+            c, self.rx_pending = self.rx_pending, str()
+            return c
         try:
             if self.serial:
+                if self.read_in_waiting:
+                    # Read exactly what is in OS buffer, no allocation of unused read buffer
+                    count = self.serial.in_waiting
+                    if not count:
+                        return c
                 c = self.serial.read(count)
-        except SerialException as e:
+        except (SerialException, IOError, OSError) as e:
+            # in_waiting raises IOError when device disappeared
             self.serial = None
             self.LAST_ERROR = "connection lost, serial.read(%d): %s"% (count, str(e))
             self.logger.prn_err(str(e))
@@ -113,6 +323,13 @@ class SerialConnectorPrimitive(ConnectorPrimitive):
 
     def write(self, payload, log=False):
         """! Write data to serial port TX buffer """
+        if self.tx_queue:
+            # Threaded mode: payload is sent by writer thread
+            if self.connected():
+                self.tx_queue.put(payload)
+                if log:
+                    self.logger.prn_txd(payload)
+            return payload
         try:
             if self.serial:
                 self.serial.write(payload)
@@ -125,13 +342,32 @@ class SerialConnectorPrimitive(ConnectorPrimitive):
         return payload
 
     def flush(self):
+        # Threaded mode: wait until writer thread sends all queued payloads
+        while self.tx_queue and self.tx_queue.unfinished_tasks and self.io_running and not self.io_failed:
+            time.sleep(self.timeout)
         if self.serial:
             self.serial.flush()
 
+    def has_pending_data(self):
+        return bool(self.rx_pending)
+
+    def fileno(self):
+        if self.ring:
+            return ConnectorPrimitive.fileno(self)
+        # select() works on serial port file descriptors only on POSIX systems
+        if self.serial and os.name == 'posix':
+            try:
+                return self.serial.fileno()
+            except (AttributeError, SerialException):
+                pass
+        return None
+
     def connected(self):
-        return bool(self.serial)
+        return bool(self.serial) and not self.io_failed
 
     def finish(self):
+        if self.io_threads:
+            self.__stop_io_threads()
         if self.serial:
             self.serial.close()
 
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import re
+import time
+import random
+import threading
+from Queue import Queue, Empty as QueueEmpty
+from conn_primitive import ConnectorPrimitive, ChunkRingBuffer, host_timestamp
+
+
+class SimReset(Exception):
+    """! Raised in DUT simulator thread when DUT is reset """
+    pass
+
+
+class SimConnectorPrimitive(ConnectorPrimitive):
+    """! Simulated DUT speaking greentea-client Key-Value protocol, no hardware needed
+    @details Simulator thread answers __sync, sends __timeout and __host_test_name and
+             runs program selected with --sim PROGRAM[:COUNT]:
+             * echo - DUT side of EchoTest, COUNT echoes (default 100)
+             * wait_us - DUT side of WaitusTest, COUNT ticks one second apart (default 5)
+             * default - just reports success
+             * path to script file - lines are sent to host as they are after sync, except
+               'expect KEY' (wait for K,V pair from host) and 'sleep SECONDS'
+             DUT output is delivered to connection process through a ring buffer (so
+             select() works) with configurable throughput (bytes/sec), burst size (bytes per
+             chunk), latency of responses to host and rate of noise lines
+    """
+    KIVI_REGEX = re.compile(r"\{\{([\w\d_-]+);([^\}]+)\}\}")
+    PROGRAMS = {
+        # program : (host test name, default count)
+        'echo' : ('echo', 100),
+        'wait_us' : ('wait_us_auto', 5),
+        'default' : ('default_auto', 0),
+    }
+    TIMEOUT = 20            # __timeout sent to host
+    TICK_INTERVAL = 1.0     # wait_us program
+
+    def __init__(self, name, config):
+        ConnectorPrimitive.__init__(self, name)
+        program = config.get('sim_program') or 'default'
+        self.program, _, count = program.partition(':')
+        self.count = int(count) if count else self.PROGRAMS.get(self.program, (None, 0))[1]
+        self.rate = float(config.get('sim_rate', 0) or 0)
+        self.burst = int(config.get('sim_burst', 0) or 0)
+        self.latency = float(config.get('sim_latency', 0) or 0)
+        self.noise = float(config.get('sim_noise', 0) or 0)
+        # Read size and K,V timestamp interpolation follow simulated throughput
+        self.baudrate = int(self.rate * 10) if self.rate else None
+        self.script = None
+        if self.program not in self.PROGRAMS:
+            with open(self.program) as f:
+                self.script = f.read().splitlines()
+
+        self.ring = ChunkRingBuffer(int(config.get('io_ring_size', 1 << 20)))
+        self.rx = Queue()           # (due time, data) sent by host
+        self.rx_buff = ''           # Data received by DUT, not parsed yet
+        self.tx_lock = threading.Lock()
+        self.tx_due = 0.0           # When DUT output link is free again (throughput limit)
+        self.running = True
+        self.reset_event = threading.Event()
+        self.random = random.Random(config.get('sim_seed', 0))
+        self.threads = []
+        targets = [self.__dut_thread] + ([self.__noise_thread] if self.noise else [])
+        for target in targets:
+            t = threading.Thread(target=target)
+            t.daemon = True
+            t.start()
+            self.threads.append(t)
+        self.logger.prn_inf("DUT simulator: program '%s', count %d, rate %s, burst %s, latency %.3f sec, noise %.1f lines/sec"% (self.program,
+            self.count,
+            "%d bytes/sec"% self.rate if self.rate else 'unlimited',
+            "%d bytes"% self.burst if self.burst else 'none',
+            self.latency,
+            self.noise))
+
+    # DUT side
+
+    def __send(self, data):
+        # DUT output, split in bursts and delivered not faster than self.rate
+        with self.tx_lock:
+            size = self.burst or len(data)
+            for i in range(0, len(data), size):
+                chunk = data[i:i + size]
+                if self.rate:
+                    now = host_timestamp()
+                    self.tx_due = max(self.tx_due, now) + len(chunk) / self.rate
+                    if self.tx_due > now:
+                        time.sleep(self.tx_due - now)
+                self.ring.put(chunk, host_timestamp())
+
+    def __send_kv(self, key, value):
+        self.__send("{{%s;%s}}\n"% (key, value))
+
+    def __check_reset(self):
+        if self.reset_event.is_set():
+            raise SimReset()
+        if not self.running:
+            raise SimReset()
+
+    def __sleep(self, seconds):
+        end = time.time() + seconds
+        while time.time() < end:
+            self.__check_reset()
+            time.sleep(min(end - time.time(), 0.05))
+
+    def __expect(self, key=None):
+        # Waits for K,V pair sent by host, returns (key, value)
+        while True:
+            m = self.KIVI_REGEX.search(self.rx_buff)
+            if m:
+                self.rx_buff = self.rx_buff[m.end():]
+                if key is None or m.group(1) == key:
+                    return m.group(1), m.group(2)
+                continue
+            self.__check_reset()
+            try:
+                due, data = self.rx.get(timeout=0.05)
+            except QueueEmpty:
+                continue
+            delay = due - host_timestamp()
+            if delay > 0:
+                time.sleep(delay)
+            self.rx_buff += data
+
+    def __dut_thread(self):
+        while self.running:
+            try:
+                self.__run_program()
+                # Program finished, DUT idles until reset
+                while True:
+                    self.__sleep(1.0)
+            except SimReset:
+                self.reset_event.clear()
+                self.rx_buff = ''
+
+    def __run_program(self):
+        _, sync_uuid = self.__expect('__sync')
+        self.__send_kv('__sync', sync_uuid)
+        if self.script is not None:
+            for line in self.script:
+                cmd = line.split()
+                if cmd and cmd[0] == 'expect':
+                    self.__expect(cmd[1] if len(cmd) > 1 else None)
+                elif cmd and cmd[0] == 'sleep':
+                    self.__sleep(float(cmd[1]))
+                else:
+                    self.__send(line + '\n')
+            return
+
+        self.__send_kv('__timeout', self.TIMEOUT)
+        self.__send_kv('__host_test_name', self.PROGRAMS[self.program][0])
+        if self.program == 'echo':
+            self.__send_kv('echo_count', self.count)
+            self.__expect('echo_count')
+            for i in range(self.count):
+                _, value = self.__expect('echo')
+                self.__send_kv('echo', value)
+        elif self.program == 'wait_us':
+            for i in range(self.count):
+                self.__send_kv('tick', i)
+                self.__sleep(self.TICK_INTERVAL)
+            self.__send_kv('exit', 0)
+        self.__send_kv('end', 'success')
+        self.__send_kv('__exit', 0)
+
+    def __noise_thread(self):
+        sent = 0
+        start = time.time()
+        while self.running:
+            due = int((time.time() - start) * self.noise)
+            lines = []
+            while sent < due:
+                lines.append("noise %d %s\n"% (sent, 'x' * self.random.randint(0, 80)))
+                sent += 1
+            if lines:
+                self.__send(''.join(lines))
+            time.sleep(0.01)
+
+    # Host side
+
+    def write(self, payload, log=False):
+        self.rx.put((host_timestamp() + self.latency, payload))
+        if log:
+            self.logger.prn_txd(payload)
+        return payload
+
+    def flush(self):
+        pass
+
+    def reset(self, reset_type):
+        self.logger.prn_inf("DUT simulator reset (%s)"% reset_type)
+        self.reset_event.set()
+        return True
+
+    def connected(self):
+        return self.running
+
+    def finish(self):
+        if self.running:
+            self.running = False
+            for t in self.threads:
+                t.join(1.0)
+            self.ring.close()
+
+    def __del__(self):
+        self.finish()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import re
+import time
+import errno
+import socket
+import select
+import struct
+from mbed_host_tests import DEFAULT_BAUD_RATE
+from conn_primitive import ConnectorPrimitive
+
+
+# Telnet (RFC 854) commands and options used by RFC 2217
+IAC, DONT, DO, WONT, WILL, SB, SE = '\xff', '\xfe', '\xfd', '\xfc', '\xfb', '\xfa', '\xf0'
+BINARY, SGA, COM_PORT_OPTION = '\x00', '\x03', '\x2c'
+
+# RFC 2217 COM-PORT-OPTION commands (client to server, server replies with command + 100)
+SET_BAUDRATE, SET_DATASIZE, SET_PARITY, SET_STOPSIZE, SET_CONTROL = 1, 2, 3, 4, 5
+SERVER_OFFSET = 100
+PARITY_NONE, STOPSIZE_1 = 1, 1
+CONTROL_NO_FLOW_CONTROL, CONTROL_BREAK_ON, CONTROL_BREAK_OFF = 1, 5, 6
+
+
+class TelnetCodec(object):
+    """! Minimal client side Telnet codec for RFC 2217 (serial port over network)
+    @details Escapes IAC bytes in data sent to server, strips Telnet commands from data
+             received from server and answers option negotiation: client uses binary
+             transmission, suppressed go-ahead and COM-PORT-OPTION, all other options are
+             refused. Server replies to COM-PORT-OPTION commands are stored in self.com_port
+    """
+    S_DATA, S_IAC, S_OPTION, S_SB, S_SB_IAC = range(5)
+    CLIENT_OPTIONS = (BINARY, SGA, COM_PORT_OPTION)     # Client WILL
+    SERVER_OPTIONS = (BINARY, SGA)                      # Client asks server to DO
+
+    def __init__(self):
+        self.state = self.S_DATA
+        self.command = None     # WILL, WONT, DO or DONT waiting for option byte
+        self.sb_buff = []       # Subnegotiation being received
+        self.will = set()       # Options enabled on client side
+        self.do = set()         # Options enabled on server side
+        self.com_port = {}      # Server COM-PORT-OPTION replies: command -> value
+
+    def start(self):
+        """! Returns option negotiation sent by client after connect """
+        self.will.update(self.CLIENT_OPTIONS)
+        self.do.update(self.SERVER_OPTIONS)
+        return (''.join(IAC + WILL + opt for opt in self.CLIENT_OPTIONS) +
+            ''.join(IAC + DO + opt for opt in self.SERVER_OPTIONS))
+
+    def encode(self, data):
+        """! Escapes data sent to server """
+        return data.replace(IAC, IAC + IAC)
+
+    def com_port_command(self, command, value):
+        """! Returns COM-PORT-OPTION subnegotiation
+        @param command Command code (e.g. SET_BAUDRATE)
+        @param value Command value (packed bytes)
+        """
+        return IAC + SB + COM_PORT_OPTION + chr(command) + self.encode(value) + IAC + SE
+
+    def decode(self, data):
+        """! Strips Telnet commands from data received from server
+        @return Tuple (data, replies to send to server)
+        """
+        out = []
+        replies = []
+        i, n = 0, len(data)
+        while i < n:
+            if self.state == self.S_DATA:
+                j = data.find(IAC, i)
+                if j == -1:
+                    out.append(data[i:])
+                    break
+                out.append(data[i:j])
+                i = j + 1
+                self.state = self.S_IAC
+                continue
+            c = data[i]
+            i += 1
+            if self.state == self.S_IAC:
+                if c == IAC:
+                    out.append(IAC)
+                    self.state = self.S_DATA
+                elif c in (WILL, WONT, DO, DONT):
+                    self.command = c
+                    self.state = self.S_OPTION
+                elif c == SB:
+                    self.sb_buff = []
+                    self.state = self.S_SB
+                else:
+                    self.state = self.S_DATA    # NOP, GA, ...
+            elif self.state == self.S_OPTION:
+                replies.append(self.__negotiate(self.command, c))
+                self.state = self.S_DATA
+            elif self.state == self.S_SB:
+                if c == IAC:
+                    self.state = self.S_SB_IAC
+                else:
+                    self.sb_buff.append(c)
+            elif self.state == self.S_SB_IAC:
+                if c == SE:
+                    self.__subnegotiation(''.join(self.sb_buff))
+                    self.state = self.S_DATA
+                else:
+                    self.sb_buff.append(c)  # Escaped IAC
+                    self.state = self.S_SB
+        return ''.join(out), ''.join(replies)
+
+    def __negotiate(self, command, option):
+        # Replies only when option state changes, so negotiation can't loop
+        if command == DO:
+            if option in self.CLIENT_OPTIONS:
+                if option not in self.will:
+                    self.will.add(option)
+                    return IAC + WILL + option
+                return ''
+            return IAC + WONT + option
+        if command == DONT:
+            if option in self.will:
+                self.will.discard(option)
+                return IAC + WONT + option
+            return ''
+        if command == WILL:
+            if option in self.SERVER_OPTIONS:
+                if option not in self.do:
+                    self.do.add(option)
+                    return IAC + DO + option
+                return ''
+            return IAC + DONT + option
+        if option in self.do:   # WONT
+            self.do.discard(option)
+            return IAC + DONT + option
+        return ''
+
+    def __subnegotiation(self, data):
+        if data[:1] == COM_PORT_OPTION and len(data) > 1:
+            self.com_port[ord(data[1]) - SERVER_OFFSET] = data[2:]
+
+
+class TcpConnectorPrimitive(ConnectorPrimitive):
+    """! DUT serial port exposed over TCP (e.g. by ser2net) as raw stream or RFC 2217 (Telnet COM-PORT-OPTION)
+    @details Non-blocking socket with Nagle's algorithm disabled, read() and write() wait
+             for socket readiness with select()
+    """
+    CONNECT_RETRY = 1.0     # Seconds between connection attempts
+    WRITE_TIMEOUT = 5.0     # Max. time write() waits for room in socket send buffer
+    BREAK_DURATION = 0.25   # RFC 2217 break used to reset DUT
+    RESET_POLL_INTERVAL = 0.005 # How often adaptive post-reset wait checks if DUT is alive
+
+    def __init__(self, name, host, port, config):
+        ConnectorPrimitive.__init__(self, name)
+        self.host = host
+        self.port = int(port)
+        self.config = config
+        self.protocol = config.get('tcp_protocol', 'raw')
+        self.buffer_size = int(config.get('tcp_buffer_size', 0) or 0)
+        self.baudrate = int(config.get('baudrate', DEFAULT_BAUD_RATE))
+        self.polling_timeout = int(config.get('polling_timeout', 60))
+        self.forced_reset_timeout = config.get('forced_reset_timeout', 1)
+        if config.get('fast_sync', False):
+            # No post-reset sleep, connection process synchronizes as soon as DUT is alive
+            self.forced_reset_timeout = 0
+        self.skip_reset = config.get('skip_reset', False)
+        self.timeout = 0.01  # 10 milli sec
+        self.sock = None
+
+        # Adaptive post-reset wait, see wait_for_dut_alive()
+        self.reset_wait = config.get('reset_wait', 'fixed')
+        boot_banner = config.get('boot_banner', None)
+        self.boot_banner = re.compile(boot_banner) if boot_banner else None
+        self.rx_pending = str()     # Bytes received while waiting for DUT, returned by next read()
+        self.telnet = TelnetCodec() if self.protocol == 'rfc2217' else None
+
+        start_time = time.time()
+        while time.time() - start_time < self.polling_timeout:
+            if self.__connect():
+                break
+            self.logger.prn_err("Retry after %.0f sec until %s seconds"% (self.CONNECT_RETRY, self.polling_timeout))
+            time.sleep(self.CONNECT_RETRY)
+
+        if self.sock and self.telnet:
+            self.__configure_port()
+        if self.sock and not self.skip_reset:
+            self.reset_dev_via_break(delay=self.forced_reset_timeout)
+
+    def __connect(self):
+        self.logger.prn_inf("tcp(host=%s, port=%d, protocol=%s)"% (self.host, self.port, self.protocol))
+        try:
+            sock = socket.create_connection((self.host, self.port), self.CONNECT_RETRY)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.buffer_size:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.buffer_size)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.buffer_size)
+            sock.setblocking(0)
+        except (socket.error, socket.timeout) as e:
+            self.LAST_ERROR = "connection lost, tcp(%s:%d): %s"% (self.host, self.port, str(e))
+            self.logger.prn_err(str(e))
+            return False
+        self.sock = sock
+        return True
+
+    def __configure_port(self):
+        # RFC 2217: binary transmission and serial port settings (8N1, no flow control)
+        self.__send(self.telnet.start() +
+            self.telnet.com_port_command(SET_BAUDRATE, struct.pack('>I', self.baudrate)) +
+            self.telnet.com_port_command(SET_DATASIZE, chr(8)) +
+            self.telnet.com_port_command(SET_PARITY, chr(PARITY_NONE)) +
+            self.telnet.com_port_command(SET_STOPSIZE, chr(STOPSIZE_1)) +
+            self.telnet.com_port_command(SET_CONTROL, chr(CONTROL_NO_FLOW_CONTROL)))
+
+    def __lost(self, operation, e):
+        self.LAST_ERROR = "connection lost, %s: %s"% (operation, str(e))
+        self.logger.prn_err(self.LAST_ERROR)
+        if self.sock:
+            self.sock.close()
+        self.sock = None
+
+    def __send(self, data):
+        # Sends all data, waits for room in socket send buffer
+        while data and self.sock:
+            try:
+                _, writable, _ = select.select([], [self.sock], [], self.WRITE_TIMEOUT)
+                if not writable:
+                    self.__lost("socket.send(%d bytes)"% len(data), "timeout")
+                    break
+                sent = self.sock.send(data)
+                data = data[sent:]
+            except socket.error as e:
+                if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                    continue
+                self.__lost("socket.send(%d bytes)"% len(data), e)
+            except select.error as e:
+                self.__lost("select()", e)
+
+    RAW_RESET_ERROR = "raw TCP connection can't reset device, use --tcp-protocol=rfc2217 or --skip-reset"
+
+    def reset_dev_via_break(self, delay=1):
+        """! Reset device with break signal (RFC 2217 only, raw TCP can't signal break) """
+        if not self.telnet:
+            self.logger.prn_wrn(self.RAW_RESET_ERROR)
+            return False
+        rx_mark = self.__rx_mark() if self.reset_wait == 'adaptive' else None
+        self.logger.prn_inf("reset device using RFC 2217 break...")
+        self.__send(self.telnet.com_port_command(SET_CONTROL, chr(CONTROL_BREAK_ON)))
+        time.sleep(self.BREAK_DURATION)
+        self.__send(self.telnet.com_port_command(SET_CONTROL, chr(CONTROL_BREAK_OFF)))
+        # Post-reset sleep
+        if delay and self.reset_wait == 'adaptive':
+            latency, reason = self.wait_for_dut_alive(delay, rx_mark)
+            if latency is None:
+                self.logger.prn_wrn("no signs of life from DUT within %.2f sec after reset"% delay)
+            else:
+                self.logger.prn_inf("DUT alive %.3f sec after reset (%s)"% (latency, reason))
+        elif delay:
+            self.logger.prn_inf("waiting %.2f sec after reset"% delay)
+            time.sleep(delay)
+        self.logger.prn_inf("wait for it...")
+        return True
+
+    def __rx_mark(self):
+        # Bytes received before reset do not count as signs of life, see wait_for_dut_alive()
+        while True:
+            c = self.__recv(4096, 0)
+            if not c:
+                break
+            self.rx_pending += c
+        return len(self.rx_pending)
+
+    def wait_for_dut_alive(self, timeout, rx_mark=0):
+        """! Waits until DUT shows signs of life after reset
+        @details DUT is alive when it sends first byte (or output matching --boot-banner if
+                 given). Bytes received meanwhile are returned by next read()
+        @param timeout Max. time to wait in seconds
+        @param rx_mark Number of bytes received before reset (see __rx_mark())
+        @return Tuple (seconds from reset to signs of life, reason) or (None, None) after timeout
+        """
+        start = time.time()
+        while self.sock:
+            elapsed = time.time() - start
+            self.rx_pending += self.__recv(4096, self.RESET_POLL_INTERVAL)
+            data = self.rx_pending[rx_mark:]
+            if self.boot_banner:
+                if data and self.boot_banner.search(data):
+                    return elapsed, 'boot banner'
+            elif data:
+                return elapsed, 'first byte'
+            if elapsed >= timeout:
+                break
+        return None, None
+
+    def reset(self, reset_type):
+        """! Reset device with RFC 2217 break on already opened connection
+        @details Raw TCP can't signal break, reset fails unless --skip-reset is given
+                 (see reset_info()). With --skip-reset DUT is not reset
+        """
+        if not self.connected():
+            return False
+        if self.skip_reset:
+            self.logger.prn_wrn("%s requested with --skip-reset, DUT was not reset"% reset_type)
+        elif not self.reset_dev_via_break(delay=self.forced_reset_timeout):
+            return False
+        return self.connected()
+
+    def reset_info(self):
+        if not self.telnet and not self.skip_reset:
+            # New connection can't reset device either
+            return {'reset_error' : self.RAW_RESET_ERROR}
+        return None
+
+    def read(self, count):
+        """! Read data received from socket """
+        if self.rx_pending:
+            # Received while waiting for DUT after reset
+            c, self.rx_pending = self.rx_pending, str()
+            return c
+        # In event driven mode caller already waited for data with select() on self.fileno()
+        return self.__recv(count, 0 if self.event_driven else self.timeout)
+
+    def __recv(self, count, timeout):
+        # Waits up to timeout for data, returns data with Telnet commands stripped
+        c = str()
+        if not self.sock:
+            return c
+        try:
+            if timeout:
+                readable, _, _ = select.select([self.sock], [], [], timeout)
+                if not readable:
+                    return c
+            c = self.sock.recv(count)
+            if not c:
+                self.__lost("socket.recv(%d)"% count, "connection closed by peer")
+                return c
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return str()
+            self.__lost("socket.recv(%d)"% count, e)
+            return str()
+        except select.error as e:
+            self.__lost("select()", e)
+            return str()
+        if self.telnet:
+            c, replies = self.telnet.decode(c)
+            if replies:
+                self.__send(replies)
+        return c
+
+    def write(self, payload, log=False):
+        """! Write data to socket """
+        if self.sock:
+            self.__send(self.telnet.encode(payload) if self.telnet else payload)
+            if log:
+                self.logger.prn_txd(payload)
+        return payload
+
+    def flush(self):
+        pass
+
+    def has_pending_data(self):
+        return bool(self.rx_pending)
+
+    def fileno(self):
+        return self.sock.fileno() if self.sock else None
+
+    def connected(self):
+        return self.sock is not None
+
+    def finish(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def __del__(self):
+        self.finish()
@@ -18,64 +18,334 @@ limitations under the License.
 
 import re
 import uuid
+import select
+import threading
 from time import time
+from collections import deque
 from Queue import Empty as QueueEmpty   # Queue here refers to the module, not a class
 from mbed_host_tests.host_tests_logger import HtrunLogger
+from conn_primitive import host_timestamp, MONOTONIC_CLOCK
+from conn_rxd_filter import RxdLineFilter, RxdRateLimiter
+from conn_framing import FRAMING_OFFER, FRAME_DELIMITER, FrameError, decode_kv_frame
+from conn_bulk import BulkValueAssembler, BULK_ERROR
+from conn_paced import PacedSender
+from conn_capture import CaptureWriter, CAPTURE_RX, CAPTURE_TX
+from conn_fault import FaultInjector
 from conn_primitive_serial import SerialConnectorPrimitive
 from conn_primitive_remote import RemoteConnectorPrimitive
+from conn_primitive_tcp import TcpConnectorPrimitive
+from conn_primitive_sim import SimConnectorPrimitive
+from conn_primitive_replay import ReplayConnectorPrimitive
 
 
 class KiViBufferWalker():
-    """! Simple auxiliary class used to walk through a buffer and search for KV tokens """
-    def __init__(self):
+    """! Simple auxiliary class used to walk through a buffer and search for KV tokens
+    @details Pending (not terminated with '\\n') line is collected in a growable byte
+             buffer. Only newly arrived bytes are scanned for new line characters so long
+             lines (e.g. without '\\n') are not copied and re-split on every append()
+    """
+    OVERFLOW_FLUSH = 'flush'    # Pending line too long is reported as truncated line
+    OVERFLOW_DROP = 'drop'      # Pending line too long is dropped (only counted)
+
+    def __init__(self, max_line_length=0, overflow_policy=OVERFLOW_FLUSH):
+        """! ctor
+        @param max_line_length Maximum size of pending (not terminated with '\\n') line, 0 - unlimited
+        @param overflow_policy What to do with too long pending line, OVERFLOW_FLUSH or OVERFLOW_DROP
+        """
         self.KIVI_REGEX = r"\{\{([\w\d_-]+);([^\}]+)\}\}"
-        self.buff = str()
-        self.kvl = []
+        self.buff = bytearray()
+        self.kvl = deque()
         self.re_kv = re.compile(self.KIVI_REGEX)
-
-    def append(self, payload):
-        """! Append stream buffer with payload and process. Returns non-KV strings"""
-        self.buff += payload
-        lines = self.buff.split('\n')
-        self.buff = lines[-1]   # remaining
-        lines.pop(-1)
+        self.max_line_length = max_line_length
+        self.overflow_policy = overflow_policy
+        self.overflow_count = 0     # How many times pending line exceeded max_line_length
+        self.overflow_bytes = 0     # Bytes flushed or dropped because of overflow
+
+    def append(self, payload, timestamp=None, byte_time=0.0):
+        """! Append stream buffer with payload and process. Returns non-KV strings
+        @param payload Data received from DUT
+        @param timestamp Host timestamp taken when payload was read, if None current time is used
+        @param byte_time Transmission time of one byte (e.g. 10.0 / baudrate). If set, K,V pair
+               timestamps are moved back by time needed to receive bytes which followed its line
+        """
+        if timestamp is None:
+            timestamp = host_timestamp()
+        buff_len = len(self.buff) + len(payload)
         # List of line or strings that did not match K,V pair.
         discarded = []
 
+        # Only payload can contain new line characters
+        lines = []
+        if '\n' not in payload:
+            self.buff.extend(payload)
+        else:
+            # Pending line is usually short, joined with payload and split in one pass
+            lines = (str(self.buff) + payload if self.buff else payload).split('\n')
+            self.buff = bytearray(lines.pop())   # remaining
+
+        line_end = -1   # Position of '\n' ending current line, tracked only with byte_time
         for line in lines:
-            m = self.re_kv.search(line)
-            if m:
-                (key, value) = m.groups()
-                self.kvl.append((key, value, time()))
-                line = line.strip()
-                match = m.group(0)
-                pos = line.find(match)
-                before = line[:pos]
-                after = line[pos + len(match):]
-                if len(before) > 0:
-                    discarded.append(before)
-                if len(after) > 0:
-                    # not a K,V pair part
-                    discarded.append(after)
-            else:
+            if byte_time:
+                line_end += len(line) + 1
+            if '{{' not in line:
                 # not a K,V pair
                 discarded.append(line)
+                continue
+
+            # Line can contain more than one K,V pair, text between them is not a K,V pair part
+            stripped = line.strip()
+            m = self.re_kv.search(stripped)
+            if m is None:
+                discarded.append(line)
+                continue
+            pos = 0
+            while m:
+                kv_timestamp = timestamp
+                if byte_time:
+                    # Bytes received after this K,V pair in the same read
+                    stripped_start = line_end - len(line.lstrip())     # Position of stripped line in buffer
+                    kv_timestamp -= (buff_len - stripped_start - m.end()) * byte_time
+                self.kvl.append(m.groups() + (kv_timestamp,))
+                if m.start() > pos:
+                    discarded.append(stripped[pos:m.start()])
+                pos = m.end()
+                m = self.re_kv.search(stripped, pos)
+            if pos < len(stripped):
+                discarded.append(stripped[pos:])
+
+        if self.max_line_length and len(self.buff) > self.max_line_length:
+            self.__overflow(discarded)
         return discarded
 
+    def __overflow(self, discarded):
+        """! Handles pending line longer than max_line_length
+        @details Pending line is flushed as truncated line (or dropped). If pending line
+                 contains '{{' we keep it and what follows so we can resynchronise on
+                 next K,V pair
+        @param discarded List of non-KV strings, flushed line is appended to it
+        """
+        self.overflow_count += 1
+        resync = self.buff.rfind('{{')
+        if resync <= 0 or len(self.buff) - resync > self.max_line_length:
+            resync = len(self.buff)
+            if self.buff.endswith('{'):
+                resync -= 1     # Possible beginning of '{{'
+        self.overflow_bytes += resync
+        if self.overflow_policy == self.OVERFLOW_FLUSH:
+            discarded.append(str(self.buff[:resync]))
+        del self.buff[:resync]
+
     def search(self):
         """! Check if there is a KV value in buffer """
         return len(self.kvl) > 0
 
     def pop_kv(self):
         if len(self.kvl):
-            return self.kvl.pop(0)
+            return self.kvl.popleft()
         return None, None, time()
 
 
+class FramedKiViBufferWalker(KiViBufferWalker):
+    """! KiViBufferWalker which also decodes binary framed K,V pairs (see conn_framing)
+    @details Until enable_framing() is called (DUT accepted framing during __sync) stream
+             is parsed as text only, so stray 0x00 bytes (e.g. while DUT resets) can't hide
+             __sync reply. Data following __sync reply line can contain frames, it is held
+             unparsed until caller decides about framing with enable_framing(),
+             decline_framing() or release() (faulty __sync reply). With framing enabled bytes
+             between frame delimiters (0x00) are alternately frame content and DUT output
+             text, text is parsed as in KiViBufferWalker. Content which can't be decoded as
+             a frame, or which is longer than max. frame length without closing delimiter,
+             is parsed as text (counted in frame_errors). Closing delimiter of such content
+             is treated as opening one, so parser resynchronises on next valid frame
+    """
+    MAX_FRAME_LENGTH = 1 << 16  # Used when max_line_length is not set
+    SYNC_REPLY_REGEX = r"\{\{__sync;[^\}\n]+\}\}"
+
+    def __init__(self, max_line_length=0, overflow_policy=KiViBufferWalker.OVERFLOW_FLUSH):
+        KiViBufferWalker.__init__(self, max_line_length=max_line_length, overflow_policy=overflow_policy)
+        self.frame_buff = bytearray()
+        self.frame_scan_pos = 0 # frame_buff before this offset has no delimiter
+        self.framing = False    # True if DUT accepted framing
+        self.sync_pending = True    # True until caller decided about framing
+        self.held = str()       # Data following __sync reply, see release()
+        self.re_sync = re.compile(self.SYNC_REPLY_REGEX)
+        self.in_frame = False   # True if last delimiter opened a frame
+        self.frame_count = 0    # Statistics
+        self.frame_errors = 0
+
+    def enable_framing(self, timestamp=None, byte_time=0.0):
+        """! Starts decoding frames, called when DUT accepted framing
+        @details Data held after __sync reply is parsed as frames and text
+        @return Non-KV strings found in held data
+        """
+        self.framing = True
+        self.sync_pending = False
+        return self.release(timestamp, byte_time)
+
+    def decline_framing(self, timestamp=None, byte_time=0.0):
+        """! Stops holding data after __sync reply, called when DUT does not support framing
+        @return Non-KV strings found in held data
+        """
+        self.sync_pending = False
+        return self.release(timestamp, byte_time)
+
+    def release(self, timestamp=None, byte_time=0.0):
+        """! Parses data held after __sync reply
+        @return Non-KV strings found in held data
+        """
+        held, self.held = self.held, str()
+        return self.append(held, timestamp, byte_time) if held else []
+
+    def append(self, payload, timestamp=None, byte_time=0.0):
+        if self.held:
+            # Caller didn't release data held after __sync reply yet
+            self.held += payload
+            return []
+        if not self.framing:
+            if not self.sync_pending or '\n' not in payload:
+                return KiViBufferWalker.append(self, payload, timestamp, byte_time)
+            # Text parsing stops after __sync reply line, rest is held
+            data = str(self.buff) + payload
+            m = self.re_sync.search(data)
+            end = data.find('\n', m.end()) if m else -1
+            if end == -1:
+                return KiViBufferWalker.append(self, payload, timestamp, byte_time)
+            del self.buff[:]
+            self.held = data[end + 1:]
+            if timestamp is None:
+                timestamp = host_timestamp()
+            # Held bytes were received after __sync reply
+            return KiViBufferWalker.append(self, data[:end + 1], timestamp - len(self.held) * byte_time, byte_time)
+        if timestamp is None:
+            timestamp = host_timestamp()
+        self.frame_buff.extend(payload)
+        discarded = []
+        while True:
+            pos = self.frame_buff.find(FRAME_DELIMITER, self.frame_scan_pos)
+            if pos == -1:
+                # Long frame arriving in many reads is not scanned again
+                self.frame_scan_pos = len(self.frame_buff)
+                break
+            chunk = str(self.frame_buff[:pos])
+            del self.frame_buff[:pos + 1]
+            self.frame_scan_pos = 0
+            if not self.in_frame:
+                if chunk:
+                    discarded.extend(KiViBufferWalker.append(self, chunk, timestamp, byte_time))
+                self.in_frame = True
+                continue
+            if not chunk:
+                continue    # Two delimiters in a row, e.g. after broken frame
+            try:
+                (key, value) = decode_kv_frame(chunk)
+            except FrameError:
+                # E.g. text after stray 0x00 byte
+                self.frame_errors += 1
+                discarded.extend(KiViBufferWalker.append(self, chunk, timestamp, byte_time))
+                continue
+            self.frame_count += 1
+            # Bytes received after this frame in the same read
+            self.kvl.append((key, value, timestamp - len(self.frame_buff) * byte_time))
+            self.in_frame = False
+
+        if self.in_frame and len(self.frame_buff) > (self.max_line_length or self.MAX_FRAME_LENGTH):
+            # Unterminated frame is too long, it was not a frame
+            self.frame_errors += 1
+            self.in_frame = False
+        if not self.in_frame and self.frame_buff:
+            discarded.extend(KiViBufferWalker.append(self, str(self.frame_buff), timestamp, byte_time))
+            del self.frame_buff[:]
+            self.frame_scan_pos = 0
+        return discarded
+
+
+# Max. number of K,V pairs sent to DUT with one write (and read from host test in one loop)
+TX_BATCH_LIMIT = 1000
+
+# First __sync retry interval with --fast-sync, doubled with each retry up to sync_timeout
+FAST_SYNC_INTERVAL = 0.05
+
+
+class ReadSizer(object):
+    """! Chooses number of bytes requested by each read from DUT
+    @details Read size covers bytes DUT can send (at connector's baud rate) during one
+             connection loop period, measured between reads, or average number of bytes
+             returned by reads if it is larger (e.g. USB CDC devices ignore baud rate),
+             with headroom. Without known baud rate read size starts at DEFAULT_SIZE.
+             Read size is doubled after a read returned as many bytes as requested (more
+             data was probably waiting). Fixed read size disables adaptation
+    """
+    DEFAULT_SIZE = 2304     # 0.2 sec of data at 115200 baud
+    MIN_SIZE = 64
+    MAX_SIZE = 65536
+    HEADROOM = 2.0          # Read size / bytes expected in one loop period
+    AVERAGE_WEIGHT = 0.1    # Weight of last read in moving averages
+
+    def __init__(self, baudrate=None, fixed_size=0):
+        """! ctor
+        @param baudrate Baud rate of DUT connection (None if not known)
+        @param fixed_size Read size in bytes, 0 for adaptive read size
+        """
+        self.byte_rate = int(baudrate) / 10.0 if baudrate else 0.0  # 8N1: 10 bits per byte
+        self.fixed_size = int(fixed_size or 0)
+        self.size = self.fixed_size or self.DEFAULT_SIZE
+        self.period = None      # Moving average of loop period
+        self.average = 0.0      # Moving average of bytes per read
+        self.last_read = None
+        self.reads = 0          # Statistics
+        self.read_bytes = 0
+        self.full_reads = 0
+        self.max_size = self.size
+
+    def update(self, count, timestamp):
+        """! Records result of read and chooses size of next read
+        @param count Number of bytes read
+        @param timestamp Host timestamp taken before read
+        """
+        self.reads += 1
+        self.read_bytes += count
+        if self.last_read is not None:
+            period = timestamp - self.last_read
+            if self.period is None:
+                self.period = period
+            else:
+                self.period += (period - self.period) * self.AVERAGE_WEIGHT
+        self.average += (count - self.average) * self.AVERAGE_WEIGHT
+        self.last_read = timestamp
+
+        full = count >= self.size
+        if full:
+            self.full_reads += 1
+        if self.fixed_size:
+            return
+        size = self.size
+        if self.byte_rate and self.period:
+            size = max(self.byte_rate * self.period, self.average) * self.HEADROOM
+        if full:
+            size = max(size, self.size * 2)
+        size = min(max(int(size), self.MIN_SIZE), self.MAX_SIZE)
+        self.size = (size + self.MIN_SIZE - 1) // self.MIN_SIZE * self.MIN_SIZE
+        self.max_size = max(self.max_size, self.size)
+
+    def stats(self):
+        """! Returns statistics as dictionary """
+        return {
+            'size' : self.size,
+            'max_size' : self.max_size,
+            'reads' : self.reads,
+            'bytes' : self.read_bytes,
+            'bytes_per_read' : float(self.read_bytes) / self.reads if self.reads else 0.0,
+            'full_reads' : self.full_reads,
+            'period' : self.period or 0.0,
+        }
+
+
 def conn_primitive_factory(conn_resource, config, event_queue, logger):
     """! Factory producing connectors based on type and config
     @param conn_resource Name of connection primitive (e.g. 'serial' for
-           local serial port connection or 'grm' for global resource manager)
+           local serial port connection, 'tcp' for serial port exposed over
+           network, 'sim' for DUT simulator, 'replay' for DUT output recorded
+           with --capture-file or 'grm' for global resource manager)
     @param event_queue Even queue of Key-Value protocol
     @param config Global configuration for connection process
     @param logger Host Test logger instance
@@ -99,6 +369,26 @@ def conn_primitive_factory(conn_resource, config, event_queue, logger):
             port,
             baudrate,
             config=config)
+    elif conn_resource == 'tcp':
+        # Serial port over network, raw TCP or RFC 2217 (e.g. ser2net)
+        logger.prn_inf("initializing TCP connection... ")
+        connector = TcpConnectorPrimitive(
+            'TCP',
+            config.get('tcp_host'),
+            config.get('tcp_port'),
+            config=config)
+    elif conn_resource == 'sim':
+        # Simulated DUT, no hardware needed
+        logger.prn_inf("initializing DUT simulator... ")
+        connector = SimConnectorPrimitive(
+            'SIM',
+            config=config)
+    elif conn_resource == 'replay':
+        # DUT output recorded earlier, no hardware needed
+        logger.prn_inf("initializing capture replay... ")
+        connector = ReplayConnectorPrimitive(
+            'RPLY',
+            config=config)
     elif conn_resource == 'grm':
         # Start GRM (Gloabal Resource Mgr) collection
         logger.prn_inf("initializing global resource mgr listener... ")
@@ -112,6 +402,36 @@ def conn_primitive_factory(conn_resource, config, event_queue, logger):
     return connector
 
 
+def queue_fileno(queue):
+    """! File descriptor of multiprocessing.Queue reader pipe (or ThreadQueue.fileno())
+    @details Pipe becomes readable when there is a message in the queue
+    @return File descriptor or None if queue has no reader pipe
+    """
+    if hasattr(queue, 'fileno'):
+        return queue.fileno()
+    reader = getattr(queue, '_reader', None)
+    if reader is not None:
+        try:
+            return reader.fileno()
+        except (AttributeError, IOError, OSError):
+            pass
+    return None
+
+
+def wait_for_io(fds, timeout):
+    """! Blocks until at least one of file descriptors is readable or timeout expires
+    @param fds List of file descriptors
+    @param timeout Timeout in seconds
+    @return List of readable file descriptors
+    """
+    try:
+        readable, _, _ = select.select(fds, [], [], max(timeout, 0))
+    except (select.error, IOError, OSError, ValueError):
+        # E.g. interrupted system call or connector closed meanwhile
+        readable = []
+    return readable
+
+
 def conn_process(event_queue, dut_event_queue, config):
 
     logger = HtrunLogger('CONN')
@@ -121,13 +441,39 @@ def conn_process(event_queue, dut_event_queue, config):
     # NOTE: Do not send any other Key-Value pairs before this!
     event_queue.put(('__conn_process_start', 1, time()))
 
+    if not MONOTONIC_CLOCK:
+        logger.prn_wrn("monotonic clock not available (install 'monotonic' package), event timestamps follow wall clock")
+
     # Configuration of conn_opriocess behaviour
     sync_behavior = int(config.get('sync_behavior', 1))
     sync_timeout = config.get('sync_timeout', 1.0)
     conn_resource = config.get('conn_resource', 'serial')
+    max_line_length = int(config.get('max_line_length', 0) or 0)
+    line_overflow = config.get('line_overflow', KiViBufferWalker.OVERFLOW_FLUSH)
+    io_mode = config.get('io_mode', 'poll')
+    timestamp_interpolation = config.get('timestamp_interpolation', False)
+    io_threads = config.get('io_threads', False)
+    serial_output_file = config.get('serial_output_file', None)
+    kv_framing = config.get('kv_framing', False)
+    read_size = config.get('read_size', 0)
+    fast_sync = config.get('fast_sync', False)
+    capture_file = config.get('capture_file', None)
+    fault_inject = config.get('fault_inject', None)
+
+    # Chunked bulk values are reassembled here, host test gets one event per value
+    bulk = BulkValueAssembler()
+    rxd_filter = RxdLineFilter(include=config.get('rxd_include'), exclude=config.get('rxd_exclude'))
+    rxd_limiter = RxdRateLimiter(rate=config.get('rxd_rate_limit', 0),
+        sample_first=config.get('rxd_sample_first', 0),
+        sample_every=config.get('rxd_sample_every', 0))
 
     # Create connector instance with proper configuration
     connector = conn_primitive_factory(conn_resource, config, event_queue, logger)
+    if fault_inject:
+        # Data received from DUT is corrupted on purpose (recovery benchmarks)
+        connector = FaultInjector(connector, fault_inject, seed=config.get('fault_seed', 0))
+    connector.txd_log = config.get('txd_log', 'all')
+    connector.read_in_waiting = config.get('read_in_waiting', False)
 
     # If the connector failed, stop the process now
     if not connector.connected():
@@ -136,8 +482,111 @@ def conn_process(event_queue, dut_event_queue, config):
         event_queue.put(('__notify_conn_lost', connector.error(), time()))
         return 0
 
+    # Dedicated reader and writer threads: reads and writes to DUT do not block each other
+    if io_threads and not connector.start_io_threads():
+        logger.prn_wrn("connector does not support reader and writer threads")
+
+    # Event driven I/O: instead of sleep-and-poll wait until DUT sends data or host test sends message to DUT
+    io_fds = None
+    if io_mode == 'select':
+        io_fds = [connector.fileno(), queue_fileno(dut_event_queue)]
+        if None in io_fds:
+            io_fds = None
+            logger.prn_wrn("event driven I/O not supported by connector or platform, polling instead")
+        else:
+            connector.event_driven = True
+            logger.prn_inf("event driven I/O enabled")
+
+    # K,V pair timestamps can be corrected by transmission time of bytes read after them
+    byte_time = 0.0
+    baudrate = getattr(connector, 'baudrate', None)
+    if timestamp_interpolation and baudrate:
+        byte_time = 10.0 / int(baudrate)    # 8N1: start bit, 8 data bits and stop bit
+        logger.prn_inf("K,V timestamps interpolated with %.1f usec per byte"% (byte_time * 1e6))
+
+    # Read size follows DUT data rate unless --read-size is given
+    read_sizer = ReadSizer(baudrate=baudrate, fixed_size=read_size)
+    logger.prn_inf("read size %d bytes (%s)"% (read_sizer.size, 'fixed' if read_size else 'adaptive'))
+
+    # All DUT output is saved to --serial-output-file, also lines dropped by --rxd-filter
+    output_file = None
+    if serial_output_file:
+        output_file = open(serial_output_file, "a")
+
+    # Raw capture of all bytes read from and written to DUT (--capture-file)
+    capture = None
+    if capture_file:
+        capture = CaptureWriter(capture_file)
+        logger.prn_inf("capturing DUT traffic to '%s'"% capture_file)
+
+    def __capture_tx(payload):
+        if capture:
+            capture.write(CAPTURE_TX, host_timestamp(), payload)
+
+    def __finish():
+        if rxd_filter.enabled():
+            logger.prn_inf("rxd filter: %d lines passed, %d lines dropped"% (rxd_filter.passed, rxd_filter.dropped))
+        if rxd_limiter.enabled():
+            logger.prn_inf("rxd rate limit: %d lines seen, %d sampled out, %d rate limited"% (rxd_limiter.seen,
+                rxd_limiter.sampled_out,
+                rxd_limiter.rate_limited))
+        if kv_framing:
+            logger.prn_inf("binary framed K,V pairs: %d received, %d broken frames parsed as text"% (kv_buffer.frame_count,
+                kv_buffer.frame_errors))
+        read_stats = read_sizer.stats()
+        logger.prn_inf("reads: %d, %d bytes (%.1f bytes/read), read size %d bytes (max %d), %d full reads, loop period %.2f ms"% (read_stats['reads'],
+            read_stats['bytes'],
+            read_stats['bytes_per_read'],
+            read_stats['size'],
+            read_stats['max_size'],
+            read_stats['full_reads'],
+            read_stats['period'] * 1000))
+        if paced:
+            logger.prn_wrn("paced send of '%s' aborted after %d of %d chunks"% (paced.key, paced.sent, len(paced.chunks)))
+        if bulk.completed or bulk.failed:
+            logger.prn_inf("bulk values: %d received (%d chunks), %d failed"% (bulk.completed, bulk.chunks, bulk.failed))
+        if output_file:
+            output_file.close()
+        if capture:
+            logger.prn_inf("captured %d records, %d bytes"% (capture.records, capture.bytes))
+            capture.close()
+        connector.finish()
+        if fault_inject:
+            # Injected faults are reported in host test summary
+            event_queue.put(('__fault_stats', connector.stats(), time()))
+
     # Create simple buffer we will use for Key-Value protocol data
-    kv_buffer = KiViBufferWalker()
+    # With --kv-framing binary frames are recognised in the stream after DUT accepted framing
+    walker_class = FramedKiViBufferWalker if kv_framing else KiViBufferWalker
+    kv_buffer = walker_class(max_line_length=max_line_length, overflow_policy=line_overflow)
+    if max_line_length:
+        logger.prn_inf("pending line length limited to %d bytes (overflow policy '%s')"% (max_line_length, line_overflow))
+
+    def __print_lines(lines, events, timestamp):
+        # DUT output lines (non K,V strings) are logged and sent to host test
+        if output_file and lines:
+            output_file.write(''.join("%s\n" % line for line in lines))
+            output_file.flush()
+        for line in lines:
+            if rxd_filter.match(line) and rxd_limiter.allow(timestamp):
+                logger.prn_rxd(line)
+                events.append(('__rxd_line', line, timestamp))
+
+    # Paced send to DUT in progress (see BaseHostTestAbstract.send_kv_paced()), K,V pairs sent
+    # by host test meanwhile wait in tx_backlog so order of messages is preserved
+    paced = None
+    tx_backlog = deque()
+
+    def __paced_done(paced, timestamp):
+        report = paced.report(timestamp)
+        if report['error']:
+            logger.prn_err("paced send of '%s' failed, %s"% (paced.key, report['error']))
+        logger.prn_inf("paced send of '%s': %d bytes in %d chunks, %.2f sec, %.1f bytes/sec"% (paced.key,
+            report['bytes'],
+            report['chunks'],
+            report['seconds'],
+            report['bytes_per_sec']))
+        event_queue.put(('__paced_kv_done', report, time()))
 
     # List of all sent to target UUIDs (if multiple found)
     sync_uuid_list = []
@@ -145,6 +594,11 @@ def conn_process(event_queue, dut_event_queue, config):
     # We will ignore all kv pairs before we get sync back
     sync_uuid_discovered = False
 
+    # Fast sync: __sync is resent with exponential backoff and as soon as DUT sends
+    # anything after reset (DUT is alive), instead of every sync_timeout seconds
+    sync_interval = FAST_SYNC_INTERVAL if fast_sync else sync_timeout
+    dut_alive = False
+
     def __send_sync(timeout=None):
         sync_uuid = str(uuid.uuid4())
         # Handshake, we will send {{sync;UUID}} preamble and wait for mirrored reply
@@ -152,85 +606,250 @@ def conn_process(event_queue, dut_event_queue, config):
             logger.prn_inf("resending new preamble '%s' after %0.2f sec"% (sync_uuid, timeout))
         else:
             logger.prn_inf("sending preamble '%s'"% sync_uuid)
-        connector.write_kv('__sync', sync_uuid)
+        # Binary framed K,V pairs are offered to DUT in __sync value
+        __capture_tx(connector.write_kv('__sync', sync_uuid + FRAMING_OFFER if kv_framing else sync_uuid))
         return sync_uuid
 
-    # Send simple string to device to 'wake up' greentea-client k-v parser
-    connector.write("mbed" * 10, log=True)
-
-    # Sync packet management allows us to manipulate the way htrun sends __sync packet(s)
-    # With current settings we can force on htrun to send __sync packets in this manner:
-    #
-    # * --sync=0        - No sync packets will be sent to target platform
-    # * --sync=-10      - __sync packets will be sent unless we will reach
-    #                     timeout or proper response is sent from target platform
-    # * --sync=N        - Send up to N __sync packets to target platform. Response
-    #                     is sent unless we get response from target platform or
-    #                     timeout occur
-
-    if sync_behavior > 0:
-        # Sending up to 'n' __sync packets
-        logger.prn_inf("sending up to %s __sync packets (specified with --sync=%s)"% (sync_behavior, sync_behavior))
-        sync_uuid_list.append(__send_sync())
-        sync_behavior -= 1
-    elif sync_behavior == 0:
-        # No __sync packets
-        logger.prn_wrn("skipping __sync packet (specified with --sync=%s)"% sync_behavior)
-    else:
-        # Send __sync until we go reply
-        logger.prn_inf("sending multiple __sync packets (specified with --sync=%s)"% sync_behavior)
-        sync_uuid_list.append(__send_sync())
-        sync_behavior -= 1
+    def __start_sync(sync_behavior):
+        # Send simple string to device to 'wake up' greentea-client k-v parser
+        __capture_tx(connector.write("mbed" * 10, log=True))
+
+        # Sync packet management allows us to manipulate the way htrun sends __sync packet(s)
+        # With current settings we can force on htrun to send __sync packets in this manner:
+        #
+        # * --sync=0        - No sync packets will be sent to target platform
+        # * --sync=-10      - __sync packets will be sent unless we will reach
+        #                     timeout or proper response is sent from target platform
+        # * --sync=N        - Send up to N __sync packets to target platform. Response
+        #                     is sent unless we get response from target platform or
+        #                     timeout occur
+
+        if sync_behavior > 0:
+            # Sending up to 'n' __sync packets
+            logger.prn_inf("sending up to %s __sync packets (specified with --sync=%s)"% (sync_behavior, sync_behavior))
+            sync_uuid_list.append(__send_sync())
+            sync_behavior -= 1
+        elif sync_behavior == 0:
+            # No __sync packets
+            logger.prn_wrn("skipping __sync packet (specified with --sync=%s)"% sync_behavior)
+        else:
+            # Send __sync until we go reply
+            logger.prn_inf("sending multiple __sync packets (specified with --sync=%s)"% sync_behavior)
+            sync_uuid_list.append(__send_sync())
+            sync_behavior -= 1
+        return sync_behavior
+
+    sync_behavior_initial = sync_behavior
+    sync_start = time()
+    sync_behavior = __start_sync(sync_behavior)
 
     loop_timer = time()
     while True:
 
+        if io_fds:
+            # Wake up when data is available, on time to resend __sync or periodically
+            # to check connection state
+            io_timeout = 1.0
+            if not sync_uuid_discovered and sync_behavior != 0:
+                io_timeout = min(io_timeout, sync_interval - (time() - loop_timer))
+            if paced:
+                # Wake up when rate limit allows to send next chunk
+                paced_wait = paced.wait_time(host_timestamp())
+                if paced_wait is not None:
+                    io_timeout = min(io_timeout, paced_wait)
+            if connector.has_pending_data() or (tx_backlog and not paced):
+                io_timeout = 0
+            wait_for_io(io_fds, io_timeout)
+
         # Check if connection is lost to serial
         if not connector.connected():
             error_msg = connector.error()
-            connector.finish()
+            __finish()
             event_queue.put(('__notify_conn_lost', error_msg, time()))
             break
 
-        # Send data to DUT
-        try:
-            (key, value, _) = dut_event_queue.get(block=False)
-        except QueueEmpty:
-            pass # Check if target sent something
-        else:
+        # Send data to DUT: pending K,V pairs are sent with one write. Host test queue is
+        # read even if K,V pairs wait for paced send, so __host_test_finished and __reset_dut
+        # are not delayed until paced send ends
+        key = None
+        for _ in range(TX_BATCH_LIMIT):
+            try:
+                (key, value, _) = dut_event_queue.get(block=False)
+            except QueueEmpty:
+                key = None
+                break # Check if target sent something
+            if (key == '__host_test_finished' and value == True) or key == '__reset_dut':
+                break
+            tx_backlog.append((key, value))
+            key = None
+        kvs = []
+        while (tx_backlog or paced) and (len(kvs) < TX_BATCH_LIMIT or key is not None):
+            if paced:
+                now = host_timestamp()
+                kvs.extend(paced.next_chunks(now))
+                if not paced.done():
+                    break
+                __paced_done(paced, now)
+                paced = None
+                continue
+            (tx_key, tx_value) = tx_backlog.popleft()
+            if tx_key != '__paced_kv':
+                kvs.append((tx_key, tx_value))
+                continue
+            # Large value: chunks are sent by paced sender, after K,V pairs queued before it
+            overhead = len(connector.format_kv(tx_value['key'], ''))
+            paced = PacedSender(tx_value['key'], tx_value['value'], host_timestamp(),
+                chunk_size=tx_value.get('chunk_size', 64),
+                rate=tx_value.get('rate'),
+                ack_window=tx_value.get('ack_window'),
+                ack_timeout=tx_value.get('ack_timeout', 5.0),
+                overhead=overhead,
+                encoding=tx_value.get('encoding', 'raw'),
+                framed=connector.kv_framing)
+            logger.prn_inf("paced send of '%s': %d chunks, rate limit %s, ack window %s"% (paced.key,
+                len(paced.chunks),
+                "%d bytes/sec"% paced.rate if paced.rate else 'none',
+                paced.ack_window or 'none'))
+        if kvs:
+            __capture_tx(connector.write_kvs(kvs))
+
+        if key is not None:
             # Return if state machine in host_test_default has finished to end process
-            if key == '__host_test_finished' and value == True:
+            if key == '__host_test_finished':
                 logger.prn_inf("received special even '%s' value='%s', finishing"% (key, value))
-                connector.finish()
+                __finish()
                 return 0
-            connector.write_kv(key, value)
-
-        # Since read is done every 0.2 sec, with maximum baud rate we can receive 2304 bytes in one read in worst case.
-        data = connector.read(2304)
+            elif key == '__reset_dut':
+                # Reset DUT in place and synchronize again, connection is reused
+                logger.prn_inf("received special event '%s' value='%s', resetting DUT"% (key, value))
+                if paced:
+                    paced.error = "DUT reset"
+                    __paced_done(paced, host_timestamp())
+                    paced = None
+                if not connector.reset(value):
+                    reset_info = connector.reset_info()
+                    if reset_info and reset_info.get('reset_error'):
+                        # DUT can't be reset, host test must not continue as if it was
+                        logger.prn_err("in-place reset failed: %s"% reset_info['reset_error'])
+                        __finish()
+                        event_queue.put(('__notify_conn_lost', reset_info['reset_error'], time()))
+                        return 0
+                    # Connection can't be reused (e.g. serial port disappeared), main event loop
+                    # will start new connection process
+                    logger.prn_wrn("in-place reset failed, connection process will be restarted")
+                    __finish()
+                    event_queue.put(('__conn_process_restart', reset_info, time()))
+                    return 0
+                kv_buffer = walker_class(max_line_length=max_line_length, overflow_policy=line_overflow)
+                connector.kv_framing = False
+                sync_uuid_discovered = False
+                del sync_uuid_list[:]
+                sync_interval = FAST_SYNC_INTERVAL if fast_sync else sync_timeout
+                dut_alive = False
+                sync_start = time()
+                sync_behavior = __start_sync(sync_behavior_initial)
+                loop_timer = time()
+
+        # Read size covers data DUT can send during one loop period (see ReadSizer)
+        # Timestamp of events is host time captured right after the read (see host_timestamp())
+        read_start = host_timestamp()
+        data, read_timestamp = connector.read_timestamped(read_sizer.size)
+        read_sizer.update(len(data), read_start)
+        if capture:
+            if data:
+                capture.write(CAPTURE_RX, read_timestamp, data)
+            else:
+                # DUT is idle, capture tail is not lost if process is killed
+                capture.flush()
         if data:
+            # All events parsed from this read are sent to main event loop in one frame
+            events = []
+
+            if fast_sync and not dut_alive and not sync_uuid_discovered:
+                # First bytes sent by DUT after reset, sync now unless __sync was just sent
+                dut_alive = True
+                sync_interval = FAST_SYNC_INTERVAL
+                if sync_behavior != 0 and time() - loop_timer > FAST_SYNC_INTERVAL:
+                    logger.prn_inf("DUT is alive, sending __sync now")
+                    sync_uuid_list.append(__send_sync())
+                    loop_timer = time()
+
             # Stream data stream KV parsing
-            print_lines = kv_buffer.append(data)
-            for line in print_lines:
-                logger.prn_rxd(line)
-                event_queue.put(('__rxd_line', line, time()))
+            overflow_count = kv_buffer.overflow_count
+            print_lines = kv_buffer.append(data, timestamp=read_timestamp, byte_time=byte_time)
+            __print_lines(print_lines, events, read_timestamp)
+            if kv_buffer.overflow_count != overflow_count:
+                # Diagnostic event: DUT sent line longer than --max-line-length
+                logger.prn_wrn("line buffer overflow #%d, %d bytes %s so far"% (kv_buffer.overflow_count,
+                    kv_buffer.overflow_bytes,
+                    'dropped' if line_overflow == KiViBufferWalker.OVERFLOW_DROP else 'flushed'))
+                events.append(('__rxd_overflow', kv_buffer.overflow_count, read_timestamp))
             while kv_buffer.search():
                 key, value, timestamp = kv_buffer.pop_kv()
 
                 if sync_uuid_discovered:
-                    event_queue.put((key, value, timestamp))
-                    logger.prn_inf("found KV pair in stream: {{%s;%s}}, queued..."% (key, value))
+                    if key == PacedSender.ACK_KEY:
+                        # Flow control of paced send, late acks are dropped
+                        if paced:
+                            paced.ack(value, timestamp)
+                        continue
+                    bulk_events = bulk.feed(key, value, timestamp)
+                    if bulk_events is None:
+                        events.append((key, value, timestamp))
+                        logger.prn_inf("found KV pair in stream: {{%s;%s}}, queued..."% (key, value))
+                        continue
+                    for (key, value, timestamp) in bulk_events:
+                        if key == BULK_ERROR:
+                            logger.prn_err("bulk value transfer failed, %s"% value)
+                        else:
+                            logger.prn_inf("found bulk value in stream: {{%s;...}} %d bytes, queued..."% (key, len(value)))
+                        events.append((key, value, timestamp))
                 else:
                     if key == '__sync':
+                        framing_accepted = False
+                        if kv_framing:
+                            # DUT which doesn't support framing mirrors whole __sync value
+                            framing_accepted = not value.endswith(FRAMING_OFFER)
+                            if not framing_accepted:
+                                value = value[:-len(FRAMING_OFFER)]
                         if value in sync_uuid_list:
                             sync_uuid_discovered = True
-                            event_queue.put((key, value, time()))
+                            events.append((key, value, timestamp))
                             idx = sync_uuid_list.index(value)
                             logger.prn_inf("found SYNC in stream: {{%s;%s}} it is #%d sent, queued..."% (key, value, idx))
+                            logger.prn_inf("synchronized %.3f sec after first __sync (%d __sync sent)"% (timestamp - sync_start, len(sync_uuid_list)))
+                            if kv_framing:
+                                # Data received after __sync reply is parsed now, K,V pairs found
+                                # in it are handled by this loop
+                                connector.kv_framing = framing_accepted
+                                if framing_accepted:
+                                    logger.prn_inf("DUT accepted binary framed K,V pairs")
+                                    __print_lines(kv_buffer.enable_framing(read_timestamp, byte_time), events, read_timestamp)
+                                else:
+                                    logger.prn_wrn("DUT does not support binary framed K,V pairs, using text K,V pairs")
+                                    __print_lines(kv_buffer.decline_framing(read_timestamp, byte_time), events, read_timestamp)
                         else:
                             logger.prn_err("found faulty SYNC in stream: {{%s;%s}}, ignored..."% (key, value))
+                            if kv_framing:
+                                __print_lines(kv_buffer.release(read_timestamp, byte_time), events, read_timestamp)
                     else:
                         logger.prn_wrn("found KV pair in stream: {{%s;%s}}, ignoring..."% (key, value))
 
+            event_queue.put_frame(events)
+
+        # Periodic report of DUT output lines dropped by --rxd-rate-limit / --rxd-sample-*
+        if rxd_limiter.enabled():
+            now = host_timestamp()
+            dropped = rxd_limiter.report(now)
+            if dropped:
+                logger.prn_wrn("%d lines of DUT output dropped (%d sampled out, %d rate limited so far)"% (dropped['dropped'],
+                    dropped['sampled_out'],
+                    dropped['rate_limited']))
+                event_queue.put(('__rxd_dropped', dropped, now))
+
+        # Bounded event queue: let main event loop know about events spilled to disk
+        event_queue.flush()
+
         if not sync_uuid_discovered:
             # Resending __sync after 'sync_timeout' secs (default 1 sec)
             # to target platform. If 'sync_behavior' counter is != 0 we
@@ -240,9 +859,37 @@ def conn_process(event_queue, dut_event_queue, config):
 
             if sync_behavior != 0:
                 time_to_sync_again = time() - loop_timer
-                if time_to_sync_again > sync_timeout:
+                if time_to_sync_again > sync_interval:
                     sync_uuid_list.append(__send_sync(timeout=time_to_sync_again))
-                    sync_behavior -= 1
+                    # With --fast-sync only retries after full sync_timeout are counted by --sync
+                    if sync_interval >= sync_timeout:
+                        sync_behavior -= 1
+                    sync_interval = min(sync_interval * 2, sync_timeout)
                     loop_timer = time()
 
     return 0
+
+
+class ConnThread(threading.Thread):
+    """! Runs conn_process() in a thread of host test process (--conn-mode thread)
+    @details Alternative to multiprocessing.Process: no process spawn and no pickling of
+             events. Implements subset of multiprocessing.Process API used by run_test()
+    """
+    def __init__(self, event_queue, dut_event_queue, config):
+        threading.Thread.__init__(self, name='conn_thread')
+        self.daemon = True
+        self.event_queue = event_queue
+        self.dut_event_queue = dut_event_queue
+        self.config = config
+        self.exitcode = None
+
+    def run(self):
+        try:
+            self.exitcode = conn_process(self.event_queue, self.dut_event_queue, self.config)
+        except:
+            self.exitcode = 1
+            raise
+
+    def terminate(self):
+        """! Threads can't be killed, ask connection loop to finish instead """
+        self.dut_event_queue.put(('__host_test_finished', True, time()))
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import re
+
+
+class RxdLineFilter(object):
+    """! Filters lines of DUT output (not K,V pairs) in connection process before they are logged and queued
+    @details Line passes if it matches any of include patterns (or there are no include
+             patterns) and does not match any of exclude patterns. Patterns are regular
+             expressions searched anywhere in the line, each list is compiled once
+    """
+
+    def __init__(self, include=None, exclude=None):
+        """! ctor
+        @param include List of regular expressions, line must match one of them
+        @param exclude List of regular expressions, line must not match any of them
+        """
+        self.re_include = self.__compile(include)
+        self.re_exclude = self.__compile(exclude)
+        self.passed = 0     # Statistics
+        self.dropped = 0
+
+    def __compile(self, patterns):
+        if not patterns:
+            return None
+        return re.compile('|'.join('(?:%s)'% p for p in patterns))
+
+    def enabled(self):
+        """! Returns True if there is at least one include or exclude pattern """
+        return self.re_include is not None or self.re_exclude is not None
+
+    def match(self, line):
+        """! Checks (and counts) if line passes the filter
+        @param line Line of DUT output
+        @return True if line should be logged and queued
+        """
+        if ((self.re_include is not None and not self.re_include.search(line)) or
+            (self.re_exclude is not None and self.re_exclude.search(line))):
+            self.dropped += 1
+            return False
+        self.passed += 1
+        return True
+
+
+class RxdRateLimiter(object):
+    """! Limits number of DUT output lines (not K,V pairs) logged and queued by connection process
+    @details Sampling passes first sample_first lines and then every sample_every-th line.
+             Lines which passed sampling are limited by token bucket: up to burst lines at
+             once and on average rate lines per second. Dropped lines are counted and
+             reported periodically with report()
+    """
+    REPORT_INTERVAL = 1.0   # Min. time between two reports of dropped lines
+
+    def __init__(self, rate=0, burst=None, sample_first=0, sample_every=0):
+        """! ctor
+        @param rate Average number of lines per second, 0 for no rate limit
+        @param burst Size of token bucket (default one second of lines)
+        @param sample_first Number of lines passed before sampling starts
+        @param sample_every After first sample_first lines pass every n-th line only (0 or 1 for no sampling)
+        """
+        self.rate = float(rate or 0)
+        self.burst = float(burst or max(self.rate, 1.0))
+        self.tokens = self.burst
+        self.last_timestamp = None
+        self.sample_first = int(sample_first or 0)
+        self.sample_every = int(sample_every or 0)
+        self.seen = 0           # Statistics
+        self.sampled_out = 0
+        self.rate_limited = 0
+        self.reported = 0       # Dropped lines already reported
+        self.report_timestamp = None
+
+    def enabled(self):
+        """! Returns True if rate limit or sampling is configured """
+        return self.rate > 0 or self.sample_every > 1
+
+    def dropped(self):
+        """! Returns total number of dropped lines """
+        return self.sampled_out + self.rate_limited
+
+    def allow(self, timestamp):
+        """! Checks (and counts) if next line can pass
+        @param timestamp Time when line was received (seconds, monotonic)
+        @return True if line should be logged and queued
+        """
+        self.seen += 1
+        if (self.sample_every > 1 and self.seen > self.sample_first and
+            (self.seen - self.sample_first) % self.sample_every):
+            self.sampled_out += 1
+            return False
+
+        if self.rate > 0:
+            if self.last_timestamp is not None:
+                elapsed = max(timestamp - self.last_timestamp, 0)
+                self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.last_timestamp = timestamp
+            if self.tokens < 1.0:
+                self.rate_limited += 1
+                return False
+            self.tokens -= 1.0
+        return True
+
+    def report(self, timestamp):
+        """! Returns counters of dropped lines if there are new drops and last report is old enough
+        @param timestamp Current time (seconds, monotonic)
+        @return Dictionary with 'dropped' (since last report), 'sampled_out' and 'rate_limited' (totals) or None
+        """
+        dropped = self.dropped()
+        if dropped == self.reported:
+            return None
+        if self.report_timestamp is not None and timestamp - self.report_timestamp < self.REPORT_INTERVAL:
+            return None
+        result = {
+            'dropped' : dropped - self.reported,
+            'sampled_out' : self.sampled_out,
+            'rate_limited' : self.rate_limited,
+        }
+        self.reported = dropped
+        self.report_timestamp = timestamp
+        return result
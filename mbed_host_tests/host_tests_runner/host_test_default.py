@@ -32,7 +32,8 @@ from mbed_host_tests import get_host_test
 from mbed_host_tests import enum_host_tests
 from mbed_host_tests import host_tests_plugins
 from mbed_host_tests.host_tests_logger import HtrunLogger
-from mbed_host_tests.host_tests_conn_proxy import conn_process
+from mbed_host_tests.host_tests_conn_proxy import conn_process, ConnThread
+from mbed_host_tests.host_tests_conn_proxy import EventQueue, ThreadQueue, parse_fault_spec
 from mbed_host_tests.host_tests_runner.host_test import DefaultTestSelectorBase
 from mbed_host_tests.host_tests_toolbox.host_functional import handle_send_break_cmd
 
@@ -77,9 +78,9 @@ class DefaultTestSelector(DefaultTestSelectorBase):
                     verbose=options.verbose)
                 sys.exit(0)
 
-            if options.global_resource_mgr:
+            if options.global_resource_mgr or options.sim or options.replay:
                 # If Global Resource Mgr is working it will handle reset/flashing workflow
-                # So local plugins are offline
+                # So local plugins are offline (simulated or replayed DUT needs neither)
                 self.options.skip_reset = True
                 self.options.skip_flashing = True
 
@@ -129,16 +130,56 @@ class DefaultTestSelector(DefaultTestSelectorBase):
         result = None
         timeout_duration = 10       # Default test case timeout
         coverage_idle_timeout = 10  # Default coverage idle timeout
-        event_queue = Queue()       # Events from DUT to host
-        dut_event_queue = Queue()   # Events from host to DUT {k;v}
+        # Control events overtake DUT output lines (opt-in), compare log needs lines in DUT order
+        priority_lanes = self.options.priority_lanes and not self.compare_log
+        if self.options.conn_mode == 'thread':
+            # Connection loop runs in a thread of this process, in-memory queues
+            event_queue = EventQueue(queue_factory=ThreadQueue,
+                priority_lanes=priority_lanes,
+                max_size=self.options.event_queue_size)
+            dut_event_queue = ThreadQueue()
+        else:
+            # Events from DUT to host (unpacks frames sent by conn_process)
+            event_queue = EventQueue(priority_lanes=priority_lanes, max_size=self.options.event_queue_size)
+            dut_event_queue = Queue()   # Events from host to DUT {k;v}
 
         def callback__notify_prn(key, value, timestamp):
             """! Handles __norify_prn. Prints all lines in separate log line """
             for line in value.splitlines():
                 self.logger.prn_inf(line)
 
+        def callback__rxd_overflow(key, value, timestamp):
+            """! Handles __rxd_overflow diagnostic event sent by conn_process """
+            self.logger.prn_wrn("DUT line exceeded --max-line-length (%s times so far)"% str(value))
+
+        # Totals of DUT output lines dropped by conn_process rate limiter (see __rxd_dropped)
+        rxd_dropped = {}
+
+        def callback__rxd_dropped(key, value, timestamp):
+            """! Handles __rxd_dropped event sent periodically by conn_process """
+            rxd_dropped.update(value)
+
+        # Totals of faults injected by conn_process(es) with --fault-inject (see __fault_stats)
+        fault_stats = {}
+
+        def callback__fault_stats(key, value, timestamp):
+            """! Handles __fault_stats event sent by conn_process when it finishes """
+            fault_stats['rx_bytes'] = fault_stats.get('rx_bytes', 0) + value['rx_bytes']
+            fault_stats['bytes_dropped'] = fault_stats.get('bytes_dropped', 0) + value['bytes_dropped']
+            counts = fault_stats.setdefault('counts', {})
+            for kind, count in value['counts'].items():
+                counts[kind] = counts.get(kind, 0) + count
+
+        def callback__bulk_error(key, value, timestamp):
+            """! Handles __bulk_error event sent by conn_process when bulk value transfer failed """
+            self.logger.prn_err("bulk value transfer failed, %s"% str(value))
+
         callbacks = {
-            "__notify_prn" : callback__notify_prn
+            "__notify_prn" : callback__notify_prn,
+            "__rxd_overflow" : callback__rxd_overflow,
+            "__rxd_dropped" : callback__rxd_dropped,
+            "__fault_stats" : callback__fault_stats,
+            "__bulk_error" : callback__bulk_error,
         }
 
         # if True we will allow host test to consume all events after test is finished
@@ -164,12 +205,62 @@ class DefaultTestSelector(DefaultTestSelectorBase):
             "target_id" : self.options.target_id,
             "polling_timeout" : self.options.polling_timeout,
             "forced_reset_timeout" : self.options.forced_reset_timeout,
+            "reset_wait" : self.options.reset_wait,
+            "boot_banner" : self.options.boot_banner,
             "sync_behavior" : self.options.sync_behavior,
+            "fast_sync" : self.options.fast_sync,
             "platform_name" : self.options.micro,
             "image_path" : self.mbed.image_path,
             "skip_reset": self.options.skip_reset,
+            "max_line_length" : self.options.max_line_length,
+            "line_overflow" : self.options.line_overflow,
+            "io_mode" : self.options.io_mode,
+            "io_threads" : self.options.io_threads,
+            "read_size" : self.options.read_size,
+            "read_in_waiting" : self.options.read_in_waiting,
+            "timestamp_interpolation" : self.options.timestamp_interpolation,
+            "kv_framing" : self.options.kv_framing,
+            "txd_log" : self.options.txd_log,
+            "serial_output_file" : self.serial_output_file,
+            "capture_file" : self.options.capture_file,
+            "fault_inject" : parse_fault_spec(self.options.fault_inject) if self.options.fault_inject else None,
+            "fault_seed" : self.options.fault_seed,
+            "rxd_include" : self.options.rxd_include,
+            "rxd_exclude" : self.options.rxd_exclude,
+            "rxd_rate_limit" : self.options.rxd_rate_limit,
+            "rxd_sample_first" : self.options.rxd_sample_first,
+            "rxd_sample_every" : self.options.rxd_sample_every,
         }
 
+        if self.options.tcp:
+            tcp_host, tcp_port = self.options.tcp.rsplit(':', 1)
+
+            config.update({
+                "conn_resource" : 'tcp',
+                "tcp_host" : tcp_host,
+                "tcp_port" : tcp_port,
+                "tcp_protocol" : self.options.tcp_protocol,
+                "tcp_buffer_size" : self.options.tcp_buffer_size,
+            })
+
+        if self.options.sim:
+            config.update({
+                "conn_resource" : 'sim',
+                "sim_program" : self.options.sim,
+                "sim_rate" : self.options.sim_rate,
+                "sim_burst" : self.options.sim_burst,
+                "sim_latency" : self.options.sim_latency,
+                "sim_noise" : self.options.sim_noise,
+            })
+
+        if self.options.replay:
+            config.update({
+                "conn_resource" : 'replay',
+                "replay_file" : self.options.replay,
+                "replay_speed" : self.options.replay_speed,
+                "replay_tx" : self.options.replay_tx,
+            })
+
         if self.options.global_resource_mgr:
             grm_module, grm_host, grm_port = self.options.global_resource_mgr.split(':')
 
@@ -183,8 +274,11 @@ class DefaultTestSelector(DefaultTestSelectorBase):
         def start_conn_process():
             # DUT-host communication process
             args = (event_queue, dut_event_queue, config)
-            p = Process(target=conn_process, args=args)
-            p.deamon = True
+            if self.options.conn_mode == 'thread':
+                p = ConnThread(*args)
+            else:
+                p = Process(target=conn_process, args=args)
+                p.deamon = True
             p.start()
             return p
 
@@ -231,6 +325,7 @@ class DefaultTestSelector(DefaultTestSelectorBase):
 
             if key == '__conn_process_start':
                 conn_process_started = True
+                conn_process_start_time = timestamp
             else:
                 self.logger.prn_err("First expected event was '__conn_process_start', received '%s' instead"% key)
 
@@ -253,12 +348,6 @@ class DefaultTestSelector(DefaultTestSelectorBase):
                 except QueueEmpty:
                     continue
 
-                # Write serial output to the file if specified in options.
-                if self.serial_output_file:
-                    if key == '__rxd_line':
-                        with open(self.serial_output_file, "a") as f:
-                            f.write("%s\n" % value)
-
                 # In this mode we only check serial output against compare log.
                 if self.compare_log:
                     if key == '__rxd_line':
@@ -313,9 +402,13 @@ class DefaultTestSelector(DefaultTestSelectorBase):
                             event_queue.put(('__exit_event_queue', 0, time()))
 
                         consume_preamble_events = False
+                    elif key in ['__rxd_overflow', '__rxd_dropped', '__fault_stats']:
+                        callbacks[key](key, value, timestamp)
                     elif key == '__sync':
                         # This is DUT-Host Test handshake event
-                        self.logger.prn_inf("sync KV found, uuid=%s, timestamp=%f"% (str(value), timestamp))
+                        self.logger.prn_inf("sync KV found, uuid=%s, timestamp=%f, %.3f sec after connection process start"% (str(value),
+                            timestamp,
+                            timestamp - conn_process_start_time))
                     elif key == '__notify_conn_lost':
                         # This event is sent by conn_process, DUT connection was lost
                         self.logger.prn_err(value)
@@ -350,22 +443,27 @@ class DefaultTestSelector(DefaultTestSelectorBase):
                         result = value
                         event_queue.put(('__exit_event_queue', 0, time()))
                     elif key == '__reset_dut':
-                        # Disconnect to avoid connection lost event
-                        dut_event_queue.put(('__host_test_finished', True, time()))
-                        p.join()
-
                         if value == DefaultTestSelector.RESET_TYPE_SW_RST:
                             self.logger.prn_inf("Performing software reset.")
-                            # Just disconnecting and re-connecting comm process will soft reset DUT
                         elif value == DefaultTestSelector.RESET_TYPE_HW_RST:
                             self.logger.prn_inf("Performing hard reset.")
-                            # request hardware reset
-                            self.mbed.hw_reset()
                         else:
                             self.logger.prn_err("Invalid reset type (%s). Supported types [%s]." %
                                                 (value, ", ".join([DefaultTestSelector.RESET_TYPE_HW_RST,
                                                                    DefaultTestSelector.RESET_TYPE_SW_RST])))
                             self.logger.prn_inf("Software reset will be performed.")
+                            value = DefaultTestSelector.RESET_TYPE_SW_RST
+
+                        # Connection process resets DUT in place and synchronizes again
+                        dut_event_queue.put(('__reset_dut', value, time()))
+                    elif key == '__conn_process_restart':
+                        # In-place reset failed (e.g. serial port disappeared), connection process
+                        # has finished and new one will open the port again
+                        p.join()
+                        if value:
+                            self.mbed.port = value.get('serial_port', self.mbed.port)
+                            self.mbed.disk = value.get('mount_point', self.mbed.disk)
+                            config.update({"port" : self.mbed.port})
 
                         # connect to the device
                         p = start_conn_process()
@@ -435,6 +533,9 @@ class DefaultTestSelector(DefaultTestSelectorBase):
                     # or if value is None, value will be retrieved from HostTest.result() method
                     self.logger.prn_inf("%s(%s)"% (key, str(value)))
                     result = value
+                elif key == '__fault_stats':
+                    # Sent by conn_process after __host_test_finished
+                    callbacks[key](key, value, timestamp)
                 elif key.startswith('__'):
                     # Consume other system level events
                     pass
@@ -444,6 +545,21 @@ class DefaultTestSelector(DefaultTestSelectorBase):
                     self.logger.prn_wrn(">>> orphan event: {{%s;%s}}, timestamp=%f"% (key, str(value), timestamp))
             self.logger.prn_inf("stopped consuming events")
 
+        if rxd_dropped:
+            self.logger.prn_wrn("DUT output lines dropped: %d sampled out, %d rate limited"% (rxd_dropped['sampled_out'],
+                rxd_dropped['rate_limited']))
+
+        if fault_stats:
+            self.logger.prn_inf("injected faults: %s in %d RX bytes, %d bytes dropped"% (', '.join("%s %d"% (k, fault_stats['counts'][k]) for k in sorted(fault_stats['counts'])),
+                fault_stats['rx_bytes'],
+                fault_stats['bytes_dropped']))
+
+        if self.options.event_queue_size:
+            self.logger.prn_inf("event queue high-water mark: %d of %d messages, %d bytes spilled to disk"% (event_queue.high_water_mark,
+                self.options.event_queue_size,
+                event_queue.spill_bytes))
+        event_queue.close()
+
         if result is not None:  # We must compare here against None!
             # Here for example we've received some error code like IOERR_COPY
             self.logger.prn_inf("host test result() call skipped, received: %s"% str(result))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+import threading
+from mbed_host_tests.host_tests_conn_proxy.conn_primitive import ChunkRingBuffer
+
+
+class ChunkRingBufferTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ring = ChunkRingBuffer(16)
+
+    def tearDown(self):
+        self.ring.close()
+
+    def test_get_empty(self):
+        self.assertEqual(('', None), self.ring.get(10))
+
+    def test_get_joins_chunks(self):
+        self.ring.put('abc', 1.0)
+        self.ring.put('def', 2.0)
+        self.assertEqual(('abcdef', 2.0), self.ring.get(10))
+        self.assertEqual(0, self.ring.size)
+
+    def test_get_splits_chunk(self):
+        self.ring.put('abcdef', 1.0)
+        self.assertEqual(('abcd', 1.0), self.ring.get(4))
+        self.assertEqual(('ef', 1.0), self.ring.get(4))
+
+    def test_overrun_drops_oldest(self):
+        self.ring.put('a' * 10, 1.0)
+        self.ring.put('b' * 10, 2.0)
+        self.assertEqual(10, self.ring.dropped_bytes)
+        self.assertEqual(('b' * 10, 2.0), self.ring.get(100))
+
+    def test_get_waits_for_data(self):
+        t = threading.Timer(0.05, self.ring.put, ('abc', 1.0))
+        t.start()
+        self.assertEqual(('abc', 1.0), self.ring.get(10, timeout=5))
+        t.join()
+
+    def test_peek(self):
+        self.ring.put('abc', 1.0)
+        self.ring.put('def', 2.0)
+        self.assertEqual('abcdef', self.ring.peek())
+        self.assertEqual(('abcd', 2.0), self.ring.get(4))
+        self.assertEqual('ef', self.ring.peek())
+        self.ring.get(4)
+        self.assertEqual('', self.ring.peek())
+        self.assertEqual(6, self.ring.received_bytes)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import zlib
+import base64
+import binascii
+import unittest
+from mbed_host_tests.host_tests_conn_proxy.conn_bulk import BulkValueAssembler
+
+
+class BulkValueAssemblerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.bulk = BulkValueAssembler()
+        self.data = ''.join(chr(i % 256) for i in range(1000))
+
+    def tearDown(self):
+        pass
+
+    def transfer(self, key, data, encoding='base64', chunk_size=100, crc=None, length=None):
+        if crc is None:
+            crc = zlib.crc32(data) & 0xffffffff
+        encode = {'base64' : base64.b64encode, 'hex' : binascii.hexlify, 'raw' : str}[encoding]
+        events = self.bulk.feed('__bulk_begin', '%s;%d;%08x;%s'% (key, length or len(data), crc, encoding), 1.0)
+        for seq, i in enumerate(range(0, len(data), chunk_size)):
+            events += self.bulk.feed('__bulk_data', '%s;%d;%s'% (key, seq, encode(data[i:i + chunk_size])), 2.0)
+        events += self.bulk.feed('__bulk_end', key, 3.0)
+        return events
+
+    def test_not_bulk_kv(self):
+        self.assertEqual(None, self.bulk.feed('key', 'value', 1.0))
+
+    def test_encodings(self):
+        for encoding in ['base64', 'hex', 'raw']:
+            self.assertEqual([('dump', self.data, 3.0)], self.transfer('dump', self.data, encoding))
+        self.assertEqual((3, 30), (self.bulk.completed, self.bulk.chunks))
+
+    def test_crc_mismatch(self):
+        events = self.transfer('dump', self.data, crc=0x12345678)
+        self.assertEqual([('__bulk_error', 'dump: CRC32 mismatch', 3.0)], events)
+
+    def test_length_mismatch(self):
+        events = self.transfer('dump', self.data, length=2000)
+        self.assertEqual('__bulk_error', events[0][0])
+        self.assertEqual(1, self.bulk.failed)
+
+    def test_missing_chunk(self):
+        self.bulk.feed('__bulk_begin', 'dump;4;00000000;hex', 1.0)
+        events = self.bulk.feed('__bulk_data', 'dump;1;abcd', 2.0)
+        self.assertEqual([('__bulk_error', 'dump: chunk 1 received, expected 0', 2.0)], events)
+        self.assertEqual([], self.bulk.feed('__bulk_end', 'dump', 3.0))
+
+    def test_one_error_per_transfer(self):
+        events = self.bulk.feed('__bulk_begin', 'dump;%d;%08x;hex'% (len(self.data), zlib.crc32(self.data) & 0xffffffff), 1.0)
+        for seq in range(10):
+            if seq != 3:
+                events += self.bulk.feed('__bulk_data', 'dump;%d;%s'% (seq, binascii.hexlify(self.data[seq * 100:(seq + 1) * 100])), 2.0)
+        events += self.bulk.feed('__bulk_end', 'dump', 3.0)
+        self.assertEqual([('__bulk_error', 'dump: chunk 4 received, expected 3', 2.0)], events)
+        self.assertEqual(1, self.bulk.failed)
+        # Chunks without __bulk_begin (e.g. host started in the middle of transfer)
+        events = self.bulk.feed('__bulk_data', 'other;5;abcd', 4.0) + self.bulk.feed('__bulk_data', 'other;6;abcd', 4.0)
+        self.assertEqual([('__bulk_error', 'other: chunk of unknown transfer', 4.0)], events)
+        # Next transfer with the same key is not affected
+        self.assertEqual([('dump', self.data, 3.0)], self.transfer('dump', self.data))
+
+    def test_too_large(self):
+        bulk = BulkValueAssembler(max_size=10)
+        self.assertEqual('__bulk_error', bulk.feed('__bulk_begin', 'dump;11;00000000;hex', 1.0)[0][0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import tempfile
+import unittest
+from mbed_host_tests.host_tests_conn_proxy.conn_capture import CaptureWriter, CaptureReader, read_capture
+from mbed_host_tests.host_tests_conn_proxy.conn_capture import CAPTURE_RX, CAPTURE_TX, CAPTURE_MAGIC
+
+
+class CaptureTestCase(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_round_trip(self):
+        writer = CaptureWriter(self.path)
+        writer.write(CAPTURE_TX, 1.5, '{{__sync;1}}\n')
+        writer.write(CAPTURE_RX, 2.25, '\x00\xff{{__sync;1}}\n')
+        writer.write(CAPTURE_RX, 3.0, '')   # Empty reads are not recorded
+        writer.close()
+        records = read_capture(self.path)
+        self.assertEqual([(CAPTURE_TX, 1.5, '{{__sync;1}}\n'), (CAPTURE_RX, 2.25, '\x00\xff{{__sync;1}}\n')], records)
+        self.assertEqual((2, 28), (writer.records, writer.bytes))
+        self.assertEqual(1, len(read_capture(self.path, direction=CAPTURE_RX)))
+
+    def test_buffered(self):
+        writer = CaptureWriter(self.path)
+        writer.write(CAPTURE_RX, 1.0, 'abc')
+        writer.write(CAPTURE_RX, 1.5, 'def')
+        self.assertEqual([], read_capture(self.path))
+        writer.write(CAPTURE_RX, 2.0, 'ghi')    # FLUSH_INTERVAL passed
+        self.assertEqual(3, len(read_capture(self.path)))
+        writer.write(CAPTURE_RX, 2.1, 'x' * CaptureWriter.BUFFER_SIZE)
+        self.assertEqual(4, len(read_capture(self.path)))
+        writer.close()
+
+    def test_flush_without_close(self):
+        # E.g. connection process killed while DUT was idle
+        writer = CaptureWriter(self.path)
+        writer.write(CAPTURE_RX, 1.0, 'abc')
+        writer.flush()
+        self.assertEqual(['abc'], [r.data for r in read_capture(self.path)])
+        # Interval starts with first record buffered after flush
+        writer.write(CAPTURE_RX, 5.0, 'def')
+        self.assertEqual(1, len(read_capture(self.path)))
+        writer.write(CAPTURE_RX, 6.0, 'ghi')
+        self.assertEqual(3, len(read_capture(self.path)))
+        writer.close()
+
+    def test_append(self):
+        for i in range(2):
+            writer = CaptureWriter(self.path)
+            writer.write(CAPTURE_RX, float(i), 'run %d'% i)
+            writer.close()
+        self.assertEqual(['run 0', 'run 1'], [r.data for r in read_capture(self.path)])
+        with open(self.path, 'rb') as f:
+            self.assertEqual(1, f.read().count(CAPTURE_MAGIC))
+
+    def test_truncated(self):
+        writer = CaptureWriter(self.path)
+        writer.write(CAPTURE_RX, 1.0, 'abc')
+        writer.write(CAPTURE_RX, 2.0, 'defgh')
+        writer.close()
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 2)
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(['abc'], [r.data for r in reader])
+            self.assertTrue(reader.truncated)
+
+    def test_not_capture_file(self):
+        with open(self.path, 'wb') as f:
+            f.write('hello world')
+        self.assertRaises(ValueError, CaptureReader, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
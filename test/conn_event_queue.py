@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import unittest
+from Queue import Queue, Empty
+from mbed_host_tests.host_tests_conn_proxy.conn_event_queue import EventQueue
+
+
+class EventQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.event_queue = EventQueue(queue_factory=Queue)
+
+    def tearDown(self):
+        pass
+
+    def get_all(self):
+        result = []
+        while not self.event_queue.empty():
+            result.append(self.event_queue.get(block=False))
+        return result
+
+    def test_single_events(self):
+        self.event_queue.put(('a', 1, 0.1))
+        self.event_queue.put(('b', 2, 0.2))
+        self.assertEqual([('a', 1, 0.1), ('b', 2, 0.2)], self.get_all())
+
+    def test_frames_keep_order(self):
+        self.event_queue.put(('a', 1, 0.1))
+        self.event_queue.put_frame([('b', 2, 0.2), ('c', 3, 0.3)])
+        self.event_queue.put(('d', 4, 0.4))
+        self.event_queue.put_frame([('e', 5, 0.5)])
+        self.event_queue.put_frame([])
+        self.assertEqual(['a', 'b', 'c', 'd', 'e'], [key for key, _, _ in self.get_all()])
+
+    def test_frame_is_one_message(self):
+        self.event_queue.put_frame([('a', 1, 0.1), ('b', 2, 0.2), ('c', 3, 0.3)])
+        self.assertEqual(1, self.event_queue.queue.qsize())
+
+    def test_dut_keys_not_reserved(self):
+        # K,V pairs sent by DUT can't be mistaken for frames
+        self.event_queue.put(('__frame', 'x', 0.1))
+        self.event_queue.put_frame([('__frame', [('a', 1, 0.2)], 0.3), ('b', 2, 0.4)])
+        self.assertEqual([('__frame', 'x', 0.1), ('__frame', [('a', 1, 0.2)], 0.3), ('b', 2, 0.4)], self.get_all())
+        event_queue = EventQueue(queue_factory=Queue, priority_lanes=True)
+        event_queue.put(('__frame', 'x', 0.1))
+        self.assertEqual(('__frame', 'x', 0.1), event_queue.get(block=False))
+
+    def test_get_empty(self):
+        self.assertTrue(self.event_queue.empty())
+        self.assertRaises(Empty, self.event_queue.get, False)
+        self.assertRaises(Empty, self.event_queue.get, True, 0.01)
+
+    def test_priority_lanes(self):
+        event_queue = EventQueue(queue_factory=Queue, priority_lanes=True)
+        event_queue.put_frame([('__rxd_line', 'l1', 0.1), ('a', 1, 0.2), ('__rxd_line', 'l2', 0.3)])
+        event_queue.put_frame([('__rxd_line', 'l3', 0.4), ('__exit', 0, 0.5)])
+        result = []
+        while not event_queue.empty():
+            result.append(event_queue.get(block=False)[:2])
+        self.assertEqual([('a', 1), ('__exit', 0), ('__rxd_line', 'l1'), ('__rxd_line', 'l2'), ('__rxd_line', 'l3')], result)
+
+    def test_priority_lanes_bulk_after_control(self):
+        event_queue = EventQueue(queue_factory=Queue, priority_lanes=True)
+        event_queue.put_frame([('__rxd_line', 'l1', 0.1), ('__exit', 0, 0.2)])
+        event_queue.put(('__rxd_line', 'l2', 0.3))
+        self.assertEqual(('__exit', 0, 0.2), event_queue.get(block=False))
+        self.assertEqual(['l1', 'l2'], [event_queue.get(block=False)[1] for _ in range(2)])
+        self.assertTrue(event_queue.empty())
+
+    def test_bounded_spill_keeps_order(self):
+        event_queue = EventQueue(queue_factory=Queue, max_size=2)
+        for i in range(5):
+            event_queue.put_frame([('__rxd_line', 'l%d' % i, 0.1), ('__rxd_line', 'm%d' % i, 0.2)])
+        self.assertEqual(2, event_queue.queue.qsize())
+        self.assertFalse(event_queue.flush())
+        result = [event_queue.get(block=False)[1] for _ in range(4)]
+        event_queue.consumer = None     # Following calls act as producer
+        self.assertTrue(event_queue.flush())
+        event_queue.put(('__rxd_line', 'l5', 0.3))
+        while not event_queue.empty():
+            result.append(event_queue.get(block=False)[1])
+        self.assertEqual(['l0', 'm0', 'l1', 'm1', 'l2', 'm2', 'l3', 'm3', 'l4', 'm4', 'l5'], result)
+        self.assertTrue(event_queue.spill_bytes > 0)
+        self.assertEqual(1, event_queue.high_water_mark)
+        spill_dir = event_queue.spill_dir
+        event_queue.close()
+        self.assertFalse(os.path.exists(spill_dir))
+
+    def test_bounded_dut_spill_key(self):
+        # DUT can't point consumer to a file
+        event_queue = EventQueue(queue_factory=Queue, max_size=2)
+        event_queue.put(('__spill', ('/etc/passwd', 0, 100), 0.1))
+        event_queue.put(('__spill', 'foo', 0.2))
+        self.assertEqual([('__spill', ('/etc/passwd', 0, 100), 0.1), ('__spill', 'foo', 0.2)],
+            [event_queue.get(block=False) for _ in range(2)])
+        self.assertEqual(0, event_queue.spill_bytes)
+        # Spill file must be in spill directory of this queue
+        event_queue.queue.put((EventQueue.MSG_SPILL, ('/etc/passwd', 0, 100)))
+        self.assertRaises(ValueError, event_queue.get, False)
+        event_queue.close()
+
+    def test_bounded_control_event_spilled_after_timeout(self):
+        event_queue = EventQueue(queue_factory=Queue, max_size=1)
+        event_queue.CONTROL_PUT_TIMEOUT = 0.01
+        event_queue.put(('__rxd_line', 'l0', 0.1))
+        event_queue.put(('__exit', 0, 0.2))
+        self.assertEqual('l0', event_queue.get(block=False)[1])
+        event_queue.flush()
+        self.assertEqual(('__exit', 0, 0.2), event_queue.get(block=False))
+        event_queue.close()
+
+    def test_bounded_put_by_consumer(self):
+        event_queue = EventQueue(queue_factory=Queue, max_size=1)
+        event_queue.put(('__rxd_line', 'l0', 0.1))
+        self.assertEqual('l0', event_queue.get(block=False)[1])
+        event_queue.put(('a', 1, 0.2))
+        event_queue.put(('__exit_event_queue', 0, 0.3))
+        self.assertEqual(1, len(event_queue.consumer_backlog))
+        self.assertEqual(['a', '__exit_event_queue'], [event_queue.get(block=False)[0] for _ in range(2)])
+        self.assertTrue(event_queue.empty())
+        self.assertEqual(None, event_queue.spill_path)
+        event_queue.close()
+
+    def test_bounded_priority_lanes_limit_memory(self):
+        event_queue = EventQueue(queue_factory=Queue, priority_lanes=True, max_size=4)
+        expected, result = [], []
+        max_pending = 0
+        # Producer is faster than consumer, backlog must go to spill file
+        for i in range(100):
+            event_queue.consumer = None     # Following calls act as producer
+            lines = ['l%d.%d' % (i, j) for j in range(10)]
+            event_queue.put_frame([('__rxd_line', line, 0.1) for line in lines])
+            event_queue.flush()
+            expected.extend(lines)
+            result.append(event_queue.get(block=False)[1])
+            max_pending = max(max_pending, len(event_queue.pending) + len(event_queue.bulk_pending))
+        event_queue.CONTROL_PUT_TIMEOUT = 0.01
+        event_queue.consumer = None
+        event_queue.put(('__exit', 0, 0.2))
+        while True:
+            event_queue.consumer = None
+            if event_queue.flush() and event_queue.empty():
+                break
+            result.append(event_queue.get(block=False)[1])
+            max_pending = max(max_pending, len(event_queue.pending) + len(event_queue.bulk_pending))
+        # At most max_size bulk events read ahead plus one frame
+        self.assertTrue(max_pending <= 4 + 10)
+        self.assertTrue(event_queue.spill_bytes > 0)
+        self.assertEqual(expected, [value for value in result if value != 0])
+        self.assertTrue(0 in result)
+        event_queue.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import sys
+import time
+import unittest
+from StringIO import StringIO
+from mbed_host_tests import init_host_test_cli_params
+from mbed_host_tests.host_tests_conn_proxy.conn_fault import FaultInjector, parse_fault_spec
+
+
+class ChunkConnector(object):
+    """! Stand-in connector returning given chunks of DUT output """
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.event_driven = False
+        self.read_in_waiting = False
+        self.kv_framing = False
+        self.txd_log = 'all'
+        self.finished = False
+
+    def read_timestamped(self, count):
+        return (self.chunks.pop(0) if self.chunks else ''), time.time()
+
+    def connected(self):
+        return True
+
+    def finish(self):
+        self.finished = True
+
+
+class FaultInjectorTestCase(unittest.TestCase):
+
+    DATA = ''.join("{{echo;%04d}}\n"% i for i in range(200))
+
+    def read_all(self, injector, reads=1000):
+        return ''.join(injector.read(4096) for _ in range(reads))
+
+    def test_parse_fault_spec(self):
+        self.assertEqual({'drop' : (0.01, 16), 'flip' : (0.001, None), 'delay' : (0.5, 2.0)},
+            parse_fault_spec('drop=0.01,flip=0.001, delay=0.5:2'))
+        self.assertEqual({'drop' : (1.0, 4)}, parse_fault_spec('drop=1:4'))
+        self.assertRaises(ValueError, parse_fault_spec, 'loss=0.1')
+        self.assertRaises(ValueError, parse_fault_spec, 'flip=0')
+        self.assertRaises(ValueError, parse_fault_spec, 'flip=x')
+
+    def test_fault_inject_option(self):
+        argv, stderr = sys.argv, sys.stderr
+        try:
+            sys.argv = ['mbedhtrun', '--fault-inject', 'flip=0.01,dup=0.1']
+            self.assertEqual('flip=0.01,dup=0.1', init_host_test_cli_params().fault_inject)
+            sys.argv = ['mbedhtrun', '--fault-inject', 'flip=x']
+            sys.stderr = StringIO()
+            self.assertRaises(SystemExit, init_host_test_cli_params)
+            self.assertTrue('--fault-inject' in sys.stderr.getvalue())
+        finally:
+            sys.argv, sys.stderr = argv, stderr
+
+    def test_stats(self):
+        injector = FaultInjector(ChunkConnector([self.DATA]), parse_fault_spec('drop=0.01:4'))
+        self.read_all(injector)
+        stats = injector.stats()
+        self.assertEqual(len(self.DATA), stats['rx_bytes'])
+        self.assertEqual(injector.counts['drop'], stats['counts']['drop'])
+        self.assertEqual(injector.bytes_dropped, stats['bytes_dropped'])
+
+    def test_schedule_independent_of_reads(self):
+        faults = parse_fault_spec('flip=0.005')
+        one = FaultInjector(ChunkConnector([self.DATA]), faults, seed=1)
+        many = FaultInjector(ChunkConnector([self.DATA[i:i + 7] for i in range(0, len(self.DATA), 7)]), faults, seed=1)
+        other = FaultInjector(ChunkConnector([self.DATA]), faults, seed=2)
+        data = self.read_all(one)
+        self.assertEqual(len(self.DATA), len(data))
+        self.assertNotEqual(self.DATA, data)
+        self.assertEqual(data, self.read_all(many))
+        self.assertNotEqual(data, self.read_all(other))
+        self.assertEqual(one.counts['flip'], sum(a != b for (a, b) in zip(self.DATA, data)))
+
+    def test_drop_and_dup(self):
+        injector = FaultInjector(ChunkConnector([self.DATA]), parse_fault_spec('drop=0.01:4'))
+        data = self.read_all(injector)
+        self.assertTrue(injector.counts['drop'] > 0)
+        self.assertEqual(len(self.DATA) - injector.bytes_dropped, len(data))
+
+        injector = FaultInjector(ChunkConnector([self.DATA]), parse_fault_spec('dup=0.01'))
+        data = self.read_all(injector)
+        self.assertTrue(injector.counts['dup'] > 0)
+        self.assertTrue(len(data) > len(self.DATA))
+        # Rest of the line is repeated, all original lines are still received
+        self.assertTrue(set(self.DATA.splitlines()) <= set(data.splitlines()))
+
+    def test_delay(self):
+        injector = FaultInjector(ChunkConnector(['a' * 10, 'b' * 10]), parse_fault_spec('delay=1:0.02'))
+        first = injector.read(100)
+        self.assertTrue(len(first) < 10)
+        self.assertFalse(injector.has_pending_data())
+        # Stalled data is held back, wrapped connector is still read
+        self.assertEqual('', injector.read(100))
+        self.assertEqual(20, injector.rx_offset)
+        time.sleep(0.02)
+        self.assertTrue(injector.has_pending_data())
+        # Every byte is followed by a stall
+        data = first
+        start = time.time()
+        while len(data) < 20 and time.time() - start < 5:
+            data += injector.read(100)
+        self.assertEqual('a' * 10 + 'b' * 10, data)
+        self.assertTrue(injector.counts['delay'] > 10)
+
+    def test_disconnect(self):
+        inner = ChunkConnector([self.DATA])
+        injector = FaultInjector(inner, parse_fault_spec('disconnect=0.01'))
+        data = injector.read(4096)
+        self.assertTrue(self.DATA.startswith(data))
+        self.assertFalse(injector.connected())
+        self.assertEqual("fault injection: disconnect", injector.error())
+        injector.finish()
+        self.assertTrue(inner.finished)
+
+
+if __name__ == '__main__':
+    unittest.main()
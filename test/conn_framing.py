@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+from mbed_host_tests.host_tests_conn_proxy.conn_framing import cobs_encode, cobs_decode
+from mbed_host_tests.host_tests_conn_proxy.conn_framing import encode_kv_frame, decode_kv_frame, FrameError
+from mbed_host_tests.host_tests_conn_proxy.conn_proxy import FramedKiViBufferWalker
+
+
+class ConnFramingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_cobs_round_trip(self):
+        for data in ['', '\x00', 'abc', '\x00\x00a\x00', 'x' * 253, 'x' * 254, 'x' * 255, ('y' * 300 + '\x00') * 3]:
+            encoded = cobs_encode(data)
+            self.assertFalse('\x00' in encoded)
+            self.assertEqual(data, cobs_decode(encoded))
+
+    def test_cobs_known_vectors(self):
+        self.assertEqual('\x01\x01', cobs_encode('\x00'))
+        self.assertEqual('\x03\x11\x22\x02\x33', cobs_encode('\x11\x22\x00\x33'))
+        self.assertEqual('\xff' + 'x' * 254 + '\x01', cobs_encode('x' * 254))
+
+    def test_kv_frame_round_trip(self):
+        frame = encode_kv_frame('dump', '}}\n\x00binary{{')
+        self.assertTrue(frame.startswith('\x00') and frame.endswith('\x00'))
+        self.assertEqual(('dump', '}}\n\x00binary{{'), decode_kv_frame(frame[1:-1]))
+
+    def test_kv_frame_crc(self):
+        frame = bytearray(encode_kv_frame('key', 'value'))
+        frame[5] ^= 0x20
+        self.assertRaises(FrameError, decode_kv_frame, str(frame[1:-1]))
+        self.assertRaises(FrameError, decode_kv_frame, '\x05ab')
+
+
+class FramedKiViBufferWalkerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.kivi = FramedKiViBufferWalker()
+        self.kivi.enable_framing()
+
+    def tearDown(self):
+        pass
+
+    def pop_all_kv(self):
+        result = []
+        while self.kivi.search():
+            key, value, _ = self.kivi.pop_kv()
+            result.append((key, value))
+        return result
+
+    def test_frames_and_text(self):
+        stream = "boot\n{{__sync;1}}\n" + encode_kv_frame('a', '1;}}') + "text\n" + encode_kv_frame('b', '\n')
+        self.assertEqual(['boot', 'text'], self.kivi.append(stream))
+        self.assertEqual([('__sync', '1'), ('a', '1;}}'), ('b', '\n')], self.pop_all_kv())
+
+    def test_frame_split_between_appends(self):
+        frame = encode_kv_frame('key', 'x' * 600)
+        for i in range(0, len(frame), 7):
+            self.assertEqual([], self.kivi.append(frame[i:i + 7]))
+            # Buffered part of frame is not scanned again
+            self.assertEqual(len(self.kivi.frame_buff), self.kivi.frame_scan_pos)
+        self.assertEqual([('key', 'x' * 600)], self.pop_all_kv())
+        self.assertEqual(0, self.kivi.frame_scan_pos)
+
+    def test_broken_frame_resync(self):
+        broken = bytearray(encode_kv_frame('a', '1'))
+        broken[3] ^= 0x01
+        self.kivi.append(str(broken) + encode_kv_frame('b', '2') + "text\n")
+        self.assertEqual([('b', '2')], self.pop_all_kv())
+        self.assertEqual(1, self.kivi.frame_errors)
+        # Lost opening delimiter: text is taken as broken frame, next frame is decoded
+        self.kivi.append("lost" + encode_kv_frame('c', '3')[1:] + encode_kv_frame('d', '4'))
+        self.assertEqual([('d', '4')], self.pop_all_kv())
+
+    def test_stray_delimiter_before_framing(self):
+        kivi = FramedKiViBufferWalker()
+        self.assertEqual(['boot\x00garbage'], kivi.append('boot\x00garbage\n{{__sync;abc+cobs}}\n'))
+        self.assertEqual(('__sync', 'abc+cobs'), kivi.pop_kv()[:2])
+        self.assertEqual(0, len(kivi.frame_buff))
+        # Frame received with __sync reply is decoded when framing is enabled
+        kivi.append('{{__sync;abc}}\n' + encode_kv_frame('a', '1'))
+        self.assertEqual(('__sync', 'abc'), kivi.pop_kv()[:2])
+        self.assertEqual([], kivi.enable_framing())
+        self.assertEqual(('a', '1'), kivi.pop_kv()[:2])
+
+    def test_frames_in_sync_reply_chunk(self):
+        kivi = FramedKiViBufferWalker()
+        chunk = ('{{__sync;abc}}\n' + encode_kv_frame('__timeout', 'a\nb') +
+            encode_kv_frame('__host_test_name', 'echo') + 'boot ok\n')
+        self.assertEqual([], kivi.append(chunk))
+        self.assertEqual(('__sync', 'abc'), kivi.pop_kv()[:2])
+        self.assertFalse(kivi.search())
+        # Data after __sync reply is held until framing is decided
+        self.assertEqual([], kivi.append('more\n'))
+        self.assertEqual(['boot ok', 'more'], kivi.enable_framing())
+        self.kivi = kivi
+        self.assertEqual([('__timeout', 'a\nb'), ('__host_test_name', 'echo')], self.pop_all_kv())
+        self.assertEqual(0, kivi.frame_errors)
+
+    def test_framing_declined(self):
+        kivi = FramedKiViBufferWalker()
+        self.assertEqual(['boot'], kivi.append('boot\n{{__sync;abc+cobs}}\n{{a;1}}\ntext\n'))
+        self.assertEqual(('__sync', 'abc+cobs'), kivi.pop_kv()[:2])
+        self.assertEqual(['text'], kivi.decline_framing())
+        self.assertEqual(('a', '1'), kivi.pop_kv()[:2])
+        # No more holding after __sync reply
+        self.assertEqual(['x'], kivi.append('{{__sync;def}}\nx\n'))
+
+    def test_stray_delimiter_parsed_as_text(self):
+        discarded = self.kivi.append('boot\x00garbage\n{{__sync;abc}}\n' + encode_kv_frame('a', '1') + 'text\n')
+        self.assertEqual(['bootgarbage', 'text'], discarded)
+        self.assertEqual([('__sync', 'abc'), ('a', '1')], self.pop_all_kv())
+        self.assertEqual(1, self.kivi.frame_errors)
+
+    def test_unterminated_frame_parsed_as_text(self):
+        self.kivi.MAX_FRAME_LENGTH = 50
+        self.assertEqual([], self.kivi.append('\x00' + 'x' * 40))
+        self.assertEqual(['x' * 100], self.kivi.append('x' * 60 + '\n{{k;v}}\n'))
+        self.assertEqual([('k', 'v')], self.pop_all_kv())
+        self.assertEqual(0, len(self.kivi.frame_buff))
+
+if __name__ == '__main__':
+    unittest.main()
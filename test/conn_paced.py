@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import base64
+import binascii
+import unittest
+from time import time
+from Queue import Empty
+from mbed_host_tests.host_tests_conn_proxy import ConnThread, EventQueue, ThreadQueue
+from mbed_host_tests.host_tests_conn_proxy.conn_paced import PacedSender
+from mbed_host_tests.host_tests_conn_proxy.conn_proxy import TX_BATCH_LIMIT
+
+
+class PacedSenderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.data = 'x' * 1000
+
+    def tearDown(self):
+        pass
+
+    def test_chunks(self):
+        paced = PacedSender('blob', self.data, 0.0, chunk_size=300)
+        chunks = paced.next_chunks(0.0)
+        self.assertEqual([300, 300, 300, 100], [len(c) for (_, c) in chunks])
+        self.assertEqual(self.data, ''.join(c for (_, c) in chunks))
+        self.assertTrue(all(k == 'blob' for (k, _) in chunks))
+        self.assertTrue(paced.done())
+
+    def test_empty_value(self):
+        paced = PacedSender('blob', '', 0.0)
+        self.assertEqual([], paced.next_chunks(0.0))
+        self.assertTrue(paced.done())
+
+    def test_rate_limit(self):
+        # 100 bytes of value + 10 bytes overhead per chunk, 110 bytes/sec
+        paced = PacedSender('blob', self.data, 0.0, chunk_size=100, rate=110, overhead=10)
+        self.assertEqual(1, len(paced.next_chunks(0.0)))
+        self.assertEqual([], paced.next_chunks(0.5))
+        self.assertAlmostEqual(0.5, paced.wait_time(0.5))
+        self.assertEqual(1, len(paced.next_chunks(1.0)))
+        self.assertEqual(2, len(paced.next_chunks(3.0)))
+        self.assertFalse(paced.done())
+        self.assertEqual(6, len(paced.next_chunks(100.0)))
+        self.assertTrue(paced.done())
+        self.assertEqual(1100, paced.sent_bytes)
+
+    def test_ack_window(self):
+        paced = PacedSender('blob', self.data, 0.0, chunk_size=100, ack_window=3)
+        self.assertEqual(3, len(paced.next_chunks(0.0)))
+        self.assertEqual(None, paced.wait_time(0.0))
+        self.assertEqual([], paced.next_chunks(0.1))
+        paced.ack('2', 0.2)
+        self.assertEqual(2, len(paced.next_chunks(0.2)))
+        paced.ack('100', 0.3)   # Can't acknowledge more than was sent
+        self.assertEqual(5, paced.acked)
+        self.assertEqual(3, len(paced.next_chunks(0.3)))
+        paced.ack('8', 0.4)
+        self.assertEqual(2, len(paced.next_chunks(0.4)))
+        self.assertFalse(paced.done())  # Last chunks not acknowledged yet
+        paced.ack('10', 0.5)
+        self.assertTrue(paced.done())
+        self.assertEqual(None, paced.report(0.5)['error'])
+
+    def test_ack_timeout(self):
+        paced = PacedSender('blob', self.data, 0.0, chunk_size=100, ack_window=2, ack_timeout=1.0)
+        paced.next_chunks(0.0)
+        paced.ack('invalid', 0.5)
+        self.assertEqual([], paced.next_chunks(0.9))
+        self.assertFalse(paced.done())
+        self.assertEqual([], paced.next_chunks(1.1))
+        self.assertTrue(paced.done())
+        self.assertTrue(paced.report(1.1)['error'])
+
+    def test_report(self):
+        paced = PacedSender('blob', self.data, 10.0, chunk_size=100, rate=500)
+        while not paced.done():
+            paced.next_chunks(10.0 + 2.0)
+        report = paced.report(12.0)
+        self.assertEqual(('blob', 1000, 10), (report['key'], report['bytes'], report['chunks']))
+        self.assertAlmostEqual(500.0, report['bytes_per_sec'])
+
+    def test_encoding(self):
+        data = '{{\x00\n}}' * 10
+        paced = PacedSender('blob', data, 0.0, chunk_size=30, encoding='hex', overhead=10)
+        chunks = paced.next_chunks(0.0)
+        self.assertEqual(data, ''.join(binascii.unhexlify(c) for (_, c) in chunks))
+        self.assertEqual(len(data) * 2 + 10 * len(chunks), paced.sent_bytes)
+        self.assertEqual(len(data), paced.report(0.0)['bytes'])
+        paced = PacedSender('blob', data, 0.0, chunk_size=30, encoding='base64')
+        self.assertEqual(data, ''.join(base64.b64decode(c) for (_, c) in paced.next_chunks(0.0)))
+
+    def test_raw_unsafe_value(self):
+        for value in ['a}b', 'a{b', 'a\nb']:
+            paced = PacedSender('blob', value, 0.0)
+            self.assertEqual([], paced.next_chunks(0.0))
+            self.assertTrue(paced.done())
+            self.assertTrue('base64' in paced.report(0.0)['error'])
+        # Frames carry any bytes
+        paced = PacedSender('blob', 'a}\nb', 0.0, framed=True)
+        self.assertEqual([('blob', 'a}\nb')], paced.next_chunks(0.0))
+        self.assertTrue(PacedSender('blob', 'x', 0.0, encoding='rot13').done())
+
+
+class ConnProcessPacedTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.event_queue = EventQueue(queue_factory=ThreadQueue)
+        self.dut_event_queue = ThreadQueue()
+        config = {
+            'conn_resource' : 'sim',
+            'sync_timeout' : 0.5,
+            'txd_log' : 'none',
+        }
+        self.thread = ConnThread(self.event_queue, self.dut_event_queue, config)
+        self.thread.start()
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            self.thread.terminate()
+        self.thread.join(2.0)
+
+    def wait_for(self, key, timeout=5.0):
+        start = time()
+        while time() - start < timeout:
+            try:
+                event = self.event_queue.get(timeout=0.1)
+            except Empty:
+                continue
+            if event[0] == key:
+                return event
+        self.fail("event '%s' not received"% key)
+
+    def start_long_paced_send(self):
+        self.wait_for('__sync')
+        # About a minute at 1000 bytes/sec, K,V pairs sent meanwhile wait for it
+        self.dut_event_queue.put(('__paced_kv', {'key' : 'blob', 'value' : 'x' * 60000, 'rate' : 1000}, time()))
+        for i in range(TX_BATCH_LIMIT + 500):
+            self.dut_event_queue.put(('k', i, time()))
+
+    def test_finish_during_paced_send(self):
+        self.start_long_paced_send()
+        self.dut_event_queue.put(('__host_test_finished', True, time()))
+        self.thread.join(3.0)
+        self.assertFalse(self.thread.is_alive())
+
+    def test_reset_during_paced_send(self):
+        self.start_long_paced_send()
+        self.dut_event_queue.put(('__reset_dut', 'software_reset', time()))
+        report = self.wait_for('__paced_kv_done', timeout=3.0)[1]
+        self.assertEqual('DUT reset', report['error'])
+        self.wait_for('__sync')
+
+
+if __name__ == '__main__':
+    unittest.main()
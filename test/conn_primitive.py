@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import time
+import unittest
+from mbed_host_tests.host_tests_conn_proxy import conn_primitive
+from mbed_host_tests.host_tests_conn_proxy.conn_primitive import ConnectorPrimitive, ChunkRingBuffer, host_timestamp
+from mbed_host_tests.host_tests_conn_proxy.conn_framing import decode_kv_frame
+
+
+class WriteRecorder(ConnectorPrimitive):
+    """! Connector which records all writes """
+    def __init__(self):
+        ConnectorPrimitive.__init__(self, 'TEST')
+        self.writes = []
+
+    def write(self, payload, log=False):
+        self.writes.append(payload)
+        return payload
+
+
+class ConnectorPrimitiveTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.connector = WriteRecorder()
+        self.connector.txd_log = 'none'
+
+    def tearDown(self):
+        pass
+
+    def test_write_kv(self):
+        self.assertEqual("{{key;value}}\n", self.connector.write_kv('key', 'value'))
+        self.assertEqual(["{{key;value}}\n"], self.connector.writes)
+
+    def test_write_kvs_single_write(self):
+        self.connector.write_kvs([('a', 1), ('b', 2), ('c', 3)])
+        self.assertEqual(["{{a;1}}\n{{b;2}}\n{{c;3}}\n"], self.connector.writes)
+
+    def test_write_kvs_framed(self):
+        self.connector.kv_framing = True
+        self.connector.write_kvs([('a', '}'), ('b', '\n')])
+        frames = [f for f in self.connector.writes[0].split('\x00') if f]
+        self.assertEqual([('a', '}'), ('b', '\n')], [decode_kv_frame(f) for f in frames])
+
+    def test_host_timestamp(self):
+        # 'monotonic' is an install requirement
+        self.assertTrue(conn_primitive.MONOTONIC_CLOCK)
+        timestamps = [host_timestamp() for _ in range(1000)]
+        self.assertEqual(sorted(timestamps), timestamps)
+        self.assertTrue(abs(host_timestamp() - time.time()) < 1.0)
+
+    def test_ring_read(self):
+        self.connector.ring = ChunkRingBuffer(16)
+        try:
+            self.connector.ring.put('abc', 1.0)
+            self.connector.ring.put('def', 2.0)
+            self.assertEqual(('abcd', 2.0), self.connector.read_timestamped(4))
+            self.assertEqual('ef', self.connector.read(4))
+            data, timestamp = self.connector.read_timestamped(4)
+            self.assertEqual('', data)
+            self.assertTrue(timestamp > 2.0)
+            self.assertEqual(self.connector.ring.fileno(), self.connector.fileno())
+        finally:
+            self.connector.ring.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import time
+import tempfile
+import unittest
+from mbed_host_tests.host_tests_conn_proxy.conn_capture import CaptureWriter, CAPTURE_RX, CAPTURE_TX
+from mbed_host_tests.host_tests_conn_proxy.conn_primitive_replay import ReplayConnectorPrimitive
+
+
+OLD_UUID = '0123abcd-0000-4000-8000-000000000001'
+NEW_UUID = '89abcdef-1111-4111-9111-111111111111'
+
+
+class ReplayConnectorPrimitiveTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.connector = None
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self.path)
+        writer = CaptureWriter(self.path)
+        writer.write(CAPTURE_TX, 100.0, '{{__sync;%s}}\n'% OLD_UUID)
+        # UUID split between two reads
+        writer.write(CAPTURE_RX, 100.1, '{{__sync;%s'% OLD_UUID[:10])
+        writer.write(CAPTURE_RX, 100.1, '%s}}\n'% OLD_UUID[10:])
+        writer.write(CAPTURE_TX, 100.2, '{{go;1}}\n')
+        writer.write(CAPTURE_RX, 100.3, '{{done;1}}\n')
+        writer.close()
+
+    def tearDown(self):
+        if self.connector:
+            self.connector.finish()
+        os.remove(self.path)
+
+    def read_until(self, text, timeout=2):
+        data = ''
+        start = time.time()
+        while text not in data and time.time() - start < timeout:
+            data += self.connector.read(4096)
+        return data
+
+    def test_sync_uuid_mapped(self):
+        self.connector = ReplayConnectorPrimitive('RPLY', config={'replay_file' : self.path,
+            'replay_speed' : 0})
+        self.assertEqual(2, len(self.connector.rx_records))
+        self.assertEqual('', self.read_until('}}', timeout=0.2))
+        self.connector.write_kv('__sync', NEW_UUID)
+        self.assertEqual('{{__sync;%s}}\n'% NEW_UUID, self.read_until('}}'))
+
+    def test_tx_check(self):
+        self.connector = ReplayConnectorPrimitive('RPLY', config={'replay_file' : self.path,
+            'replay_speed' : 0})
+        self.connector.write_kv('__sync', NEW_UUID)
+        self.read_until('}}')
+        # Recorded output waits for data host sent before it
+        self.assertEqual('', self.read_until('done', timeout=0.2))
+        self.connector.write_kv('go', 2)
+        self.assertEqual('{{done;1}}\n', self.read_until('done'))
+        self.assertEqual(1, self.connector.tx_mismatches)
+
+    def test_tx_ignore_and_pacing(self):
+        self.connector = ReplayConnectorPrimitive('RPLY', config={'replay_file' : self.path,
+            'replay_speed' : 2.0,
+            'replay_tx' : 'ignore'})
+        start = time.time()
+        self.connector.write_kv('__sync', NEW_UUID)
+        data = self.read_until('done')
+        self.assertTrue(data.endswith('{{done;1}}\n'))
+        # 0.3 sec of capture at double speed
+        self.assertTrue(time.time() - start >= 0.14)
+        self.assertEqual(0, self.connector.tx_mismatches)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import re
+import sys
+import tempfile
+import threading
+import unittest
+from time import time
+from Queue import Empty
+from mbed_host_tests import BaseHostTest, HOSTREGISTRY
+from mbed_host_tests import host_tests_plugins
+from mbed_host_tests import init_host_test_cli_params
+from mbed_host_tests.host_tests_plugins.host_test_plugins import HostTestPluginBase
+from mbed_host_tests.host_tests_conn_proxy import conn_primitive_serial
+from mbed_host_tests.host_tests_conn_proxy import ConnThread, EventQueue, ThreadQueue
+from mbed_host_tests.host_tests_conn_proxy.conn_primitive_serial import SerialConnectorPrimitive
+from mbed_host_tests.host_tests_runner.host_test_default import DefaultTestSelector
+
+
+class FakeSerial(object):
+    """! Stands in for serial.Serial, DUT replies to __sync (see on_sync) """
+    instances = []
+    on_sync = None      # Called with (serial, sync count), returns extra DUT output
+    syncs = 0
+
+    def __init__(self, port, baudrate=9600, timeout=0):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.rx = ''
+        self.tx = []
+        self.gone = False
+        self.lock = threading.Lock()
+        FakeSerial.instances.append(self)
+
+    @property
+    def in_waiting(self):
+        if self.gone:
+            raise IOError("device disappeared")
+        return len(self.rx)
+
+    def read(self, count):
+        if self.gone:
+            raise IOError("device disappeared")
+        with self.lock:
+            data, self.rx = self.rx[:count], self.rx[count:]
+        return data
+
+    def write(self, payload):
+        self.tx.append(payload)
+        for sync_uuid in re.findall(r"\{\{__sync;([^\}]+)\}\}", payload):
+            FakeSerial.syncs += 1
+            extra = FakeSerial.on_sync(self, FakeSerial.syncs) if FakeSerial.on_sync else ''
+            self.dut_send('{{__sync;%s}}\n%s'% (sync_uuid, extra))
+
+    def dut_send(self, data):
+        with self.lock:
+            self.rx += data
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SerialResetTestCase(unittest.TestCase):
+    """! Base of test cases with serial port and reset plugins replaced by stubs """
+
+    def setUp(self):
+        FakeSerial.instances = []
+        FakeSerial.on_sync = None
+        FakeSerial.syncs = 0
+        self.plugin_calls = []
+        self.power_cycle_info = {}  # Device info reported by 'power_cycle' plugin
+        self.after_reset = None     # Called after reset plugin
+        self.orig = (conn_primitive_serial.Serial,
+            host_tests_plugins.call_plugin,
+            HostTestPluginBase.check_serial_port_ready)
+        conn_primitive_serial.Serial = FakeSerial
+        host_tests_plugins.call_plugin = self.call_plugin
+        HostTestPluginBase.check_serial_port_ready = lambda _, port, target_id=None, timeout=60: port
+
+    def tearDown(self):
+        (conn_primitive_serial.Serial,
+            host_tests_plugins.call_plugin,
+            HostTestPluginBase.check_serial_port_ready) = self.orig
+
+    def call_plugin(self, plugin_type, capability, *args, **kwargs):
+        self.plugin_calls.append((plugin_type, capability))
+        if capability == 'power_cycle':
+            kwargs['device_info'].update(self.power_cycle_info)
+        if self.after_reset:
+            self.after_reset()
+        return True
+
+    def connector(self, **config):
+        config.setdefault('forced_reset_timeout', 0)
+        return SerialConnectorPrimitive('SERI', '/dev/fake0', 115200, config)
+
+
+class SerialConnectorResetTestCase(SerialResetTestCase):
+
+    def test_software_reset_in_place(self):
+        connector = self.connector()
+        self.assertEqual([('ResetMethod', 'default')], self.plugin_calls)
+        self.assertTrue(connector.reset('software_reset'))
+        self.assertEqual([('ResetMethod', 'default')] * 2, self.plugin_calls)
+        self.assertEqual(1, len(FakeSerial.instances))
+        self.assertTrue(connector.connected())
+        self.assertEqual(None, connector.reset_info())
+
+    def test_power_cycle_changes_port(self):
+        connector = self.connector(skip_reset=True)
+        self.power_cycle_info = {'serial_port' : '/dev/fake1', 'mount_point' : '/mnt/new'}
+        self.assertFalse(connector.reset('hardware_reset'))
+        self.assertEqual([('ResetMethod', 'power_cycle')], self.plugin_calls)
+        self.assertEqual({'serial_port' : '/dev/fake1', 'mount_point' : '/mnt/new'}, connector.reset_info())
+
+    def test_power_cycle_same_port(self):
+        connector = self.connector(skip_reset=True)
+        self.power_cycle_info = {'serial_port' : '/dev/fake0'}
+        self.assertTrue(connector.reset('hardware_reset'))
+
+    def test_port_gone_after_reset(self):
+        connector = self.connector()
+        def port_gone():
+            FakeSerial.instances[0].gone = True
+        self.after_reset = port_gone
+        self.assertFalse(connector.reset('software_reset'))
+        self.assertEqual(None, connector.reset_info())
+        self.assertFalse(connector.port_alive())
+
+
+class WaitForDutAliveTestCase(SerialResetTestCase):
+
+    def setUp(self):
+        SerialResetTestCase.setUp(self)
+        self.port_exists = True
+        self.orig_exists = os.path.exists
+        os.path.exists = lambda path: self.port_exists if path == '/dev/fake0' else self.orig_exists(path)
+        self.timers = []
+
+    def tearDown(self):
+        for t in self.timers:
+            t.cancel()
+        os.path.exists = self.orig_exists
+        SerialResetTestCase.tearDown(self)
+
+    def later(self, delay, function, *args):
+        t = threading.Timer(delay, function, args)
+        self.timers.append(t)
+        t.start()
+
+    def set_port_exists(self, exists):
+        self.port_exists = exists
+
+    def test_bytes_before_reset_ignored(self):
+        connector = self.connector(skip_reset=True, reset_wait='adaptive')
+        serial = FakeSerial.instances[0]
+        serial.dut_send('stale')
+        rx_mark = connector._SerialConnectorPrimitive__rx_mark()
+        self.assertEqual(5, rx_mark)
+        start = time()
+        self.assertEqual((None, None), connector.wait_for_dut_alive(0.1, rx_mark))
+        self.assertTrue(time() - start >= 0.1)
+        self.later(0.05, serial.dut_send, 'boot')
+        latency, reason = connector.wait_for_dut_alive(2.0, rx_mark)
+        self.assertEqual('first byte', reason)
+        self.assertTrue(0.04 <= latency < 1.0)
+        # Nothing received meanwhile is lost
+        self.assertTrue(connector.has_pending_data())
+        self.assertEqual('staleboot', connector.read(100))
+
+    def test_boot_banner(self):
+        connector = self.connector(skip_reset=True, reset_wait='adaptive', boot_banner=r'mbed v\d+')
+        serial = FakeSerial.instances[0]
+        serial.dut_send('noise\n')
+        self.assertEqual((None, None), connector.wait_for_dut_alive(0.05))
+        self.later(0.05, serial.dut_send, 'mbed v5 booting\n')
+        self.assertEqual('boot banner', connector.wait_for_dut_alive(2.0)[1])
+        self.assertEqual('noise\nmbed v5 booting\n', connector.read(100))
+
+    def test_port_reappears(self):
+        connector = self.connector(skip_reset=True, reset_wait='adaptive')
+        self.later(0.02, self.set_port_exists, False)
+        self.later(0.06, self.set_port_exists, True)
+        latency, reason = connector.wait_for_dut_alive(2.0)
+        self.assertEqual('serial port reappeared', reason)
+        self.assertTrue(0.05 <= latency < 1.0)
+
+    def test_port_gone_timeout(self):
+        connector = self.connector(skip_reset=True, reset_wait='adaptive')
+        self.later(0.02, self.set_port_exists, False)
+        self.assertEqual((None, None), connector.wait_for_dut_alive(0.1))
+
+    def test_adaptive_reset_returns_early(self):
+        self.after_reset = lambda: self.later(0.02, FakeSerial.instances[0].dut_send, 'boot')
+        start = time()
+        self.connector(reset_wait='adaptive', forced_reset_timeout=5)
+        self.assertTrue(time() - start < 1.0)
+        self.assertEqual([('ResetMethod', 'default')], self.plugin_calls)
+
+
+class ConnProcessResetTestCase(SerialResetTestCase):
+
+    def setUp(self):
+        SerialResetTestCase.setUp(self)
+        self.event_queue = EventQueue(queue_factory=ThreadQueue)
+        self.dut_event_queue = ThreadQueue()
+        config = {
+            'port' : '/dev/fake0',
+            'baudrate' : 115200,
+            'forced_reset_timeout' : 0,
+            'polling_timeout' : 1,
+            'sync_timeout' : 0.5,
+        }
+        self.thread = ConnThread(self.event_queue, self.dut_event_queue, config)
+        self.thread.start()
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            self.thread.terminate()
+        self.thread.join(2.0)
+        SerialResetTestCase.tearDown(self)
+
+    def wait_for(self, key, timeout=5.0):
+        start = time()
+        while time() - start < timeout:
+            try:
+                event = self.event_queue.get(timeout=0.1)
+            except Empty:
+                continue
+            if event[0] == key:
+                return event
+        self.fail("event '%s' not received"% key)
+
+    def test_software_reset_in_place(self):
+        self.wait_for('__sync')
+        self.dut_event_queue.put(('__reset_dut', 'software_reset', time()))
+        self.wait_for('__sync')
+        self.assertEqual(2, FakeSerial.syncs)
+        self.assertEqual(1, len(FakeSerial.instances))
+        self.assertEqual([('ResetMethod', 'default')] * 2, self.plugin_calls)
+        self.assertTrue(self.thread.is_alive())
+
+    def test_power_cycle_restarts_process(self):
+        self.wait_for('__sync')
+        self.power_cycle_info = {'serial_port' : '/dev/fake1'}
+        self.dut_event_queue.put(('__reset_dut', 'hardware_reset', time()))
+        self.assertEqual({'serial_port' : '/dev/fake1'}, self.wait_for('__conn_process_restart')[1])
+        self.thread.join(2.0)
+        self.assertEqual(0, self.thread.exitcode)
+
+    def test_port_gone_restarts_process(self):
+        self.wait_for('__sync')
+        def port_gone():
+            FakeSerial.instances[0].gone = True
+        self.after_reset = port_gone
+        self.dut_event_queue.put(('__reset_dut', 'software_reset', time()))
+        self.assertEqual(None, self.wait_for('__conn_process_restart')[1])
+        self.thread.join(2.0)
+        self.assertEqual(0, self.thread.exitcode)
+
+
+class ResetHostTest(BaseHostTest):
+    """! Power cycles DUT once, passes when DUT starts again """
+    def setup(self):
+        self.register_callback('start', self.on_start)
+
+    def on_start(self, key, value, timestamp):
+        if value == '1':
+            self.reset_dut('hardware_reset')
+        else:
+            self.notify_complete(True)
+
+
+class RunTestRestartTestCase(SerialResetTestCase):
+
+    def test_conn_process_restarted_on_new_port(self):
+        FakeSerial.on_sync = lambda serial, count: '{{__timeout;10}}\n{{__host_test_name;reset_test}}\n{{start;%d}}\n'% count
+        self.power_cycle_info = {'serial_port' : '/dev/fake1'}
+        HOSTREGISTRY.register_host_test('reset_test', ResetHostTest())
+        argv = sys.argv
+        sys.argv = ['mbedhtrun', '-p', '/dev/fake0:115200', '-d', tempfile.gettempdir(),
+            '--skip-flashing', '--conn-mode', 'thread', '-R', '0']
+        try:
+            result = DefaultTestSelector(init_host_test_cli_params()).run_test()
+        finally:
+            sys.argv = argv
+            HOSTREGISTRY.unregister_host_test('reset_test')
+        self.assertEqual(True, result)
+        self.assertEqual(['/dev/fake0', '/dev/fake1'], [s.port for s in FakeSerial.instances])
+        self.assertTrue(('ResetMethod', 'power_cycle') in self.plugin_calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
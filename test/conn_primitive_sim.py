@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import unittest
+from mbed_host_tests import BaseHostTest, HOSTREGISTRY
+from mbed_host_tests import init_host_test_cli_params
+from mbed_host_tests.host_tests_conn_proxy.conn_primitive_sim import SimConnectorPrimitive
+from mbed_host_tests.host_tests_runner.host_test_default import DefaultTestSelector
+
+
+class SimConnectorPrimitiveTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.connector = None
+        self.script = None
+
+    def tearDown(self):
+        if self.connector:
+            self.connector.finish()
+        if self.script:
+            os.remove(self.script)
+
+    def read_until(self, text, timeout=5):
+        data = ''
+        start = time.time()
+        while text not in data and time.time() - start < timeout:
+            data += self.connector.read(4096)
+        return data
+
+    def test_echo(self):
+        self.connector = SimConnectorPrimitive('SIM', config={'sim_program' : 'echo:2'})
+        self.connector.write_kv('__sync', 'abc')
+        data = self.read_until('{{echo_count;2}}')
+        self.assertTrue('{{__sync;abc}}\n' in data)
+        self.assertTrue('{{__host_test_name;echo}}\n' in data)
+        self.connector.write_kv('echo_count', 2)
+        self.connector.write_kv('echo', 'x')
+        self.assertTrue('{{echo;x}}' in self.read_until('{{echo;x}}'))
+        self.connector.write_kv('echo', 'y')
+        data = self.read_until('{{__exit;0}}')
+        self.assertTrue(data.startswith('{{echo;y}}\n{{end;success}}\n'))
+        self.assertTrue(data.endswith('{{__exit;0}}\n'))
+
+    def test_reset(self):
+        self.connector = SimConnectorPrimitive('SIM', config={'sim_program' : 'echo:2'})
+        self.connector.write_kv('__sync', 'abc')
+        self.read_until('{{echo_count;2}}')
+        self.assertTrue(self.connector.reset('software_reset'))
+        time.sleep(0.1)
+        self.connector.write_kv('__sync', 'def')
+        self.assertTrue('{{__sync;def}}' in self.read_until('{{echo_count;2}}'))
+
+    def test_script_and_rate(self):
+        fd, self.script = tempfile.mkstemp()
+        os.write(fd, 'hello\nexpect go\n{{done;1}}\n')
+        os.close(fd)
+        self.connector = SimConnectorPrimitive('SIM', config={'sim_program' : self.script,
+            'sim_rate' : 1000,
+            'sim_burst' : 4})
+        self.assertEqual(10000, self.connector.baudrate)
+        start = time.time()
+        self.connector.write_kv('__sync', 'abc')
+        self.assertTrue('{{__sync;abc}}\nhello\n' in self.read_until('hello\n'))
+        # 21 bytes at 1000 bytes/sec
+        self.assertTrue(time.time() - start >= 0.015)
+        self.assertEqual('', self.connector.read(100))
+        self.connector.write_kv('go', 1)
+        self.assertTrue('{{done;1}}' in self.read_until('{{done;1}}'))
+
+    def test_noise(self):
+        self.connector = SimConnectorPrimitive('SIM', config={'sim_noise' : 1000})
+        self.assertTrue('noise 10 ' in self.read_until('noise 10 '))
+
+
+class RxdLineHostTest(BaseHostTest):
+    """! Records DUT output lines """
+    def setup(self):
+        self.lines = []
+        self.register_callback('__rxd_line', self.on_rxd_line, force=True)
+        self.send_kv('go', 1)
+
+    def on_rxd_line(self, key, value, timestamp):
+        self.lines.append(value)
+
+
+class RunTestEventOrderTestCase(unittest.TestCase):
+
+    LINES = 500
+
+    def setUp(self):
+        fd, self.script = tempfile.mkstemp()
+        os.write(fd, '{{__timeout;10}}\n{{__host_test_name;rxd_line_test}}\nexpect go\n')
+        os.write(fd, ''.join('line %d\n'% i for i in range(self.LINES)))
+        os.write(fd, '{{end;success}}\n{{__exit;0}}\n')
+        os.close(fd)
+        self.host_test = RxdLineHostTest()
+        HOSTREGISTRY.register_host_test('rxd_line_test', self.host_test)
+
+    def tearDown(self):
+        HOSTREGISTRY.unregister_host_test('rxd_line_test')
+        os.remove(self.script)
+
+    def run_test(self, *args):
+        argv = sys.argv
+        sys.argv = ['mbedhtrun', '--sim', self.script, '--conn-mode', 'thread'] + list(args)
+        try:
+            return DefaultTestSelector(init_host_test_cli_params()).run_test()
+        finally:
+            sys.argv = argv
+
+    def test_rxd_lines_delivered_before_exit(self):
+        # By default DUT output lines are not overtaken by __exit
+        self.assertEqual(True, self.run_test())
+        self.assertEqual(['line %d'% i for i in range(self.LINES)], self.host_test.lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
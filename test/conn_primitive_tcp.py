@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import time
+import socket
+import struct
+import unittest
+import threading
+from Queue import Empty
+from mbed_host_tests.host_tests_conn_proxy import ConnThread, EventQueue, ThreadQueue
+from mbed_host_tests.host_tests_conn_proxy.conn_primitive_tcp import TcpConnectorPrimitive, TelnetCodec
+from mbed_host_tests.host_tests_conn_proxy.conn_primitive_tcp import IAC, WILL, WONT, DO, DONT, SB, SE
+from mbed_host_tests.host_tests_conn_proxy.conn_primitive_tcp import BINARY, SGA, COM_PORT_OPTION
+
+
+class SocketServer(threading.Thread):
+    """! Local stand-in of network serial server (e.g. ser2net), records received bytes """
+    def __init__(self, reply=''):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        self.reply = reply
+        self.received = ''
+        self.conn = None
+        self.start()
+
+    def run(self):
+        self.conn, _ = self.listener.accept()
+        self.conn.sendall(self.reply)
+        while True:
+            data = self.conn.recv(4096)
+            if not data:
+                break
+            self.received += data
+
+    def wait_for(self, data, timeout=5):
+        start = time.time()
+        while data not in self.received and time.time() - start < timeout:
+            time.sleep(0.01)
+        return data in self.received
+
+    def close(self):
+        if self.conn:
+            self.conn.shutdown(socket.SHUT_RDWR)
+            self.conn.close()
+            self.conn = None
+        self.listener.close()
+
+
+class TelnetCodecTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = TelnetCodec()
+
+    def tearDown(self):
+        pass
+
+    def test_plain_data(self):
+        self.assertEqual(('{{a;1}}\n', ''), self.codec.decode('{{a;1}}\n'))
+
+    def test_escaped_iac(self):
+        self.assertEqual(IAC + IAC + 'x', self.codec.encode(IAC + 'x'))
+        self.assertEqual(('a' + IAC + 'b', ''), self.codec.decode('a' + IAC + IAC + 'b'))
+
+    def test_command_split_between_reads(self):
+        self.assertEqual(('a', ''), self.codec.decode('a' + IAC))
+        self.assertEqual(('b', IAC + WONT + '\x18'), self.codec.decode(DO + '\x18b'))
+
+    def test_negotiation(self):
+        self.codec.start()
+        # Options already offered by client are not confirmed again
+        self.assertEqual(('', ''), self.codec.decode(IAC + DO + BINARY + IAC + WILL + SGA))
+        self.assertEqual(('', IAC + DONT + '\x01'), self.codec.decode(IAC + WILL + '\x01'))
+        self.assertEqual(('', IAC + WONT + BINARY), self.codec.decode(IAC + DONT + BINARY))
+        self.assertEqual(('', IAC + WILL + BINARY), self.codec.decode(IAC + DO + BINARY))
+
+    def test_com_port_reply(self):
+        baudrate = struct.pack('>I', 115200)
+        data, _ = self.codec.decode('x' + IAC + SB + COM_PORT_OPTION + chr(101) + baudrate + IAC + SE + 'y')
+        self.assertEqual('xy', data)
+        self.assertEqual(baudrate, self.codec.com_port[1])
+
+
+class TcpConnectorPrimitiveTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = None
+        self.connector = None
+
+    def tearDown(self):
+        if self.connector:
+            self.connector.finish()
+        if self.server:
+            self.server.close()
+
+    def connect(self, protocol, reply='', **config):
+        self.server = SocketServer(reply)
+        self.config = {
+            'tcp_protocol' : protocol,
+            'baudrate' : 115200,
+            'polling_timeout' : 1,
+            'forced_reset_timeout' : 0,
+            'skip_reset' : protocol == 'raw',
+        }
+        self.config.update(config)
+        self.connector = TcpConnectorPrimitive('TCP', '127.0.0.1', self.server.port, config=self.config)
+        self.assertTrue(self.connector.connected())
+
+    def reply_after_reset(self, reply, delay=0.0):
+        # DUT sends reply after break signal ends
+        def reply_thread():
+            if self.server.wait_for(IAC + SB + COM_PORT_OPTION + chr(5) + chr(6) + IAC + SE):
+                time.sleep(delay)
+                self.server.conn.sendall(reply)
+        thread = threading.Thread(target=reply_thread)
+        thread.daemon = True
+        thread.start()
+
+    def read_all(self, count):
+        data = ''
+        start = time.time()
+        while len(data) < count and time.time() - start < 5:
+            data += self.connector.read(4096)
+        return data
+
+    def test_raw(self):
+        self.connect('raw', reply='{{__sync;1}}\n' + IAC)
+        self.assertEqual('{{__sync;1}}\n' + IAC, self.read_all(14))
+        self.connector.write_kv('key', 'value' + IAC)
+        self.assertTrue(self.server.wait_for('{{key;value' + IAC + '}}\n'))
+
+    def test_rfc2217(self):
+        self.connect('rfc2217', reply='ab' + IAC + IAC + IAC + DO + '\x18' + 'c')
+        # Port configured and DUT reset with break
+        self.assertTrue(self.server.wait_for(IAC + WILL + COM_PORT_OPTION))
+        self.assertTrue(self.server.wait_for(IAC + SB + COM_PORT_OPTION + chr(1) + struct.pack('>I', 115200) + IAC + SE))
+        self.assertTrue(self.server.wait_for(IAC + SB + COM_PORT_OPTION + chr(5) + chr(6) + IAC + SE))
+        self.assertEqual('ab' + IAC + 'c', self.read_all(4))
+        self.assertTrue(self.server.wait_for(IAC + WONT + '\x18'))
+        self.connector.write(IAC)
+        self.assertTrue(self.server.wait_for(IAC + IAC))
+
+    def test_raw_reset_fails(self):
+        self.connect('raw', skip_reset=False)
+        self.assertFalse(self.connector.reset('software_reset'))
+        self.assertTrue('raw TCP' in self.connector.reset_info()['reset_error'])
+        self.connector.skip_reset = True
+        self.assertTrue(self.connector.reset('software_reset'))
+        self.assertEqual(None, self.connector.reset_info())
+
+    def test_raw_reset_fails_host_test(self):
+        # Host test is told that DUT was not reset, connection is not opened again
+        self.server = SocketServer()
+        event_queue = EventQueue(queue_factory=ThreadQueue)
+        dut_event_queue = ThreadQueue()
+        config = {
+            'conn_resource' : 'tcp',
+            'tcp_host' : '127.0.0.1',
+            'tcp_port' : self.server.port,
+            'tcp_protocol' : 'raw',
+            'forced_reset_timeout' : 0,
+            'sync_timeout' : 0.5,
+        }
+        thread = ConnThread(event_queue, dut_event_queue, config)
+        thread.start()
+        dut_event_queue.put(('__reset_dut', 'software_reset', time.time()))
+        thread.join(5.0)
+        self.assertFalse(thread.is_alive())
+        keys = []
+        while True:
+            try:
+                keys.append(event_queue.get(block=False)[0])
+            except Empty:
+                break
+        self.assertTrue('__notify_conn_lost' in keys)
+        self.assertFalse('__conn_process_restart' in keys)
+
+    def test_fast_sync_skips_post_reset_sleep(self):
+        start = time.time()
+        self.connect('rfc2217', forced_reset_timeout=5, fast_sync=True)
+        self.assertTrue(self.connector.reset('software_reset'))
+        self.assertTrue(time.time() - start < 2)
+
+    def test_adaptive_reset_wait(self):
+        self.connect('rfc2217', reply='stale', forced_reset_timeout=5, skip_reset=True,
+            reset_wait='adaptive', boot_banner='booted')
+        time.sleep(0.1)
+        self.connector.skip_reset = False
+        self.reply_after_reset('mbed-os booted\n')
+        start = time.time()
+        self.assertTrue(self.connector.reset('software_reset'))
+        self.assertTrue(time.time() - start < 2)
+        self.assertTrue(self.connector.has_pending_data())
+        self.assertEqual('stalembed-os booted\n', self.read_all(20))
+
+    def test_adaptive_reset_wait_ignores_stale_bytes(self):
+        self.connect('rfc2217', reply='stale', forced_reset_timeout=0.5, skip_reset=True,
+            reset_wait='adaptive')
+        time.sleep(0.1)
+        self.connector.skip_reset = False
+        self.reply_after_reset('x', delay=0.2)
+        start = time.time()
+        self.assertTrue(self.connector.reset('software_reset'))
+        self.assertTrue(time.time() - start >= 0.2 + self.connector.BREAK_DURATION)
+        self.assertEqual('stalex', self.read_all(6))
+
+    def test_connection_closed(self):
+        self.connect('raw')
+        while self.server.conn is None:
+            time.sleep(0.01)
+        self.server.close()
+        self.server = None
+        start = time.time()
+        while self.connector.connected() and time.time() - start < 5:
+            self.connector.read(10)
+        self.assertFalse(self.connector.connected())
+        self.assertTrue('connection lost' in self.connector.error())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+from mbed_host_tests.host_tests_conn_proxy.conn_proxy import ReadSizer
+
+
+class ReadSizerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_default_size(self):
+        sizer = ReadSizer()
+        self.assertEqual(ReadSizer.DEFAULT_SIZE, sizer.size)
+        sizer.update(10, 0.0)
+        sizer.update(10, 0.01)
+        self.assertEqual(ReadSizer.DEFAULT_SIZE, sizer.size)
+
+    def test_size_from_baudrate(self):
+        # 3 Mbaud, 10 ms loop: 3000 bytes per period, 6000 with headroom
+        sizer = ReadSizer(baudrate=3000000)
+        sizer.update(0, 0.0)
+        sizer.update(0, 0.01)
+        self.assertEqual(6016, sizer.size)
+        # 9600 baud: minimal read size
+        sizer = ReadSizer(baudrate=9600)
+        sizer.update(0, 0.0)
+        sizer.update(0, 0.01)
+        self.assertEqual(ReadSizer.MIN_SIZE, sizer.size)
+
+    def test_full_read_grows(self):
+        sizer = ReadSizer(baudrate=9600)
+        sizer.update(0, 0.0)
+        sizer.update(0, 0.01)
+        sizer.update(64, 0.02)
+        self.assertEqual(128, sizer.size)
+        for i in range(20):
+            sizer.update(sizer.size, 0.03 + i * 0.01)
+        self.assertEqual(ReadSizer.MAX_SIZE, sizer.size)
+        # Read size follows average read, it shrinks gradually when data stops
+        sizer.update(0, 0.3)
+        self.assertEqual(ReadSizer.MAX_SIZE, sizer.size)
+        for i in range(100):
+            sizer.update(0, 0.31 + i * 0.01)
+        self.assertEqual(ReadSizer.MIN_SIZE, sizer.size)
+        self.assertEqual(ReadSizer.MAX_SIZE, sizer.stats()['max_size'])
+
+    def test_fixed_size(self):
+        sizer = ReadSizer(baudrate=3000000, fixed_size=100)
+        for i in range(5):
+            sizer.update(100, i * 0.01)
+        self.assertEqual(100, sizer.size)
+        self.assertEqual(5, sizer.full_reads)
+
+    def test_stats(self):
+        sizer = ReadSizer(baudrate=115200)
+        sizer.update(100, 0.0)
+        sizer.update(300, 0.02)
+        stats = sizer.stats()
+        self.assertEqual((2, 400, 200.0), (stats['reads'], stats['bytes'], stats['bytes_per_read']))
+        self.assertAlmostEqual(0.02, stats['period'])
+
+
+if __name__ == '__main__':
+    unittest.main()
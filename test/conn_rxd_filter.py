@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+from mbed_host_tests.host_tests_conn_proxy.conn_rxd_filter import RxdLineFilter, RxdRateLimiter
+
+
+class RxdLineFilterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = ['[DBG ][main] tick', '[INFO][net] connected', 'plain output', '[DBG ][net] rx 12']
+
+    def tearDown(self):
+        pass
+
+    def test_no_patterns(self):
+        rxd_filter = RxdLineFilter()
+        self.assertFalse(rxd_filter.enabled())
+        self.assertEqual(self.lines, filter(rxd_filter.match, self.lines))
+
+    def test_exclude(self):
+        rxd_filter = RxdLineFilter(exclude=[r'^\[DBG'])
+        self.assertEqual(['[INFO][net] connected', 'plain output'], filter(rxd_filter.match, self.lines))
+        self.assertEqual((2, 2), (rxd_filter.passed, rxd_filter.dropped))
+
+    def test_include(self):
+        rxd_filter = RxdLineFilter(include=[r'\[net\]', 'plain'])
+        self.assertEqual(self.lines[1:], filter(rxd_filter.match, self.lines))
+
+    def test_include_and_exclude(self):
+        rxd_filter = RxdLineFilter(include=[r'\[net\]'], exclude=['DBG'])
+        self.assertEqual(['[INFO][net] connected'], filter(rxd_filter.match, self.lines))
+        self.assertEqual(3, rxd_filter.dropped)
+
+
+class RxdRateLimiterTestCase(unittest.TestCase):
+
+    def test_disabled(self):
+        limiter = RxdRateLimiter()
+        self.assertFalse(limiter.enabled())
+        self.assertTrue(all(limiter.allow(0.0) for _ in range(1000)))
+        self.assertEqual(None, limiter.report(0.0))
+
+    def test_sampling(self):
+        limiter = RxdRateLimiter(sample_first=3, sample_every=4)
+        passed = [i for i in range(1, 16) if limiter.allow(0.0)]
+        self.assertEqual([1, 2, 3, 7, 11, 15], passed)
+        self.assertEqual(9, limiter.sampled_out)
+
+    def test_token_bucket(self):
+        limiter = RxdRateLimiter(rate=10)
+        # Burst of one second of lines at once, then 10 lines per second
+        self.assertEqual(10, len([i for i in range(100) if limiter.allow(100.0)]))
+        self.assertEqual(5, len([i for i in range(100) if limiter.allow(100.5)]))
+        self.assertEqual(10, len([i for i in range(100) if limiter.allow(110.0)]))
+        self.assertEqual(275, limiter.rate_limited)
+
+    def test_report(self):
+        limiter = RxdRateLimiter(rate=1)
+        limiter.allow(0.0)
+        self.assertEqual(None, limiter.report(0.0))
+        limiter.allow(0.0)
+        self.assertEqual({'dropped' : 1, 'sampled_out' : 0, 'rate_limited' : 1}, limiter.report(0.0))
+        limiter.allow(0.1)
+        self.assertEqual(None, limiter.report(0.5))
+        self.assertEqual(1, limiter.report(1.5)['dropped'])
+        self.assertEqual(None, limiter.report(5.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+mbed SDK
+Copyright (c) 2011-2016 ARM Limited
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+from mbed_host_tests.host_tests_conn_proxy.conn_proxy import KiViBufferWalker
+
+
+class KiViBufferWalkerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.kivi = KiViBufferWalker()
+
+    def tearDown(self):
+        pass
+
+    def pop_all_kv(self):
+        result = []
+        while self.kivi.search():
+            key, value, _ = self.kivi.pop_kv()
+            result.append((key, value))
+        return result
+
+    def test_single_kv_line(self):
+        self.assertEqual([], self.kivi.append("{{__sync;0123}}\n"))
+        self.assertEqual([('__sync', '0123')], self.pop_all_kv())
+
+    def test_text_line(self):
+        self.assertEqual(['hello world'], self.kivi.append("hello world\n"))
+        self.assertFalse(self.kivi.search())
+
+    def test_text_around_kv(self):
+        self.assertEqual(['before', 'after'], self.kivi.append("  before{{key;value}}after  \n"))
+        self.assertEqual([('key', 'value')], self.pop_all_kv())
+
+    def test_line_split_between_appends(self):
+        self.assertEqual([], self.kivi.append("{{ke"))
+        self.assertEqual([], self.kivi.append("y;val"))
+        self.assertEqual(['text'], self.kivi.append("ue}}\ntext\npartial"))
+        self.assertEqual([('key', 'value')], self.pop_all_kv())
+        self.assertEqual(['partial line'], self.kivi.append(" line\n"))
+
+    def test_long_line_without_newline(self):
+        for _ in range(1000):
+            self.assertEqual([], self.kivi.append("#" * 64))
+        lines = self.kivi.append("\n")
+        self.assertEqual(["#" * 64000], lines)
+        self.assertEqual(0, len(self.kivi.buff))
+
+    def test_empty_lines(self):
+        self.assertEqual(['', '', 'a'], self.kivi.append("\n\na\n"))
+
+    def test_multiple_kv_in_line(self):
+        self.assertEqual([], self.kivi.append("{{a;1}}{{b;2}}{{c;3}}\n"))
+        self.assertEqual([('a', '1'), ('b', '2'), ('c', '3')], self.pop_all_kv())
+
+    def test_multiple_kv_with_noise(self):
+        lines = self.kivi.append("noise{{a;1}} between {{b;2}}{tail}\n")
+        self.assertEqual(['noise', ' between ', '{tail}'], lines)
+        self.assertEqual([('a', '1'), ('b', '2')], self.pop_all_kv())
+
+    def test_multiple_kv_timestamps(self):
+        self.kivi.append("{{a;1}}{{b;2}}\n")
+        _, _, ts_a = self.kivi.pop_kv()
+        _, _, ts_b = self.kivi.pop_kv()
+        self.assertTrue(ts_a <= ts_b)
+
+    def test_read_timestamp(self):
+        self.kivi.append("{{a;1}}\ntext\n{{b;2}}\n", timestamp=100.0)
+        self.assertEqual([('a', '1', 100.0), ('b', '2', 100.0)], list(self.kivi.kvl))
+
+    def test_read_timestamp_interpolation(self):
+        # '{{a;1}}' is followed by 10 bytes, '{{b;2}}' by 1 byte ('\n')
+        self.kivi.append("{{a;1}}  {{b;2}}\n", timestamp=100.0, byte_time=0.5)
+        self.kivi.append(" {{c;3}}\nxy", timestamp=200.0, byte_time=0.5)
+        self.assertEqual([('a', '1', 95.0), ('b', '2', 99.5), ('c', '3', 198.5)], list(self.kivi.kvl))
+
+    def test_malformed_kv_is_text(self):
+        self.assertEqual(['{{a;}}', '{{;1}} x'], self.kivi.append("{{a;}}\n{{;1}} x\n"))
+        self.assertFalse(self.kivi.search())
+
+    def test_overflow_flush(self):
+        kivi = KiViBufferWalker(max_line_length=16)
+        self.assertEqual([], kivi.append("#" * 16))
+        self.assertEqual(["#" * 20], kivi.append("#" * 4))
+        self.assertEqual(1, kivi.overflow_count)
+        self.assertEqual(20, kivi.overflow_bytes)
+        self.assertEqual(['end'], kivi.append("end\n"))
+
+    def test_overflow_drop(self):
+        kivi = KiViBufferWalker(max_line_length=16, overflow_policy=KiViBufferWalker.OVERFLOW_DROP)
+        self.assertEqual([], kivi.append("#" * 40))
+        self.assertEqual(1, kivi.overflow_count)
+        self.assertEqual(40, kivi.overflow_bytes)
+        self.assertEqual(0, len(kivi.buff))
+
+    def test_overflow_resync_on_kv(self):
+        kivi = KiViBufferWalker(max_line_length=16)
+        self.assertEqual(["#" * 15], kivi.append("#" * 15 + "{{key;val"))
+        self.assertEqual([], kivi.append("ue}}\n"))
+        self.assertEqual([('key', 'value')], [kivi.pop_kv()[:2]])
+
+    def test_overflow_keeps_split_brace(self):
+        kivi = KiViBufferWalker(max_line_length=16)
+        self.assertEqual(["#" * 16], kivi.append("#" * 16 + "{"))
+        self.assertEqual([], kivi.append("{a;1}}\n"))
+        self.assertEqual(('a', '1'), kivi.pop_kv()[:2])
+
+    def test_pop_kv_empty(self):
+        key, value, _ = self.kivi.pop_kv()
+        self.assertEqual((None, None), (key, value))
+
+if __name__ == '__main__':
+    unittest.main()